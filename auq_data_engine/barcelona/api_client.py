@@ -16,9 +16,12 @@ License: MIT License
 import requests
 import json
 import pandas as pd
+from itertools import chain
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional, Union
 from shared.common_lib.emoji_logger import info, success, warning, error, debug
+from shared.common_lib import http_client, instrumentation
 
 # ============================
 # Configuration & Constants
@@ -26,55 +29,98 @@ from shared.common_lib.emoji_logger import info, success, warning, error, debug
 
 BASE_URL = "https://opendata-ajuntament.barcelona.cat/data/api/action/datastore_search"
 DEFAULT_LIMIT = 1000
+DEFAULT_MAX_WORKERS = 4
 
 # ===================
 # API Functions
 # ===================
 
-def fetch_resource_data(resource_id: str, output_format: str = "json") -> Union[List[Dict], pd.DataFrame]:
+def fetch_page(resource_id: str, offset: int, limit: int = DEFAULT_LIMIT) -> Dict[str, Any]:
+    """
+    Fetch a single `datastore_search` page.
+    
+    Each page is its own request, so it gets its own retries and backoff from
+    the shared HTTP transport (`shared.common_lib.http_client`).
+    
+    Args:
+        resource_id: The ID of the resource to fetch
+        offset: Offset of the first record in the page
+        limit: Number of records per page
+        
+    Returns:
+        Dict[str, Any]: The `result` object of the CKAN response
+        
+    Raises:
+        requests.exceptions.RequestException: If the page cannot be fetched
+    """
+    params = {
+        "resource_id": resource_id,
+        "limit": limit,
+        "offset": offset
+    }
+    response = http_client.get(BASE_URL, params=params)
+    response.raise_for_status()
+    return response.json()["result"]
+
+def fetch_resource_data(
+    resource_id: str,
+    output_format: str = "json",
+    page_size: int = DEFAULT_LIMIT,
+    concurrent: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS
+) -> Union[List[Dict], pd.DataFrame]:
     """
     Fetch data from Barcelona's Open Data API using pagination.
     
+    In concurrent mode the dataset `total` is read from the first page and the
+    remaining offsets are fetched in parallel by a bounded worker pool. Pages
+    are reassembled in offset order, so the output matches the sequential mode.
+    
     Args:
         resource_id: The ID of the resource to fetch
         output_format: The desired output format ('json' or 'csv')
+        page_size: Number of records requested per page
+        concurrent: Fetch the remaining pages in parallel
+        max_workers: Maximum number of pages in flight (concurrent mode only)
         
     Returns:
         Union[List[Dict], pd.DataFrame]: The fetched data in the requested format
     """
     info(f"Fetching data for resource ID: {resource_id}")
     
-    limit = DEFAULT_LIMIT
-    offset = 0
-    all_records = []
-    
-    while True:
-        try:
-            params = {
-                "resource_id": resource_id,
-                "limit": limit,
-                "offset": offset
-            }
-            
-            response = requests.get(BASE_URL, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            records = data["result"]["records"]
-            if not records:
-                break
-                
-            all_records.extend(records)
-            offset += limit
+    try:
+        first_page = fetch_page(resource_id, 0, page_size)
+        total = first_page.get("total")
+        
+        if concurrent and total is not None:
+            offsets = range(page_size, total, page_size)
+            info(f"Resource has {total} records: fetching {len(offsets)} more pages with {max_workers} workers")
             
-            info(f"Fetched {len(records)} records (total: {len(all_records)})")
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                pages = executor.map(
+                    instrumentation.bind(lambda offset: fetch_page(resource_id, offset, page_size)["records"]),
+                    offsets
+                )
+                all_records = list(chain(first_page["records"], *pages))
+        else:
+            all_records = list(first_page["records"])
+            offset = page_size
+            records = first_page["records"]
             
-        except requests.exceptions.RequestException as e:
-            error(f"Failed to fetch data: {str(e)}")
-            return [] if output_format == "json" else pd.DataFrame()
-        except json.JSONDecodeError as e:
-            error(f"Failed to parse JSON response: {str(e)}")
-            return [] if output_format == "json" else pd.DataFrame()
+            while records:
+                info(f"Fetched {len(records)} records (total: {len(all_records)})")
+                records = fetch_page(resource_id, offset, page_size)["records"]
+                all_records.extend(records)
+                offset += page_size
+        
+        info(f"Fetched {len(all_records)} records for resource ID: {resource_id}")
+        
+    except requests.exceptions.RequestException as e:
+        error(f"Failed to fetch data: {str(e)}")
+        return [] if output_format == "json" else pd.DataFrame()
+    except (json.JSONDecodeError, KeyError) as e:
+        error(f"Failed to parse JSON response: {str(e)}")
+        return [] if output_format == "json" else pd.DataFrame()
     
     if output_format == "csv":
         return pd.DataFrame(all_records)
@@ -103,7 +149,14 @@ def save_data(data: Union[List[Dict], pd.DataFrame], output_path: Path, output_f
     except Exception as e:
         error(f"Failed to save data: {str(e)}")
 
-def run(resource_id: str, output_path: Path, output_format: str = "json") -> None:
+def run(
+    resource_id: str,
+    output_path: Path,
+    output_format: str = "json",
+    page_size: int = DEFAULT_LIMIT,
+    concurrent: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS
+) -> None:
     """
     Main execution function to fetch and save data from Barcelona's Open Data API.
     
@@ -111,10 +164,13 @@ def run(resource_id: str, output_path: Path, output_format: str = "json") -> Non
         resource_id: The ID of the resource to fetch
         output_path: Path where to save the output file
         output_format: The desired output format ('json' or 'csv')
+        page_size: Number of records requested per page
+        concurrent: Fetch pages in parallel after reading the dataset total
+        max_workers: Maximum number of pages in flight (concurrent mode only)
     """
     info(f"Starting data fetch for resource ID: {resource_id}")
     
-    data = fetch_resource_data(resource_id, output_format)
+    data = fetch_resource_data(resource_id, output_format, page_size, concurrent, max_workers)
     if not data:
         error("No data fetched. Exiting.")
         return
@@ -137,6 +193,13 @@ if __name__ == "__main__":
                       help="Path where to save the output file")
     parser.add_argument("--format", type=str, choices=["json", "csv"], default="json",
                       help="Output format (json or csv)")
+    parser.add_argument("--page_size", type=int, default=DEFAULT_LIMIT,
+                      help="Number of records requested per page")
+    parser.add_argument("--concurrent", action="store_true",
+                      help="Fetch pages in parallel after reading the dataset total")
+    parser.add_argument("--max_workers", type=int, default=DEFAULT_MAX_WORKERS,
+                      help="Maximum number of pages in flight in concurrent mode")
     
     args = parser.parse_args()
-    run(args.resource_id, Path(args.output_path), args.format) 
\ No newline at end of file
+    run(args.resource_id, Path(args.output_path), args.format,
+        args.page_size, args.concurrent, args.max_workers) 
\ No newline at end of file
@@ -6,8 +6,10 @@ ETL Script: Load Districts of Barcelona
 This script performs the following tasks:
 - Downloads district data from a public Supabase URL in JSON format.
 - Extracts and validates district names, codes, and geometries (in WKT format).
-- Transforms the data into a format compatible with Supabase/PostGIS.
-- Saves the processed districts as a JSON file in the /data/processed folder.
+- Transforms the data into a format compatible with Supabase/PostGIS
+  (geometry encoding selected with AUQ_GEOM_ENCODING, see geometry.py).
+- Saves the processed districts as an NDJSON file in the /data/processed folder.
+- Skips the run when input, parameters and code are unchanged (see fingerprint.py).
 
 Usage:
     python load_districts.py
@@ -21,12 +23,13 @@ License: MIT License
 """
 
 import json
-import requests
 from shapely import wkt
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, List, Optional
 
-from common_lib.emoji_logger import info, success, warning, error
+from shared.common_lib.emoji_logger import info, success, warning, error
+from shared.common_lib import raw_cache, instrumentation, profiling, ndjson
+from auq_data_engine import geometry, fingerprint
 
 
 # ============================
@@ -44,11 +47,13 @@ DEFAULT_OUTPUT_PATH = BASE_DIR / "data/processed" / OUTPUT_FILENAME
 # Core ETL Process
 # ===================
 
+@instrumentation.instrument("bcn:districts:etl")
 def run(
     input_url: str = INPUT_URL,
     output_path: Path = DEFAULT_OUTPUT_PATH,
-    city_id: int = CITY_ID
-) -> None:
+    city_id: int = CITY_ID,
+    sink: Optional[Callable[[List[Dict]], None]] = None
+) -> bool:
     """
     Main execution logic to fetch, process, and store district data.
 
@@ -56,18 +61,25 @@ def run(
         input_url (str): Public URL pointing to the input JSON file.
         output_path (Path): Output file path to save the processed data.
         city_id (int): ID to associate districts with the correct city.
+        sink (callable, optional): Receives the processed records (pipelined upload).
+
+    Returns:
+        bool: True if the output was written or reused, False if the input could not be fetched.
     """
     info(f"Starting ETL process for Barcelona districts...")
     info(f"Fetching data from: {input_url}")
 
+    stage = fingerprint.Stage(output_path, code=[__file__, geometry], inputs=[input_url],
+                              params={"city_id": city_id, "geom_encoding": geometry.ENCODING})
+    if stage.reuse(sink):
+        return True
+
     try:
-        response = requests.get(input_url)
-        response.raise_for_status()
-        raw_data = response.json()
+        raw_data = json.loads(raw_cache.fetch(input_url))
         success(f"Successfully downloaded district data.")
     except Exception as e:
         error(f"Failed to fetch input data: {e}")
-        return
+        return False
 
     prepared_data = []
     skipped_count = 0
@@ -85,22 +97,25 @@ def run(
                 skipped_count += 1
                 continue
 
-            _ = wkt.loads(wkt_geom)  # Validate geometry
+            shape = wkt.loads(wkt_geom)  # Validate geometry
 
             prepared_data.append({
                 "name": name,
                 "district_code": code,
                 "city_id": city_id,
-                "geom": f"SRID=4326;{wkt_geom}"
+                "geom": geometry.encode(shape, source_wkt=wkt_geom)
             })
 
         except Exception as e:
             warning(f"Skipped district '{d.get('nom_districte', 'unknown')}': {e}")
             skipped_count += 1
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(prepared_data, f, ensure_ascii=False, indent=2)
+    ndjson.write_records(output_path, prepared_data)
+    stage.save()
+    instrumentation.count("records_in", len(raw_data))
+    instrumentation.count("records_out", len(prepared_data))
+    if sink:
+        sink(prepared_data)
 
     # ===============
     # Summary Log
@@ -110,6 +125,7 @@ def run(
     if skipped_count > 0:
         warning(f"Skipped entries: {skipped_count}")
     success(f"Output saved to: {output_path}")
+    return True
 
 
 # ==========================
@@ -124,7 +140,10 @@ if __name__ == "__main__":
     parser.add_argument("--output_path", type=str, default=str(DEFAULT_OUTPUT_PATH), help="Output path for the processed JSON file.")
     parser.add_argument("--city_id", type=int, default=CITY_ID, help="Numeric ID of the city (default: 1 = Barcelona)")
 
+    profiling.add_arguments(parser)
+
     args = parser.parse_args()
+    profiling.configure_from_args(args)
     run(
         input_url=args.input_url,
         output_path=Path(args.output_path),
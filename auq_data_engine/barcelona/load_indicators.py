@@ -6,7 +6,8 @@ ETL Script: Load Barcelona Indicators
 - Processes indicator data from CSV files in the raw_sample directory
 - Aggregates census-level data by neighborhood
 - Validates and transforms data into the required format
-- Outputs a JSON file ready for Supabase/PostGIS
+- Outputs an NDJSON file ready for Supabase/PostGIS, written file by file
+- Skips the run when the files, database IDs and code are unchanged (see fingerprint.py)
 
 Author: Nico D'Alessandro Calderon
 Email: nicodalessandro11@gmail.com
@@ -20,13 +21,17 @@ import csv
 import os
 from pathlib import Path
 import pandas as pd
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Tuple
 import re
 import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
-import requests
-from io import StringIO
+from shared.common_lib import raw_cache, instrumentation, profiling, ndjson
+from auq_data_engine.indicator_records import build_records, detect_encoding, neighbourhood_id_series, report_invalid, to_float_values
+from auq_data_engine import fingerprint, indicator_records
+from io import BytesIO
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 
 # Load environment variables
 load_dotenv()
@@ -44,6 +49,10 @@ SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 # Constants
 CITY_ID = 1  # Barcelona city ID
 
+# Parallel mode: downloads run in threads, CSV parsing/aggregation in processes
+DEFAULT_DOWNLOAD_WORKERS = 8
+DEFAULT_PARSE_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
 # Indicator mapping from files to database names
 INDICATOR_MAPPING = {
     "average_gross_taxable_income": "Average gross taxable income per person",
@@ -60,6 +69,10 @@ VALUE_COLUMNS = {
     "surface": -1                # Last column
 }
 
+# Columns read from every indicator CSV (plus the value column) and their dtypes
+NEIGHBORHOOD_COLUMNS = ['Codi_Barri', 'Nom_Barri']
+NEIGHBORHOOD_DTYPES = {'Codi_Barri': 'Int16', 'Nom_Barri': 'category'}
+
 # Aggregation methods for each indicator type
 AGGREGATION_METHODS = {
     "average_gross_taxable_income": "mean",
@@ -69,7 +82,7 @@ AGGREGATION_METHODS = {
 }
 
 # Import emoji logger
-from common_lib.emoji_logger import info, success, warning, error
+from shared.common_lib.emoji_logger import info, success, warning, error
 
 def get_supabase_client() -> Client:
     """Initialize and return a Supabase client"""
@@ -156,32 +169,76 @@ def get_neighborhood_ids(supabase: Client) -> Dict[str, int]:
         
     return neighborhood_ids
 
-def download_csv_from_url(url: str) -> pd.DataFrame:
+def read_header(content: bytes, encoding: str) -> List[str]:
+    """
+    Read the column names from the first line of a CSV file
+    
+    Args:
+        content: Raw bytes of the CSV file
+        encoding: Encoding of the file
+        
+    Returns:
+        List of column names
+    """
+    first_line = content[:content.find(b'\n') if b'\n' in content else len(content)]
+    return next(csv.reader([first_line.decode(encoding, errors='replace').rstrip('\r')]), [])
+
+def parse_csv_bytes(content: bytes, indicator_name: Optional[str] = None) -> pd.DataFrame:
+    """
+    Parse raw CSV bytes into a DataFrame in a single pass
+    
+    Only the neighborhood columns and the indicator value column are read,
+    with compact dtypes. The value column is read as text and coerced to
+    float, so non-numeric cells are counted and dropped instead of failing
+    the whole file.
+    
+    Args:
+        content: Raw bytes of the CSV file
+        indicator_name: Name of the indicator (used to locate the value column)
+        
+    Returns:
+        DataFrame with 'Codi_Barri', 'Nom_Barri' and the value column
+    """
+    encoding = detect_encoding(content)
+    header = read_header(content, encoding)
+    if not header:
+        return pd.DataFrame()
+    
+    value_column = header[VALUE_COLUMNS.get(indicator_name, -1)]
+    missing = [col for col in NEIGHBORHOOD_COLUMNS if col not in header]
+    if missing:
+        raise ValueError(f"Missing columns {missing} in CSV header: {header}")
+    
+    dtypes = {**NEIGHBORHOOD_DTYPES, value_column: 'string'}
+    df = pd.read_csv(
+        BytesIO(content),
+        encoding=encoding,
+        usecols=[*NEIGHBORHOOD_COLUMNS, value_column],
+        dtype=dtypes
+    )
+    
+    # Empty cells stay NaN (skipped by the aggregation); unparseable ones are rejected
+    values = to_float_values(df[value_column])
+    invalid = values.isna() & df[value_column].str.strip().fillna("").ne("")
+    df[value_column] = values
+    if invalid.any():
+        report_invalid({"invalid_value": int(invalid.sum())}, len(df), f"{indicator_name} ({value_column})")
+        df = df[~invalid].reset_index(drop=True)
+    return df
+
+def download_csv_from_url(url: str, indicator_name: Optional[str] = None) -> pd.DataFrame:
     """
     Download CSV file from URL and return as DataFrame
     
     Args:
         url: URL of the CSV file
+        indicator_name: Name of the indicator (used to locate the value column)
         
     Returns:
         DataFrame containing the CSV data
     """
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        # Try different encodings
-        encodings = ['utf-8', 'latin1', 'iso-8859-1']
-        for encoding in encodings:
-            try:
-                df = pd.read_csv(StringIO(response.text), encoding=encoding)
-                # Check if we can read the column names properly
-                if any('â' in col for col in df.columns):
-                    continue
-                return df
-            except UnicodeDecodeError:
-                continue
-        # If all encodings fail, use the last one tried
-        return pd.read_csv(StringIO(response.text), encoding=encodings[-1])
+        return parse_csv_bytes(raw_cache.fetch(url), indicator_name)
     except Exception as e:
         error(f"Failed to download CSV from {url}: {str(e)}")
         return pd.DataFrame()
@@ -247,7 +304,7 @@ def aggregate_by_neighborhood(df: pd.DataFrame, indicator_name: str) -> pd.DataF
         return pd.DataFrame()
     
     # Group by neighborhood code and name
-    grouped = df.groupby(['Codi_Barri', 'Nom_Barri'])
+    grouped = df.groupby(['Codi_Barri', 'Nom_Barri'], observed=True)
     
     # Apply aggregation to the value column
     if agg_method == "sum":
@@ -265,12 +322,12 @@ def aggregate_by_neighborhood(df: pd.DataFrame, indicator_name: str) -> pd.DataF
     
     return aggregated
 
-def process_indicator_file(url: str, year: int, indicator_name: str, indicator_def_ids: Dict[str, int], neighborhood_ids: Dict[str, int]) -> List[Dict[str, Any]]:
+def build_indicator_records(df: pd.DataFrame, year: int, indicator_name: str, indicator_def_ids: Dict[str, int], neighborhood_ids: Dict[str, int]) -> List[Dict[str, Any]]:
     """
-    Process a single indicator CSV file and return a list of indicator records
+    Aggregate a parsed indicator CSV and turn it into indicator records
     
     Args:
-        url: URL of the CSV file
+        df: DataFrame with the census-level CSV data
         year: Year of the data
         indicator_name: Name of the indicator (used to map to indicator_def_id)
         indicator_def_ids: Dictionary mapping indicator names to their IDs
@@ -280,74 +337,178 @@ def process_indicator_file(url: str, year: int, indicator_name: str, indicator_d
         List of indicator records
     """
     results = []
+    instrumentation.count("records_in", len(df))  # not seen from parser processes (parallel mode)
     
+    # Show available columns for debugging
+    info(f"Available columns in file: {', '.join(df.columns)}")
+    
+    # Aggregate by neighborhood
+    aggregated_df = aggregate_by_neighborhood(df, indicator_name)
+    
+    if aggregated_df.empty:
+        warning(f"No data after aggregation for indicator {indicator_name} year {year}")
+        return results
+    
+    # Get indicator definition ID
+    db_indicator_name = INDICATOR_MAPPING.get(indicator_name)
+    indicator_def_id = indicator_def_ids.get(db_indicator_name)
+    
+    if not indicator_def_id:
+        warning(f"No indicator definition ID found for: {db_indicator_name}")
+        return results
+    
+    # Map codes to neighbourhood IDs and build the records column-wise
+    records, invalid = build_records(
+        codes=aggregated_df['Codi_Barri'],
+        values=aggregated_df['Valor'],
+        years=pd.Series(year, index=aggregated_df.index),
+        indicator_def_id=indicator_def_id,
+        city_id=CITY_ID,
+        id_lookup=neighbourhood_id_series(neighborhood_ids, CITY_ID)
+    )
+    report_invalid(invalid, len(aggregated_df), f"{indicator_name} {year}")
+    
+    return records
+
+def process_indicator_content(content: bytes, year: int, indicator_name: str, indicator_def_ids: Dict[str, int], neighborhood_ids: Dict[str, int]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Parse and aggregate an already downloaded indicator CSV (runs in a worker process)
+    
+    Args:
+        content: Raw bytes of the CSV file
+        year: Year of the data
+        indicator_name: Name of the indicator (used to map to indicator_def_id)
+        indicator_def_ids: Dictionary mapping indicator names to their IDs
+        neighborhood_ids: Dictionary mapping composite keys (city_id|neighborhood_code) to their IDs
+        
+    Returns:
+        List of indicator records, or None if the file is empty
+    """
+    df = parse_csv_bytes(content, indicator_name)
+    if df.empty:
+        warning(f"Empty file for indicator {indicator_name} year {year}")
+        return None
+    return build_indicator_records(df, year, indicator_name, indicator_def_ids, neighborhood_ids)
+
+def process_indicator_file(url: str, year: int, indicator_name: str, indicator_def_ids: Dict[str, int], neighborhood_ids: Dict[str, int]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Process a single indicator CSV file and return a list of indicator records
+    
+    Args:
+        url: URL of the CSV file
+        year: Year of the data
+        indicator_name: Name of the indicator (used to map to indicator_def_id)
+        indicator_def_ids: Dictionary mapping indicator names to their IDs
+        neighborhood_ids: Dictionary mapping composite keys (city_id|neighborhood_code) to their IDs
+        
+    Returns:
+        List of indicator records, or None if the file could not be downloaded or processed
+    """
     try:
         # Download and read CSV file
-        df = download_csv_from_url(url)
+        df = download_csv_from_url(url, indicator_name)
         
         if df.empty:
             warning(f"Failed to download or empty file: {url}")
-            return results
-        
-        # Show available columns for debugging
-        info(f"Available columns in file: {', '.join(df.columns)}")
+            return None
         
-        # Aggregate by neighborhood
-        aggregated_df = aggregate_by_neighborhood(df, indicator_name)
-        
-        if aggregated_df.empty:
-            warning(f"No data after aggregation for file: {url}")
-            return results
+        return build_indicator_records(df, year, indicator_name, indicator_def_ids, neighborhood_ids)
+            
+    except Exception as e:
+        error(f"Error processing file {url}: {str(e)}")
+        return None
+
+def process_indicator_files_parallel(
+    jobs: List[Tuple[str, int, str]],
+    indicator_def_ids: Dict[str, int],
+    neighborhood_ids: Dict[str, int],
+    download_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+    parse_workers: int = DEFAULT_PARSE_WORKERS,
+    failed: Optional[List[Tuple[str, int, str]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Download indicator files concurrently and parse them in a process pool
+    
+    Each file is handed to the parser pool as soon as its download finishes, so
+    network waits overlap with CSV parsing. Records are merged in job order, so
+    the output is identical to the sequential mode.
+    
+    Args:
+        jobs: (indicator_name, year, url) tuples in manifest order
+        indicator_def_ids: Dictionary mapping indicator names to their IDs
+        neighborhood_ids: Dictionary mapping composite keys (city_id|neighborhood_code) to their IDs
+        download_workers: Number of concurrent downloads
+        parse_workers: Number of parser processes
+        failed: Receives the jobs whose file could not be downloaded or processed
         
-        # Get indicator definition ID
-        db_indicator_name = INDICATOR_MAPPING.get(indicator_name)
-        indicator_def_id = indicator_def_ids.get(db_indicator_name)
+    Returns:
+        List of indicator records
+    """
+    results: Dict[int, List[Dict[str, Any]]] = {}
+    failed = failed if failed is not None else []
+    
+    # "spawn" avoids forking a process that has live download threads
+    mp_context = multiprocessing.get_context("spawn")
+    with ThreadPoolExecutor(max_workers=download_workers) as downloader, \
+            ProcessPoolExecutor(max_workers=parse_workers, mp_context=mp_context) as parser:
         
-        if not indicator_def_id:
-            warning(f"No indicator definition ID found for: {db_indicator_name}")
-            return results
+        downloads = {
+            downloader.submit(instrumentation.bind(raw_cache.fetch), url): index
+            for index, (_, _, url) in enumerate(jobs)
+        }
         
-        # Process each aggregated row
-        for _, row in aggregated_df.iterrows():
-            # Extract neighborhood code
-            neighborhood_code = str(row.get('Codi_Barri'))
-            
-            if not neighborhood_code:
-                warning(f"Missing neighborhood code in row: {row}")
-                continue
-                
-            # Get neighborhood ID using composite key
-            composite_key = f"{CITY_ID}|{int(neighborhood_code)}"
-            geo_id = neighborhood_ids.get(composite_key)
-            
-            if not geo_id:
-                warning(f"No neighborhood ID found for composite key: {composite_key}")
+        parses = {}
+        for future in as_completed(downloads):
+            index = downloads[future]
+            indicator_name, year, url = jobs[index]
+            try:
+                content = future.result()
+            except Exception as e:
+                error(f"Failed to download CSV from {url}: {str(e)}")
+                failed.append(jobs[index])
                 continue
-                
-            # Create indicator record
-            indicator = {
-                "indicator_def_id": indicator_def_id,
-                "geo_level_id": 3,  # Always 3 for neighborhood
-                "geo_id": geo_id,
-                "city_id": CITY_ID,
-                "year": year,
-                "value": float(row.get('Valor', 0))
-            }
-            
-            results.append(indicator)
-            
-    except Exception as e:
-        error(f"Error processing file {url}: {str(e)}")
+            info(f"Downloaded {indicator_name} {year} ({len(content)} bytes), queued for parsing")
+            parses[index] = parser.submit(
+                process_indicator_content, content, year, indicator_name, indicator_def_ids, neighborhood_ids
+            )
         
-    return results
+        for index, future in parses.items():
+            indicator_name, year, url = jobs[index]
+            try:
+                records = future.result()
+            except Exception as e:
+                error(f"Error processing file {url}: {str(e)}")
+                records = None
+            if records is None:
+                failed.append(jobs[index])
+            else:
+                results[index] = records
+    
+    # Deterministic merge in manifest order
+    return [record for index in sorted(results) for record in results[index]]
 
-def run(manifest_path: Path = MANIFEST_PATH, output_path: Path = DEFAULT_OUTPUT_PATH) -> None:
+@instrumentation.instrument("bcn:indicators:etl")
+def run(
+    manifest_path: Path = MANIFEST_PATH,
+    output_path: Path = DEFAULT_OUTPUT_PATH,
+    parallel: bool = False,
+    download_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+    parse_workers: int = DEFAULT_PARSE_WORKERS,
+    sink: Optional[Callable[[List[Dict]], None]] = None
+) -> bool:
     """
     Run the ETL process for Barcelona indicators
     
     Args:
         manifest_path: Path to the files manifest JSON
         output_path: Path to save the processed JSON file
+        parallel: Download files concurrently and parse them in a process pool
+        download_workers: Number of concurrent downloads (parallel mode only)
+        parse_workers: Number of parser processes (parallel mode only)
+        sink: Receives the records of each file as soon as it is processed (pipelined upload)
+    
+    Returns:
+        bool: False if the IDs or manifest could not be loaded or no indicator records were processed
     """
     info("Starting Barcelona indicators ETL process")
     
@@ -355,7 +516,7 @@ def run(manifest_path: Path = MANIFEST_PATH, output_path: Path = DEFAULT_OUTPUT_
     supabase = get_supabase_client()
     if not supabase:
         error("Failed to initialize Supabase client. Exiting.")
-        return
+        return False
     
     # Get indicator definition IDs and neighborhood IDs
     indicator_def_ids = get_indicator_def_ids(supabase)
@@ -363,7 +524,7 @@ def run(manifest_path: Path = MANIFEST_PATH, output_path: Path = DEFAULT_OUTPUT_
     
     if not indicator_def_ids or not neighborhood_ids:
         error("Failed to retrieve necessary IDs from Supabase. Exiting.")
-        return
+        return False
     
     # Load manifest file
     try:
@@ -371,43 +532,74 @@ def run(manifest_path: Path = MANIFEST_PATH, output_path: Path = DEFAULT_OUTPUT_
             manifest = json.load(f)
     except Exception as e:
         error(f"Failed to load manifest file: {str(e)}")
-        return
-    
-    all_indicators = []
+        return False
     
-    # Process each indicator type from manifest
+    # Collect (indicator, year, url) jobs from manifest
+    jobs = []
     for indicator_name, years in manifest['barcelona']['indicators']['raw_file'].items():
         if indicator_name not in INDICATOR_MAPPING:
             warning(f"No mapping found for indicator: {indicator_name}")
             continue
             
-        info(f"Processing indicator: {indicator_name}")
-        
-        # Process each year file
         for year, data in years.items():
             url = data['raw_file']
             if not url:
                 warning(f"No URL found for {indicator_name} year {year}")
                 continue
-                
-            info(f"Processing file for year {year}: {url}")
-            indicators = process_indicator_file(url, int(year), indicator_name, indicator_def_ids, neighborhood_ids)
-            all_indicators.extend(indicators)
+            jobs.append((indicator_name, int(year), url))
     
-    # Save results
-    if all_indicators:
-        info(f"Saving {len(all_indicators)} indicator records to {output_path}")
-        
-        # Ensure output directory exists
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Write to JSON file
-        with output_path.open("w", encoding="utf-8") as f:
-            json.dump(all_indicators, f, ensure_ascii=False, indent=2)
-            
-        success(f"Successfully saved indicators to {output_path}")
-    else:
-        warning("No indicator records were processed")
+    # Skip everything below if the files, IDs and code are unchanged
+    stage = fingerprint.Stage(output_path, code=[__file__, indicator_records], inputs=[url for _, _, url in jobs],
+                              params={"jobs": jobs, "indicator_def_ids": indicator_def_ids,
+                                      "neighborhood_ids": neighborhood_ids})
+    if stage.reuse(sink):
+        return True
+    
+    # Records are appended to the output as each file is processed; a run that
+    # produces nothing keeps the previous output. Failed files are listed in the
+    # output's .incomplete marker, so the upload does not delete their records
+    writer = ndjson.Writer(output_path, lazy=True)
+    failed = []
+    try:
+        if parallel:
+            info(f"Processing {len(jobs)} files with {download_workers} downloaders and {parse_workers} parser processes")
+            all_indicators = process_indicator_files_parallel(
+                jobs, indicator_def_ids, neighborhood_ids, download_workers, parse_workers, failed
+            )
+            writer.write_many(all_indicators)
+            if sink:
+                sink(all_indicators)
+        else:
+            # Process each year file one at a time
+            for indicator_name, year, url in jobs:
+                info(f"Processing {indicator_name} file for year {year}: {url}")
+                indicators = process_indicator_file(url, year, indicator_name, indicator_def_ids, neighborhood_ids)
+                if indicators is None:
+                    failed.append((indicator_name, year, url))
+                    continue
+                writer.write_many(indicators)
+                if sink:
+                    sink(indicators)
+    except Exception as e:
+        writer.mark_incomplete(f"run interrupted: {e}")
+        raise
+    finally:
+        for indicator_name, year, url in failed:
+            writer.mark_incomplete(f"{indicator_name} {year}: {url}")
+        writer.close()
+    
+    if failed:
+        warning(f"{len(failed)} of {len(jobs)} indicator files failed; the output is marked incomplete")
+    
+    # Save results (a run with failed files is not reused next time)
+    if writer.count:
+        if not failed:
+            stage.save()
+        instrumentation.count("records_out", writer.count)
+        success(f"Successfully saved {writer.count} indicator records to {output_path}")
+        return True
+    error("No indicator records were processed")
+    return False
 
 if __name__ == "__main__":
     import argparse
@@ -415,6 +607,18 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="ETL script for loading Barcelona indicators")
     parser.add_argument("--manifest_path", type=str, default=str(MANIFEST_PATH))
     parser.add_argument("--output_path", type=str, default=str(DEFAULT_OUTPUT_PATH))
+    parser.add_argument("--parallel", action="store_true", help="Download files concurrently and parse them in a process pool")
+    parser.add_argument("--download_workers", type=int, default=DEFAULT_DOWNLOAD_WORKERS)
+    parser.add_argument("--parse_workers", type=int, default=DEFAULT_PARSE_WORKERS)
     
+    profiling.add_arguments(parser)
+
     args = parser.parse_args()
-    run(manifest_path=Path(args.manifest_path), output_path=Path(args.output_path))
\ No newline at end of file
+    profiling.configure_from_args(args)
+    run(
+        manifest_path=Path(args.manifest_path),
+        output_path=Path(args.output_path),
+        parallel=args.parallel,
+        download_workers=args.download_workers,
+        parse_workers=args.parse_workers
+    )
\ No newline at end of file
@@ -7,7 +7,8 @@ This script performs the following tasks:
 - Downloads neighbourhood data from Supabase public storage.
 - Fetches the district mapping from Supabase DB to link each neighbourhood to a district_id.
 - Validates and transforms the raw data.
-- Outputs a clean JSON file ready for Supabase insertion.
+- Outputs a clean NDJSON file ready for Supabase insertion.
+- Skips the run when input, district IDs and code are unchanged (see fingerprint.py).
 
 Author: Nico D'Alessandro Calderon
 Email: nicodalessandro11@gmail.com
@@ -17,14 +18,15 @@ License: MIT License
 """
 
 import json
-import requests
 from shapely import wkt
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, List, Optional
 from dotenv import load_dotenv
 import os
 from supabase import create_client, Client
 from shared.common_lib.emoji_logger import info, success, warning, error
+from shared.common_lib import raw_cache, instrumentation, profiling, ndjson
+from auq_data_engine import geometry, fingerprint
 
 # =====================
 # Configuration
@@ -71,11 +73,13 @@ def get_district_map(city_id: int) -> Dict[str, int]:
 # Main ETL Logic
 # =====================
 
+@instrumentation.instrument("bcn:neighbourhoods:etl")
 def run(
     input_url: str = INPUT_URL,
     output_path: Path = DEFAULT_OUTPUT_PATH,
-    city_id: int = CITY_ID
-) -> None:
+    city_id: int = CITY_ID,
+    sink: Optional[Callable[[List[Dict]], None]] = None
+) -> bool:
     """
     Main ETL function for loading neighbourhoods in Barcelona.
 
@@ -83,24 +87,33 @@ def run(
         input_url (str): URL to fetch raw data.
         output_path (Path): Output file path.
         city_id (int): City ID to associate the neighbourhoods with.
+        sink (callable, optional): Receives the processed records (pipelined upload).
+
+    Returns:
+        bool: True if the output was written or reused, False if the input could not be fetched.
     """
     info("Starting ETL process for Barcelona neighbourhoods...")
     info(f"Fetching data from: {input_url}")
 
     try:
-        response = requests.get(input_url)
-        response.raise_for_status()
-        raw_data = response.json()
-        success("Neighbourhood data successfully downloaded.")
+        district_map = get_district_map(city_id)
     except Exception as e:
-        error(f"Failed to download or parse input data: {e}")
-        return
+        error(f"Failed to fetch district map: {e}")
+        return False
+
+    # The district IDs come from the database, so they are part of the fingerprint
+    stage = fingerprint.Stage(output_path, code=[__file__, geometry], inputs=[input_url],
+                              params={"city_id": city_id, "geom_encoding": geometry.ENCODING,
+                                      "district_map": district_map})
+    if stage.reuse(sink):
+        return True
 
     try:
-        district_map = get_district_map(city_id)
+        raw_data = json.loads(raw_cache.fetch(input_url))
+        success("Neighbourhood data successfully downloaded.")
     except Exception as e:
-        error(f"Failed to fetch district map: {e}")
-        return
+        error(f"Failed to download or parse input data: {e}")
+        return False
 
     prepared_data = []
     skipped_entries = []
@@ -125,23 +138,26 @@ def run(
                 skipped_entries.append(name)
                 continue
 
-            _ = wkt.loads(wkt_geom)  # Validate geometry
+            shape = wkt.loads(wkt_geom)  # Validate geometry
 
             prepared_data.append({
                 "name": name,
                 "neighbourhood_code": code,
                 "district_id": district_id,
                 "city_id": city_id,
-                "geom": f"SRID=4326;{wkt_geom}"
+                "geom": geometry.encode(shape, source_wkt=wkt_geom)
             })
 
         except Exception as e:
             warning(f"Error in neighbourhood '{b.get('nom_barri', 'unknown')}': {e}")
             skipped_entries.append(name)
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(prepared_data, f, ensure_ascii=False, indent=2)
+    ndjson.write_records(output_path, prepared_data)
+    stage.save()
+    instrumentation.count("records_in", len(raw_data))
+    instrumentation.count("records_out", len(prepared_data))
+    if sink:
+        sink(prepared_data)
 
     # Summary
     info(f"Total neighbourhoods in input: {len(raw_data)}")
@@ -149,6 +165,7 @@ def run(
     if skipped_entries:
         warning(f"Skipped entries: {len(skipped_entries)} – {set(skipped_entries)}")
     success(f"Output saved to: {output_path}")
+    return True
 
 
 # =====================
@@ -163,7 +180,10 @@ if __name__ == "__main__":
     parser.add_argument("--output_path", type=str, default=str(DEFAULT_OUTPUT_PATH), help="Output path for the processed JSON file.")
     parser.add_argument("--city_id", type=int, default=CITY_ID, help="Numeric ID of the city (default: 1 = Barcelona)")
 
+    profiling.add_arguments(parser)
+
     args = parser.parse_args()
+    profiling.configure_from_args(args)
     run(
         input_url=args.input_url,
         output_path=Path(args.output_path),
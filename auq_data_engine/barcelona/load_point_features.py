@@ -7,7 +7,8 @@ This script performs the following tasks:
 - Load point features data from Barcelona Open Data API.
 - Processes each file according to its specific format and encoding
 - Transforms the data into a standardized format for database insertion
-- Saves the processed point features as a JSON file in the /data/processed folder
+- Saves the processed point features as an NDJSON file in the /data/processed folder
+- Skips the run when the API response, database IDs and code are unchanged (see fingerprint.py)
 
 Usage:
     python load_point_features.py
@@ -23,15 +24,17 @@ License: MIT License
 import json
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import requests
 import urllib.parse
-import time
 
 from shared.common_lib.emoji_logger import info, success, warning, error, debug
+from shared.common_lib import raw_cache, instrumentation, profiling, ndjson
+from shared.common_lib.diagnostics import Diagnostics
+from auq_data_engine import spatial_join, fingerprint
 
 
 # ============================
@@ -165,60 +168,53 @@ def generate_url(resource_id: str) -> str:
     query_string = urllib.parse.urlencode({"sql": sql})
     return base_url + query_string
 
-def fetch_data(url: str, max_retries: int = 3, timeout: int = 30) -> Optional[Dict]:
+def fetch_data(url: str) -> Optional[Dict]:
     """
-    Fetch data from Barcelona Open Data API with retry mechanism and timeout.
+    Fetch data from Barcelona Open Data API.
+    
+    The response goes through the raw cache, so an unchanged result is revalidated
+    instead of downloaded again; timeouts, connection retries and backoff are handled
+    by the shared HTTP transport (`shared.common_lib.http_client`).
     
     Args:
         url (str): The API URL to fetch data from
-        max_retries (int): Maximum number of retry attempts
-        timeout (int): Request timeout in seconds
         
     Returns:
         Optional[Dict]: The fetched data or None if there was an error
     """
-    retry_delay = 1  # Initial delay in seconds
-    
-    for attempt in range(max_retries):
-        try:
-            debug(f"Fetching data from Barcelona API (attempt {attempt + 1}/{max_retries})")
-            response = requests.get(url, timeout=timeout)
-            response.raise_for_status()
-            
-            data = response.json()
-            if not data:
-                warning("Empty response from API")
-                continue
-                
-            if 'result' not in data:
-                warning("Invalid response format: missing 'result' key")
-                continue
-                
-            if 'records' not in data['result']:
-                warning("Invalid response format: missing 'records' key")
-                continue
-                
-            info(f"Successfully fetched {len(data['result']['records'])} records")
-            return data
-            
-        except requests.exceptions.Timeout:
-            warning(f"Request timed out after {timeout} seconds")
-        except requests.exceptions.ConnectionError:
-            warning("Connection error occurred")
-        except requests.exceptions.HTTPError as e:
-            warning(f"HTTP error occurred: {str(e)}")
-        except json.JSONDecodeError:
-            warning("Failed to parse JSON response")
-        except Exception as e:
-            warning(f"Unexpected error: {str(e)}")
-            
-        if attempt < max_retries - 1:
-            retry_delay *= 2  # Exponential backoff
-            debug(f"Retrying in {retry_delay} seconds...")
-            time.sleep(retry_delay)
+    try:
+        debug("Fetching data from Barcelona API")
+        data = json.loads(raw_cache.fetch(url))
+    except requests.exceptions.Timeout:
+        error("Request timed out")
+        return None
+    except requests.exceptions.ConnectionError:
+        error("Connection error occurred")
+        return None
+    except requests.exceptions.HTTPError as e:
+        error(f"HTTP error occurred: {str(e)}")
+        return None
+    except json.JSONDecodeError:
+        error("Failed to parse JSON response")
+        return None
+    except Exception as e:
+        error(f"Unexpected error: {str(e)}")
+        return None
     
-    error(f"Failed to fetch data after {max_retries} attempts")
-    return None
+    if not data:
+        warning("Empty response from API")
+        return None
+        
+    if 'result' not in data:
+        warning("Invalid response format: missing 'result' key")
+        return None
+        
+    if 'records' not in data['result']:
+        warning("Invalid response format: missing 'records' key")
+        return None
+        
+    info(f"Successfully fetched {len(data['result']['records'])} records")
+    return data
 
 # ===================
 # File Processors
@@ -237,6 +233,7 @@ def process_records(data: Dict, feature_defs: Dict[str, int], supabase: Client)
         List of processed records ready for database insertion
     """
     processed_records = []
+    diag = Diagnostics("point_features/bcn")
     
     try:
         # Get the records from the response
@@ -253,14 +250,14 @@ def process_records(data: Dict, feature_defs: Dict[str, int], supabase: Client)
                 # Extract required fields
                 name = record.get('name', '')
                 if not name:
-                    warning("Skipping record with missing name")
+                    diag.count("missing name", sample=record)
                     continue
                     
                 # Get coordinates directly from record
                 lon = record.get('geo_epgs_4326_lon')
                 lat = record.get('geo_epgs_4326_lat')
                 if not lon or not lat:
-                    warning(f"Skipping record with missing coordinates: {name}")
+                    diag.count("missing coordinates", sample=record)
                     continue
                 
                 # Convert coordinates to float
@@ -268,7 +265,7 @@ def process_records(data: Dict, feature_defs: Dict[str, int], supabase: Client)
                     lon = float(lon)
                     lat = float(lat)
                 except (ValueError, TypeError):
-                    warning(f"Invalid coordinate format: lon={lon}, lat={lat}")
+                    diag.count("invalid coordinate format", sample=record)
                     continue
                     
                 # Get address information
@@ -284,25 +281,22 @@ def process_records(data: Dict, feature_defs: Dict[str, int], supabase: Client)
                 # Get feature definition ID
                 feature_type = record.get('secondary_filters_name')
                 if not feature_type:
-                    warning(f"Missing feature type for: {name}")
+                    diag.count("missing feature type", sample=record)
                     continue
                     
                 # Map the feature type to the database feature definition
                 mapped_feature = FEATURE_MAPPING.get(feature_type)
                 if not mapped_feature:
-                    warning(f"No feature mapping found for: {feature_type}")
+                    diag.count(f"no feature mapping for '{feature_type}'", sample=name)
                     continue
                     
                 feature_def_id = feature_defs.get(mapped_feature)
                 if not feature_def_id:
-                    warning(f"No feature definition found for type: {mapped_feature}")
+                    diag.count(f"no feature definition for '{mapped_feature}'", sample=name)
                     continue
                 
-                # Get neighbourhood ID
+                # API-provided neighbourhood ID; checked and completed by the spatial join
                 neighbourhood_id = record.get('addresses_neighborhood_id')
-                if not neighbourhood_id:
-                    warning(f"Record '{name}' is missing neighbourhood_id in the API response")
-                    continue
                 
                 # Create the point feature record
                 point_feature = {
@@ -321,15 +315,16 @@ def process_records(data: Dict, feature_defs: Dict[str, int], supabase: Client)
                     "city_id": CITY_ID,
                     "geo_level_id": GEO_LEVELS["Neighbourhood"],
                     "feature_definition_id": feature_def_id,
-                    "geo_id": int(neighbourhood_id)
+                    "geo_id": int(neighbourhood_id) if neighbourhood_id else None
                 }
                 
                 processed_records.append(point_feature)
                 
             except Exception as e:
-                warning(f"Error processing record: {str(e)}")
+                diag.count(f"error: {type(e).__name__}", sample=str(e))
                 continue
                 
+        diag.report()
         info(f"Successfully processed {len(processed_records)} records")
         return processed_records
         
@@ -341,13 +336,22 @@ def process_records(data: Dict, feature_defs: Dict[str, int], supabase: Client)
 # Core ETL Process
 # ===================
 
-def run(output_path: Path = DEFAULT_OUTPUT_PATH, manifest_path: Path = None) -> None:
+@instrumentation.instrument("bcn:point_features:etl")
+def run(
+    output_path: Path = DEFAULT_OUTPUT_PATH,
+    manifest_path: Path = None,
+    sink: Optional[Callable[[List[Dict]], None]] = None
+) -> bool:
     """
     Main execution logic to fetch, process, and store point feature data.
     
     Args:
         output_path: Path where to save the processed data
         manifest_path: Path to the api-file-manifest.json file
+        sink: Receives the processed records (pipelined upload)
+    
+    Returns:
+        bool: False if the data could not be fetched or no point features were processed
     """
     info(f"Starting ETL process for Barcelona point features...")
     
@@ -355,14 +359,19 @@ def run(output_path: Path = DEFAULT_OUTPUT_PATH, manifest_path: Path = None) ->
     supabase = get_supabase_client()
     if not supabase:
         error("Failed to initialize Supabase client. Exiting.")
-        return
+        return False
     
     # Load feature definitions from database
     global FEATURE_DEFINITIONS
     FEATURE_DEFINITIONS = load_feature_definitions(supabase)
     
+    # Neighbourhood IDs used by the spatial join
+    code_index = spatial_join.load_code_index(supabase, CITY_ID)
+    
     # Process all features
     all_processed_data = []
+    failed = []  # failures listed in the output's .incomplete marker
+    stage = None
     
     try:
         # Load the resource ID from the api-file-manifest.json file
@@ -379,25 +388,45 @@ def run(output_path: Path = DEFAULT_OUTPUT_PATH, manifest_path: Path = None) ->
         url = generate_url(resource_id)
         debug(f"Generated URL: {url}")
         
+        # Skip everything below if the response, IDs and code are unchanged
+        stage = fingerprint.Stage(output_path, code=[__file__, spatial_join], inputs=[url],
+                                  files=[spatial_join.neighbourhoods_path("bcn")],
+                                  params={"feature_definitions": FEATURE_DEFINITIONS, "neighbourhood_ids": code_index})
+        if stage.reuse(sink):
+            return True
+        
         # Fetch and process data
         data = fetch_data(url)
         if data:
+            instrumentation.count("records_in", len(data['result']['records']))
             processed_data = process_records(data, FEATURE_DEFINITIONS, supabase)
             all_processed_data.extend(processed_data)
         else:
             error("Failed to fetch data")
+            failed.append(f"fetch: {url}")
             
     except Exception as e:
         error(f"Error processing data: {str(e)}")
+        failed.append(f"run: {e}")
+    
+    # Assign neighbourhoods by polygon containment
+    spatial_join.join_city(all_processed_data, "bcn", code_index)
     
     # Save the processed data
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(all_processed_data, f, ensure_ascii=False, indent=2)
+    ndjson.write_records(output_path, all_processed_data, incomplete=failed)
+    if stage and all_processed_data and not failed:
+        stage.save()
+    instrumentation.count("records_out", len(all_processed_data))
+    if sink:
+        sink(all_processed_data)
     
     # Summary log
     info(f"Total point features processed: {len(all_processed_data)}")
     success(f"Output saved to: {output_path}")
+    if failed and not all_processed_data:
+        error("No point features were processed")
+        return False
+    return True
 
 # ==========================
 # CLI Entry Point
@@ -410,5 +439,8 @@ if __name__ == "__main__":
     parser.add_argument("--output_path", type=str, default=str(DEFAULT_OUTPUT_PATH), 
                       help="Path where to save the processed data.")
     
+    profiling.add_arguments(parser)
+
     args = parser.parse_args()
+    profiling.configure_from_args(args)
     run(output_path=Path(args.output_path))
\ No newline at end of file
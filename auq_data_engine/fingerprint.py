@@ -0,0 +1,204 @@
+# auq_data_engine/fingerprint.py
+
+"""
+ETL Utility: Content-Hash Stage Skipping
+
+- Every loader stage records a fingerprint next to its output
+  (insert_ready_<table>_<city>.fingerprint.json) with:
+  the SHA-256 of each raw input (from the raw cache), of local input files,
+  of its parameters (e.g. database ID maps, geometry encoding) and of its code
+- When the fingerprint of a new run matches and the output is intact, the stage
+  is skipped and the existing output is reused (and handed to the sink, if any)
+- Raw inputs are revalidated through the raw cache, so an unchanged source costs a
+  304 round-trip and nothing is transformed again
+- Stages are never skipped with --force (AUQ_FORCE=1) or when the raw cache is
+  disabled (--no-cache), since input hashes then require a full download
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import os
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from shared.common_lib.emoji_logger import info, success, warning, debug
+from shared.common_lib import raw_cache, json_stream, ndjson, instrumentation
+
+# ==================
+# Configuration
+# ==================
+
+FORMAT_VERSION = 1
+FORCE = os.getenv("AUQ_FORCE", "0") == "1"
+
+HASH_WORKERS = 8  # concurrent raw cache revalidations
+SINK_BATCH_SIZE = 1000  # records per sink call when a cached output is reused
+CHUNK_SIZE = 1024 * 1024
+
+
+def set_force(force: bool) -> None:
+    """Re-run every stage even when its fingerprint is unchanged."""
+    global FORCE
+    FORCE = force
+    if force:
+        info("Stage fingerprints ignored (--force): every stage runs")
+
+# ==================
+# Hashing
+# ==================
+
+def file_hash(path: Path) -> str:
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def value_hash(value: Any) -> str:
+    """SHA-256 of a JSON-serialisable value (canonical: sorted keys, no whitespace)."""
+    canonical = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def fingerprint_path(output_path: Path) -> Path:
+    """insert_ready_x.json -> insert_ready_x.fingerprint.json"""
+    output_path = Path(output_path)
+    return output_path.with_name(f"{output_path.stem}.fingerprint.json")
+
+# ==================
+# Stage
+# ==================
+
+class Stage:
+    """
+    Fingerprint of one loader stage.
+
+    Args:
+        output_path: The stage's insert-ready JSON file
+        code: Modules (or source files) whose code determines the output
+        inputs: Raw input URLs, hashed through the raw cache
+        files: Local input files
+        params: Other values the output depends on (JSON-serialisable)
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        code: Iterable[Union[ModuleType, str, Path]],
+        inputs: Iterable[str] = (),
+        files: Iterable[Path] = (),
+        params: Optional[Dict[str, Any]] = None
+    ):
+        self.output_path = Path(output_path)
+        self.path = fingerprint_path(self.output_path)
+        self.code = [Path(c.__file__ if isinstance(c, ModuleType) else c) for c in code]
+        self.inputs = list(dict.fromkeys(inputs))
+        self.files = [Path(f) for f in files]
+        self.params = params or {}
+        self._current: Optional[Dict[str, Any]] = None
+
+    def compute(self) -> Optional[Dict[str, Any]]:
+        """
+        Fingerprint of the current inputs, parameters and code.
+
+        Returns:
+            Optional[Dict[str, Any]]: None when an input cannot be hashed
+        """
+        if self._current is not None:
+            return self._current
+        if self.inputs and not raw_cache.enabled():
+            return None
+        try:
+            with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+                input_hashes = list(pool.map(instrumentation.bind(raw_cache.content_hash), self.inputs))
+            self._current = {
+                "version": FORMAT_VERSION,
+                "code": {path.name: file_hash(path) for path in self.code},
+                "inputs": dict(zip(self.inputs, input_hashes)),
+                "files": {path.name: file_hash(path) for path in self.files},
+                "params": {name: value_hash(value) for name, value in sorted(self.params.items())},
+            }
+        except Exception as e:
+            warning(f"Could not fingerprint the inputs of {self.output_path.name}: {e}")
+            return None
+        return self._current
+
+    def _stored(self) -> Optional[Dict[str, Any]]:
+        try:
+            with self.path.open(encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def changes(self) -> List[str]:
+        """
+        Why the stage has to run (empty when the stored fingerprint still holds).
+
+        Returns:
+            List[str]: Human-readable reasons
+        """
+        current = self.compute()
+        if current is None:
+            return ["inputs could not be fingerprinted"]
+        stored = self._stored()
+        if stored is None:
+            return ["no fingerprint"]
+        if not self.output_path.exists() or stored.get("output") != file_hash(self.output_path):
+            return ["output missing or modified"]
+
+        reasons = []
+        for section in ("version", "code", "inputs", "files", "params"):
+            if section == "version":
+                if stored.get("version") != current["version"]:
+                    reasons.append("fingerprint format changed")
+                continue
+            before, now = stored.get(section, {}), current[section]
+            changed = sorted(k for k in set(before) | set(now) if before.get(k) != now.get(k))
+            if changed:
+                reasons.append(f"{section} changed: {', '.join(changed)}")
+        return reasons
+
+    def reuse(self, sink: Optional[Callable[[List[Dict]], None]] = None) -> bool:
+        """
+        Skip the stage if its fingerprint is unchanged.
+
+        Args:
+            sink: Receives the cached records (pipelined upload)
+
+        Returns:
+            bool: True if the existing output was reused and the stage should return
+        """
+        if FORCE:
+            return False
+        reasons = self.changes()
+        if reasons:
+            debug(f"Running stage for {self.output_path.name}: {'; '.join(reasons)}")
+            return False
+
+        success(f"Skipping stage: {self.output_path.name} is up to date (inputs, parameters and code unchanged)")
+        instrumentation.count("stages_reused")
+        if sink:
+            for batch in json_stream.iter_batches(ndjson.iter_records(self.output_path), SINK_BATCH_SIZE):
+                sink(batch)
+        return True
+
+    def save(self) -> None:
+        """Record the fingerprint for the output that was just written."""
+        current = self.compute()
+        if current is None or not self.output_path.exists():
+            return
+        record = dict(current, output=file_hash(self.output_path))
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,117 @@
+# auq_data_engine/geometry.py
+
+"""
+Geometry Encoding for Insert-Ready Records
+
+Encodes the `geom` value of districts and neighbourhoods in one of three forms,
+selected with AUQ_GEOM_ENCODING:
+
+- wkt (default): "SRID=4326;<WKT>" at full precision (unchanged output)
+- wkt7: "SRID=4326;<WKT>" with coordinates rounded to 7 decimals (~1 cm),
+  about 45% smaller than full-precision WKT on the neighbourhood files
+- ewkb: hex-encoded EWKB with SRID 4326 (lossless, no text formatting or parsing of numbers)
+
+PostGIS accepts all three as input for a geometry column. Every non-default
+encoding is decoded again and compared with the source geometry; a geometry that
+does not survive the round trip is emitted as full-precision WKT instead.
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import os
+from typing import Optional
+
+import shapely
+from shapely import wkt
+
+from shared.common_lib.emoji_logger import warning
+
+# ==================
+# Configuration
+# ==================
+
+SRID = 4326
+ENCODINGS = ("wkt", "wkt7", "ewkb")
+ENCODING = os.getenv("AUQ_GEOM_ENCODING", "wkt")
+
+WKT7_DECIMALS = 7
+# Rounding to 7 decimals moves a coordinate by at most 5e-8 degrees
+ROUND_TRIP_TOLERANCE = 1e-7
+
+HEX_DIGITS = set("0123456789abcdefABCDEF")
+
+
+def set_encoding(encoding: str) -> None:
+    """Select the geometry encoding for this run ("wkt", "wkt7" or "ewkb")."""
+    global ENCODING
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown geometry encoding '{encoding}'. Choose one of {ENCODINGS}")
+    ENCODING = encoding
+
+# ==================
+# Encode / Decode
+# ==================
+
+def _full_wkt(geom, source_wkt: Optional[str]) -> str:
+    return f"SRID={SRID};{source_wkt if source_wkt is not None else wkt.dumps(geom)}"
+
+
+def encode(geom, source_wkt: Optional[str] = None, encoding: Optional[str] = None) -> str:
+    """
+    Encode a geometry for the `geom` column.
+
+    Args:
+        geom: Shapely geometry
+        source_wkt: Original WKT text, reused verbatim by the "wkt" encoding
+        encoding: Override of the configured encoding
+
+    Returns:
+        str: EWKT or hex EWKB
+    """
+    encoding = encoding or ENCODING
+    if encoding == "wkt":
+        return _full_wkt(geom, source_wkt)
+
+    if encoding == "wkt7":
+        encoded = f"SRID={SRID};{shapely.to_wkt(geom, rounding_precision=WKT7_DECIMALS, trim=True)}"
+    elif encoding == "ewkb":
+        encoded = shapely.to_wkb(shapely.set_srid(geom, SRID), hex=True, include_srid=True)
+    else:
+        raise ValueError(f"Unknown geometry encoding '{encoding}'. Choose one of {ENCODINGS}")
+
+    if not round_trips(geom, encoded):
+        warning(f"Geometry changed when encoded as {encoding}; keeping full-precision WKT")
+        return _full_wkt(geom, source_wkt)
+    return encoded
+
+
+def decode(text: str):
+    """
+    Decode any `geom` value produced by `encode` (EWKT, WKT or hex EWKB).
+
+    Returns:
+        Shapely geometry (without SRID)
+    """
+    text = text.strip()
+    if text.startswith("0") and set(text) <= HEX_DIGITS:
+        return shapely.set_srid(shapely.from_wkb(bytes.fromhex(text)), 0)
+    if text.startswith("SRID="):
+        text = text.split(";", 1)[1]
+    return shapely.from_wkt(text)
+
+
+def round_trips(geom, encoded: str) -> bool:
+    """
+    Check that an encoded geometry decodes to the source geometry.
+
+    Coordinates must agree within ROUND_TRIP_TOLERANCE, and a valid
+    source geometry must still be valid after rounding.
+    """
+    decoded = decode(encoded)
+    if not decoded.equals_exact(geom, ROUND_TRIP_TOLERANCE):
+        return False
+    return decoded.is_valid or not geom.is_valid
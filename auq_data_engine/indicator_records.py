@@ -0,0 +1,175 @@
+# auq_data_engine/indicator_records.py
+
+"""
+Indicator Record Builder
+
+- Maps neighbourhood codes to database IDs with a code→id Series
+- Coerces codes, years and values column-wise (comma decimals included)
+- Emits insert-ready indicator records straight from the columns
+- Counts invalid rows per reason instead of logging every row
+- Detects the encoding of raw indicator CSVs (UTF-8 or Latin-1)
+
+Shared by the Barcelona and Madrid indicator loaders.
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import codecs
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+from shared.common_lib.emoji_logger import info, warning
+
+GEO_LEVEL_NEIGHBOURHOOD = 3
+
+# Column order of the insert-ready records
+RECORD_COLUMNS = ["indicator_def_id", "geo_level_id", "geo_id", "city_id", "year", "value"]
+
+# Bytes of a CSV file decoded to detect its encoding
+ENCODING_SNIFF_BYTES = 64 * 1024
+
+# ===================
+# Encoding Detection
+# ===================
+
+def detect_encoding(content: bytes) -> str:
+    """
+    Detect the encoding of a CSV file from a small byte prefix
+
+    Args:
+        content: Raw bytes of the CSV file
+
+    Returns:
+        'utf-8-sig' or 'utf-8' if the prefix decodes as UTF-8, 'latin1' otherwise
+    """
+    if content.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # final=False: a multi-byte character cut at the end of the prefix is not an error
+        codecs.getincrementaldecoder('utf-8')().decode(content[:ENCODING_SNIFF_BYTES], final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin1'
+
+# ===================
+# Column Coercion
+# ===================
+
+def neighbourhood_id_series(neighborhood_ids: Dict[str, int], city_id: int) -> pd.Series:
+    """
+    Build a code→id lookup Series for one city
+
+    Args:
+        neighborhood_ids: Dictionary mapping composite keys (city_id|neighborhood_code) to their IDs
+        city_id: City whose neighbourhoods are kept
+
+    Returns:
+        pd.Series indexed by integer neighbourhood code
+    """
+    prefix = f"{city_id}|"
+    lookup = {
+        int(key[len(prefix):]): geo_id
+        for key, geo_id in neighborhood_ids.items()
+        if key.startswith(prefix)
+    }
+    return pd.Series(lookup, dtype="Int64")
+
+
+def to_integer_codes(column: pd.Series) -> pd.Series:
+    """
+    Coerce codes such as "12", " 12 " or "12.0" to nullable integers (invalid → <NA>)
+    """
+    numeric = pd.to_numeric(column.astype("string").str.strip(), errors="coerce")
+    whole = numeric.notna() & (numeric % 1 == 0)
+    return numeric.where(whole).astype("Int64")
+
+
+def to_float_values(column: pd.Series) -> pd.Series:
+    """
+    Coerce values to float, accepting comma decimals ("12,5" → 12.5); invalid → NaN
+    """
+    if pd.api.types.is_numeric_dtype(column):
+        return column.astype("float64")
+    text = column.astype("string").str.strip().str.replace(",", ".", regex=False)
+    return pd.to_numeric(text, errors="coerce").astype("float64")
+
+# ===================
+# Record Builder
+# ===================
+
+def build_records(
+    codes: pd.Series,
+    values: pd.Series,
+    years: pd.Series,
+    indicator_def_id: int,
+    city_id: int,
+    id_lookup: pd.Series
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Build indicator records from aligned code, value and year columns
+
+    Args:
+        codes: Neighbourhood codes (any dtype)
+        values: Indicator values (numbers or strings with comma decimals)
+        years: Years (scalar-broadcast Series or per-row)
+        indicator_def_id: Indicator definition ID
+        city_id: City ID
+        id_lookup: Series from `neighbourhood_id_series`
+
+    Returns:
+        (records, invalid) where invalid maps each rejection reason to its row count
+    """
+    codes = to_integer_codes(codes)
+    values = to_float_values(values)
+    years = to_integer_codes(years)
+    geo_ids = codes.map(id_lookup)
+
+    # Each row is rejected for the first reason it fails
+    reasons = {
+        "invalid_neighbourhood_code": codes.isna(),
+        "unknown_neighbourhood": geo_ids.isna(),
+        "invalid_year": years.isna(),
+        "invalid_value": values.isna(),
+    }
+    invalid = {}
+    rejected = pd.Series(False, index=codes.index)
+    for reason, mask in reasons.items():
+        hits = mask & ~rejected
+        if hits.any():
+            invalid[reason] = int(hits.sum())
+        rejected |= mask
+    keep = ~rejected.to_numpy()
+
+    n = int(keep.sum())
+    frame = pd.DataFrame({
+        "indicator_def_id": np.full(n, indicator_def_id, dtype="int64"),
+        "geo_level_id": np.full(n, GEO_LEVEL_NEIGHBOURHOOD, dtype="int64"),
+        "geo_id": geo_ids.to_numpy()[keep].astype("int64"),
+        "city_id": np.full(n, city_id, dtype="int64"),
+        "year": years.to_numpy()[keep].astype("int64"),
+        "value": values.to_numpy()[keep],
+    }, columns=RECORD_COLUMNS)
+    return frame.to_dict("records"), invalid
+
+
+def report_invalid(invalid: Dict[str, int], total_rows: int, label: str) -> None:
+    """
+    Log a one-line count per rejection reason
+
+    Args:
+        invalid: Rejection counts from `build_records`
+        total_rows: Number of input rows
+        label: What was processed (used in the log lines)
+    """
+    if not invalid:
+        info(f"{label}: all {total_rows} rows valid")
+        return
+    for reason, count in invalid.items():
+        share = (count / total_rows) * 100 if total_rows else 0
+        warning(f"{label}: {count} of {total_rows} rows rejected ({reason}, {share:.1f}%)")
@@ -16,9 +16,11 @@ License: MIT License
 import requests
 import json
 import pandas as pd
+from io import BytesIO
 from pathlib import Path
-from typing import Dict, Union, Optional
+from typing import Dict, Iterator, List, Union, Optional
 from shared.common_lib.emoji_logger import info, success, warning, error, debug
+from shared.common_lib import raw_cache, json_stream
 
 # ============================
 # Configuration & Constants
@@ -26,11 +28,16 @@ from shared.common_lib.emoji_logger import info, success, warning, error, debug
 
 BASE_URL = "https://datos.madrid.es/egob/catalogo/"
 DEFAULT_ENCODING = "utf-8"
+DEFAULT_BATCH_SIZE = 500  # @graph items per batch in streaming mode
 
 # ===================
 # API Functions
 # ===================
 
+def resolve_url(endpoint: str) -> str:
+    """Manifest entries are full URLs; bare endpoints are resolved against BASE_URL."""
+    return endpoint if endpoint.startswith("http") else f"{BASE_URL}{endpoint}"
+
 def fetch_data(endpoint: str) -> Optional[Union[Dict, pd.DataFrame]]:
     """
     Fetch data from the Madrid Open Data API.
@@ -42,17 +49,14 @@ def fetch_data(endpoint: str) -> Optional[Union[Dict, pd.DataFrame]]:
         Union[Dict, pd.DataFrame]: The fetched data in JSON or DataFrame format
     """
     try:
-        url = f"{BASE_URL}{endpoint}"
+        url = resolve_url(endpoint)
         info(f"Fetching data from: {url}")
         
-        response = requests.get(url)
-        response.raise_for_status()
-        
         # Determine format from endpoint
         if endpoint.endswith('.json'):
-            return response.json()
+            return json.loads(raw_cache.fetch(url))
         elif endpoint.endswith('.csv'):
-            return pd.read_csv(response.content)
+            return pd.read_csv(BytesIO(raw_cache.fetch(url)))
         else:
             error(f"Unsupported file format in endpoint: {endpoint}")
             return None
@@ -64,6 +68,30 @@ def fetch_data(endpoint: str) -> Optional[Union[Dict, pd.DataFrame]]:
         error(f"Unexpected error while fetching data: {str(e)}")
         return None
 
+def stream_graph(endpoint: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict]]:
+    """
+    Stream the @graph items of a JSON-LD endpoint in batches.
+    
+    Items are decoded incrementally from the raw file stream, so peak memory
+    depends on the batch size rather than on the size of the file.
+    
+    Args:
+        endpoint: The API endpoint (or full URL) of a JSON-LD file
+        batch_size: Maximum number of @graph items per batch
+        
+    Yields:
+        List[Dict]: Consecutive batches of @graph items
+        
+    Raises:
+        requests.exceptions.RequestException: If the download fails
+        json.JSONDecodeError: If the document is malformed
+    """
+    url = resolve_url(endpoint)
+    info(f"Streaming @graph items from: {url}")
+    
+    with raw_cache.open(url) as stream:
+        yield from json_stream.iter_batches(json_stream.iter_array_items(stream, "@graph"), batch_size)
+
 def run(endpoint: str) -> Optional[Union[Dict, pd.DataFrame]]:
     """
     Main execution function to fetch data from the API.
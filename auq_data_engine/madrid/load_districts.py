@@ -6,7 +6,8 @@ ETL Script: Load Districts of Madrid
 - Downloads GeoJSON data from Supabase
 - Extracts district name, code, and geometry
 - Transforms and validates the data
-- Outputs a JSON file ready for Supabase/PostGIS
+- Outputs an NDJSON file ready for Supabase/PostGIS
+- Skips the run when input, parameters and code are unchanged (see fingerprint.py)
 
 Author: Nico D'Alessandro Calderon
 Email: nicodalessandro11@gmail.com
@@ -15,13 +16,13 @@ Version: 1.0.0
 License: MIT License
 """
 
-import json
-import requests
 import geopandas as gpd
-from shapely.wkt import dumps
 from pathlib import Path
+from typing import Callable, Dict, List, Optional
 from tempfile import NamedTemporaryFile
 from shared.common_lib.emoji_logger import info, success, warning, error
+from shared.common_lib import raw_cache, instrumentation, profiling, ndjson
+from auq_data_engine import geometry, fingerprint
 
 # =====================
 # Configuration
@@ -38,7 +39,13 @@ DEFAULT_OUTPUT_PATH = BASE_DIR / "data/processed" / OUTPUT_FILENAME
 # Main ETL Function
 # =====================
 
-def run(input_url: str = INPUT_URL, output_path: Path = DEFAULT_OUTPUT_PATH, city_id: int = CITY_ID) -> None:
+@instrumentation.instrument("madrid:districts:etl")
+def run(
+    input_url: str = INPUT_URL,
+    output_path: Path = DEFAULT_OUTPUT_PATH,
+    city_id: int = CITY_ID,
+    sink: Optional[Callable[[List[Dict]], None]] = None
+) -> bool:
     """
     Main ETL function to process Madrid district data.
 
@@ -46,19 +53,27 @@ def run(input_url: str = INPUT_URL, output_path: Path = DEFAULT_OUTPUT_PATH, cit
         input_url (str): URL to fetch raw GeoJSON.
         output_path (Path): Path to write processed output JSON.
         city_id (int): City ID to assign (Madrid = 2).
+        sink (callable, optional): Receives the processed records (pipelined upload).
+
+    Returns:
+        bool: True if the output was written or reused, False if the input could not be fetched.
     """
     info("Starting ETL process for Madrid districts...")
     info(f"Fetching GeoJSON data from: {input_url}")
 
+    stage = fingerprint.Stage(output_path, code=[__file__, geometry], inputs=[input_url],
+                              params={"city_id": city_id, "geom_encoding": geometry.ENCODING})
+    if stage.reuse(sink):
+        return True
+
     try:
-        response = requests.get(input_url)
-        response.raise_for_status()
+        content = raw_cache.fetch(input_url)
     except Exception as e:
         error(f"Failed to download data: {e}")
-        return
+        return False
 
     with NamedTemporaryFile(suffix=".json") as tmp_file:
-        tmp_file.write(response.content)
+        tmp_file.write(content)
         tmp_file.flush()
         gdf = gpd.read_file(tmp_file.name)
 
@@ -86,7 +101,7 @@ def run(input_url: str = INPUT_URL, output_path: Path = DEFAULT_OUTPUT_PATH, cit
             continue
 
         try:
-            geom_wkt = dumps(row.geometry)
+            geom = geometry.encode(row.geometry)
         except Exception as e:
             warning(f"Error in district '{name}': {e}")
             skipped += 1
@@ -96,12 +111,15 @@ def run(input_url: str = INPUT_URL, output_path: Path = DEFAULT_OUTPUT_PATH, cit
             "name": name,
             "district_code": code,
             "city_id": city_id,
-            "geom": f"SRID=4326;{geom_wkt}"
+            "geom": geom
         })
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(prepared_data, f, ensure_ascii=False, indent=2)
+    ndjson.write_records(output_path, prepared_data)
+    stage.save()
+    instrumentation.count("records_in", len(gdf))
+    instrumentation.count("records_out", len(prepared_data))
+    if sink:
+        sink(prepared_data)
 
     # Summary
     info(f"Total districts in input: {len(gdf)}")
@@ -109,6 +127,7 @@ def run(input_url: str = INPUT_URL, output_path: Path = DEFAULT_OUTPUT_PATH, cit
     if skipped > 0:
         warning(f"Skipped: {skipped} invalid entries")
     success(f"Output saved to: {output_path}")
+    return True
 
 
 # =====================
@@ -123,7 +142,10 @@ if __name__ == "__main__":
     parser.add_argument("--output_path", type=str, default=str(DEFAULT_OUTPUT_PATH), help="Output file path.")
     parser.add_argument("--city_id", type=int, default=CITY_ID, help="City ID to assign to each record.")
 
+    profiling.add_arguments(parser)
+
     args = parser.parse_args()
+    profiling.configure_from_args(args)
     run(
         input_url=args.input_url,
         output_path=Path(args.output_path),
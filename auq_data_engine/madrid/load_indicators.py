@@ -6,7 +6,8 @@ ETL Script: Load Madrid Indicators
 - Processes indicator data from CSV files in the raw_sample directory
 - Aggregates data by neighborhood
 - Validates and transforms data into the required format
-- Outputs a JSON file ready for Supabase/PostGIS
+- Outputs an NDJSON file ready for Supabase/PostGIS, written file by file
+- Skips the run when the files, database IDs and code are unchanged (see fingerprint.py)
 
 Author: Nico D'Alessandro Calderon
 Email: nicodalessandro11@gmail.com
@@ -19,14 +20,18 @@ import json
 import csv
 import os
 from pathlib import Path
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 import re
 import os
+from collections import Counter
 from dotenv import load_dotenv
 from supabase import create_client, Client
-import requests
-from io import StringIO
+from shared.common_lib import raw_cache, instrumentation, profiling, ndjson
+from auq_data_engine.indicator_records import build_records, detect_encoding, neighbourhood_id_series, report_invalid
+from auq_data_engine import fingerprint, indicator_records
+from io import BytesIO
 
 # Load environment variables
 load_dotenv()
@@ -68,7 +73,7 @@ AGGREGATION_METHODS = {
 }
 
 # Import emoji logger
-from common_lib.emoji_logger import info, success, warning, error
+from shared.common_lib.emoji_logger import info, success, warning, error
 
 def get_supabase_client() -> Client:
     """Initialize and return a Supabase client"""
@@ -166,10 +171,9 @@ def download_csv_from_url(url: str) -> pd.DataFrame:
         DataFrame containing the CSV data
     """
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        # Read CSV with header=None to use numeric indices
-        df = pd.read_csv(StringIO(response.text), sep=';', header=None)
+        content = raw_cache.fetch(url)
+        # Read CSV with header=None to use numeric indices; Latin-1 files are not re-decoded as UTF-8
+        df = pd.read_csv(BytesIO(content), sep=';', header=None, encoding=detect_encoding(content))
         # Skip the header row
         df = df.iloc[1:]
         return df
@@ -212,7 +216,7 @@ def diagnose_neighborhood_codes(supabase: Client) -> None:
     except Exception as e:
         error(f"Failed to run diagnosis: {str(e)}")
 
-def process_indicator_file(url: str, indicator_name: str, indicator_def_ids: Dict[str, int], neighborhood_ids: Dict[str, int]) -> List[Dict[str, Any]]:
+def process_indicator_file(url: str, indicator_name: str, indicator_def_ids: Dict[str, int], neighborhood_ids: Dict[str, int]) -> Optional[List[Dict[str, Any]]]:
     """
     Process a single indicator CSV file and return a list of indicator records
     
@@ -223,11 +227,9 @@ def process_indicator_file(url: str, indicator_name: str, indicator_def_ids: Dic
         neighborhood_ids: Dictionary mapping composite keys (city_id|neighborhood_code) to their IDs
         
     Returns:
-        List of indicator records
+        List of indicator records, or None if the file could not be downloaded or processed
     """
     results = []
-    missing_geo_ids = 0
-    total_rows = 0
     
     try:
         # Download and read CSV file
@@ -235,7 +237,8 @@ def process_indicator_file(url: str, indicator_name: str, indicator_def_ids: Dic
         
         if df.empty:
             warning(f"Failed to download or empty file: {url}")
-            return results
+            return None
+        instrumentation.count("records_in", len(df))
         
         # Get indicator definition ID
         db_indicator_name = INDICATOR_MAPPING.get(indicator_name)
@@ -243,98 +246,58 @@ def process_indicator_file(url: str, indicator_name: str, indicator_def_ids: Dic
         
         if not indicator_def_id:
             warning(f"No indicator definition ID found for: {db_indicator_name}")
-            return results
+            return None
         
-        # Get unique period panels (these represent the years we want)
-        period_panels = df[MADRID_COLUMNS['period_panel']].unique()
+        # Each period panel is a year; skip a repeated header row if present
+        panels = df[MADRID_COLUMNS['period_panel']]
+        df = df[panels != "Periodo panel"]
+        panels = df[MADRID_COLUMNS['period_panel']]
+        period_panels = panels.unique()
         info(f"Found {len(period_panels)} period panels in file: {period_panels}")
         
-        # Process each period panel (year)
-        for period_panel in period_panels:
-            # Skip header row if present
-            if period_panel == "Periodo panel":
-                continue
-                
-            # Filter data for this period panel
-            panel_df = df[df[MADRID_COLUMNS['period_panel']] == period_panel]
-            
-            # Process each row for this period panel
-            for _, row in panel_df.iterrows():
-                try:
-                    total_rows += 1
-                    
-                    # Extract and clean neighborhood code
-                    raw_code = str(row[MADRID_COLUMNS['neighborhood_code']]).strip()
-                    try:
-                        # Handle potential float values and convert to int
-                        neighborhood_code = str(int(float(raw_code)))
-                    except (ValueError, TypeError):
-                        warning(f"Invalid neighborhood code format: {raw_code}")
-                        missing_geo_ids += 1
-                        continue
-                        
-                    value_str = str(row[MADRID_COLUMNS['value']]).strip()
-                    
-                    # Handle value conversion
-                    try:
-                        # Replace comma with dot for decimal values
-                        value_str = value_str.replace(',', '.')
-                        value = float(value_str)
-                    except (ValueError, TypeError):
-                        warning(f"Invalid value format in row: {value_str}")
-                        continue
-                    
-                    if not neighborhood_code or pd.isna(neighborhood_code):
-                        warning(f"Missing neighborhood code in row")
-                        missing_geo_ids += 1
-                        continue
-                        
-                    # Get neighborhood ID using composite key
-                    composite_key = f"{CITY_ID}|{neighborhood_code}"
-                    geo_id = neighborhood_ids.get(composite_key)
-                    
-                    if not geo_id:
-                        warning(f"No neighborhood ID found for composite key: {composite_key}")
-                        missing_geo_ids += 1
-                        continue
-                        
-                    # Create indicator record using period_panel as the year
-                    indicator = {
-                        "indicator_def_id": indicator_def_id,
-                        "geo_level_id": 3,  # Always 3 for neighborhood
-                        "geo_id": geo_id,
-                        "city_id": CITY_ID,
-                        "year": int(period_panel),  # Use period_panel as the year
-                        "value": value
-                    }
-                    
-                    results.append(indicator)
-                except (IndexError, ValueError) as e:
-                    warning(f"Error processing row: {str(e)}")
-                    missing_geo_ids += 1
-                    continue
-            
-            # Log the number of records for this period panel
-            records_count = len([r for r in results if r['year'] == int(period_panel) and r['indicator_def_id'] == indicator_def_id])
-            info(f"Processed {records_count} records for {indicator_name} in period panel {period_panel}")
-            
-        # Log summary of missing geo_ids
-        if missing_geo_ids > 0:
-            warning(f"Total rows processed: {total_rows}")
-            warning(f"Rows with missing geo_ids: {missing_geo_ids} ({(missing_geo_ids/total_rows)*100:.1f}%)")
+        # Group rows by period panel in order of first appearance (stable within a panel)
+        panel_order = pd.Categorical(panels, categories=period_panels).codes
+        df = df.iloc[np.argsort(panel_order, kind="stable")]
+        
+        # Map codes to neighbourhood IDs and build the records column-wise
+        results, invalid = build_records(
+            codes=df[MADRID_COLUMNS['neighborhood_code']],
+            values=df[MADRID_COLUMNS['value']],
+            years=df[MADRID_COLUMNS['period_panel']],
+            indicator_def_id=indicator_def_id,
+            city_id=CITY_ID,
+            id_lookup=neighbourhood_id_series(neighborhood_ids, CITY_ID)
+        )
+        
+        # Log the number of records per period panel
+        records_per_year = Counter(record["year"] for record in results)
+        for year, count in sorted(records_per_year.items()):
+            info(f"Processed {count} records for {indicator_name} in period panel {year}")
+        
+        report_invalid(invalid, len(df), indicator_name)
             
     except Exception as e:
         error(f"Error processing file {url}: {str(e)}")
+        return None
         
     return results
 
-def run(manifest_path: Path = MANIFEST_PATH, output_path: Path = DEFAULT_OUTPUT_PATH) -> None:
+@instrumentation.instrument("madrid:indicators:etl")
+def run(
+    manifest_path: Path = MANIFEST_PATH,
+    output_path: Path = DEFAULT_OUTPUT_PATH,
+    sink: Optional[Callable[[List[Dict]], None]] = None
+) -> bool:
     """
     Run the ETL process for Madrid indicators
     
     Args:
         manifest_path: Path to the files manifest JSON
         output_path: Path to save the processed JSON file
+        sink: Receives the records of each file as soon as it is processed (pipelined upload)
+    
+    Returns:
+        bool: False if the IDs or manifest could not be loaded or no indicator records were processed
     """
     info("Starting Madrid indicators ETL process")
     
@@ -342,7 +305,7 @@ def run(manifest_path: Path = MANIFEST_PATH, output_path: Path = DEFAULT_OUTPUT_
     supabase = get_supabase_client()
     if not supabase:
         error("Failed to initialize Supabase client. Exiting.")
-        return
+        return False
     
     # Run diagnosis first
     diagnose_neighborhood_codes(supabase)
@@ -353,7 +316,7 @@ def run(manifest_path: Path = MANIFEST_PATH, output_path: Path = DEFAULT_OUTPUT_
     
     if not indicator_def_ids or not neighborhood_ids:
         error("Failed to retrieve necessary IDs from Supabase. Exiting.")
-        return
+        return False
     
     # Load manifest file
     try:
@@ -361,41 +324,64 @@ def run(manifest_path: Path = MANIFEST_PATH, output_path: Path = DEFAULT_OUTPUT_
             manifest = json.load(f)
     except Exception as e:
         error(f"Failed to load manifest file: {str(e)}")
-        return
+        return False
     
-    all_indicators = []
+    # Skip everything below if the files, IDs and code are unchanged
+    raw_files = manifest['madrid']['indicators']['raw_file']
+    jobs = {name: raw_files[name] for name in INDICATOR_MAPPING if raw_files.get(name)}
+    stage = fingerprint.Stage(output_path, code=[__file__, indicator_records], inputs=list(jobs.values()),
+                              params={"jobs": jobs, "indicator_def_ids": indicator_def_ids,
+                                      "neighborhood_ids": neighborhood_ids})
+    if stage.reuse(sink):
+        return True
     
-    # Process each indicator type from manifest
-    for indicator_name in INDICATOR_MAPPING.keys():
-        if indicator_name not in manifest['madrid']['indicators']['raw_file']:
-            warning(f"No URL found for indicator: {indicator_name}")
-            continue
-            
-        info(f"Processing indicator: {indicator_name}")
-        
-        url = manifest['madrid']['indicators']['raw_file'][indicator_name]
-        if not url:
-            warning(f"No URL found for {indicator_name}")
-            continue
+    # Records are appended to the output as each file is processed; a run that
+    # produces nothing keeps the previous output. Failed files are listed in the
+    # output's .incomplete marker, so the upload does not delete their records
+    writer = ndjson.Writer(output_path, lazy=True)
+    failed = []
+    try:
+        # Process each indicator type from manifest
+        for indicator_name in INDICATOR_MAPPING.keys():
+            if indicator_name not in manifest['madrid']['indicators']['raw_file']:
+                warning(f"No URL found for indicator: {indicator_name}")
+                continue
+                
+            info(f"Processing indicator: {indicator_name}")
             
-        info(f"Processing file: {url}")
-        indicators = process_indicator_file(url, indicator_name, indicator_def_ids, neighborhood_ids)
-        all_indicators.extend(indicators)
+            url = manifest['madrid']['indicators']['raw_file'][indicator_name]
+            if not url:
+                warning(f"No URL found for {indicator_name}")
+                continue
+                
+            info(f"Processing file: {url}")
+            indicators = process_indicator_file(url, indicator_name, indicator_def_ids, neighborhood_ids)
+            if indicators is None:
+                failed.append(f"{indicator_name}: {url}")
+                continue
+            writer.write_many(indicators)
+            if sink:
+                sink(indicators)
+    except Exception as e:
+        writer.mark_incomplete(f"run interrupted: {e}")
+        raise
+    finally:
+        for reason in failed:
+            writer.mark_incomplete(reason)
+        writer.close()
     
-    # Save results
-    if all_indicators:
-        info(f"Saving {len(all_indicators)} indicator records to {output_path}")
-        
-        # Ensure output directory exists
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Write to JSON file
-        with output_path.open("w", encoding="utf-8") as f:
-            json.dump(all_indicators, f, ensure_ascii=False, indent=2)
-            
-        success(f"Successfully saved indicators to {output_path}")
-    else:
-        warning("No indicator records were processed")
+    if failed:
+        warning(f"{len(failed)} indicator files failed; the output is marked incomplete")
+    
+    # Save results (a run with failed files is not reused next time)
+    if writer.count:
+        if not failed:
+            stage.save()
+        instrumentation.count("records_out", writer.count)
+        success(f"Successfully saved {writer.count} indicator records to {output_path}")
+        return True
+    error("No indicator records were processed")
+    return False
 
 if __name__ == "__main__":
     import argparse
@@ -404,5 +390,8 @@ if __name__ == "__main__":
     parser.add_argument("--manifest_path", type=str, default=str(MANIFEST_PATH))
     parser.add_argument("--output_path", type=str, default=str(DEFAULT_OUTPUT_PATH))
     
+    profiling.add_arguments(parser)
+
     args = parser.parse_args()
+    profiling.configure_from_args(args)
     run(manifest_path=Path(args.manifest_path), output_path=Path(args.output_path))
\ No newline at end of file
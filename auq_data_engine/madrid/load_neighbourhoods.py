@@ -6,7 +6,8 @@ ETL Script: Load Neighbourhoods of Madrid
 - Downloads GeoJSON data from Supabase public storage
 - Links neighbourhoods to their district_id via Supabase lookup
 - Validates geometry and codes
-- Outputs a clean JSON file for PostGIS import
+- Outputs a clean NDJSON file for PostGIS import
+- Skips the run when input, district IDs and code are unchanged (see fingerprint.py)
 
 Author: Nico D'Alessandro Calderon
 Email: nicodalessandro11@gmail.com
@@ -15,16 +16,16 @@ Version: 1.0.0
 License: MIT License
 """
 
-import json
 import os
-import requests
 import geopandas as gpd
-from shapely.wkt import dumps
 from pathlib import Path
+from typing import Callable, Dict, List, Optional
 from tempfile import NamedTemporaryFile
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from shared.common_lib.emoji_logger import info, success, warning, error
+from shared.common_lib import raw_cache, instrumentation, profiling, ndjson
+from auq_data_engine import geometry, fingerprint
 
 # =====================
 # Configuration
@@ -71,7 +72,13 @@ def get_district_map(city_id: int) -> dict:
 # Main ETL Function
 # =====================
 
-def run(input_url: str = INPUT_URL, output_path: Path = DEFAULT_OUTPUT_PATH, city_id: int = CITY_ID) -> None:
+@instrumentation.instrument("madrid:neighbourhoods:etl")
+def run(
+    input_url: str = INPUT_URL,
+    output_path: Path = DEFAULT_OUTPUT_PATH,
+    city_id: int = CITY_ID,
+    sink: Optional[Callable[[List[Dict]], None]] = None
+) -> bool:
     """
     ETL function to download, process, and save neighbourhoods of Madrid.
 
@@ -79,28 +86,38 @@ def run(input_url: str = INPUT_URL, output_path: Path = DEFAULT_OUTPUT_PATH, cit
         input_url (str): URL to fetch GeoJSON data.
         output_path (Path): Output path for processed JSON file.
         city_id (int): Numeric city ID (Madrid = 2).
+        sink (callable, optional): Receives the processed records (pipelined upload).
+
+    Returns:
+        bool: True if the output was written or reused, False if the input could not be fetched.
     """
     info("Starting ETL process for Madrid neighbourhoods...")
     info(f"Downloading neighbourhoods from: {input_url}")
 
     try:
-        response = requests.get(input_url)
-        response.raise_for_status()
+        district_map = get_district_map(city_id)
+    except Exception as e:
+        error(f"Error fetching district map: {e}")
+        return False
+
+    # The district IDs come from the database, so they are part of the fingerprint
+    stage = fingerprint.Stage(output_path, code=[__file__, geometry], inputs=[input_url],
+                              params={"city_id": city_id, "geom_encoding": geometry.ENCODING,
+                                      "district_map": district_map})
+    if stage.reuse(sink):
+        return True
+
+    try:
+        content = raw_cache.fetch(input_url)
     except Exception as e:
         error(f"Failed to fetch neighbourhoods JSON: {e}")
-        return
+        return False
 
     with NamedTemporaryFile(suffix=".json") as tmp_file:
-        tmp_file.write(response.content)
+        tmp_file.write(content)
         tmp_file.flush()
         gdf = gpd.read_file(tmp_file.name)
 
-    try:
-        district_map = get_district_map(city_id)
-    except Exception as e:
-        error(f"Error fetching district map: {e}")
-        return
-
     prepared_data = []
     skipped = []
 
@@ -131,7 +148,7 @@ def run(input_url: str = INPUT_URL, output_path: Path = DEFAULT_OUTPUT_PATH, cit
             continue
 
         try:
-            geom_wkt = dumps(row.geometry)
+            geom = geometry.encode(row.geometry)
         except Exception as e:
             warning(f"Geometry error in '{name}': {e}")
             skipped.append(name)
@@ -142,12 +159,15 @@ def run(input_url: str = INPUT_URL, output_path: Path = DEFAULT_OUTPUT_PATH, cit
             "neighbourhood_code": code,
             "district_id": district_id,
             "city_id": city_id,
-            "geom": f"SRID=4326;{geom_wkt}"
+            "geom": geom
         })
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(prepared_data, f, ensure_ascii=False, indent=2)
+    ndjson.write_records(output_path, prepared_data)
+    stage.save()
+    instrumentation.count("records_in", len(gdf))
+    instrumentation.count("records_out", len(prepared_data))
+    if sink:
+        sink(prepared_data)
 
     # Summary
     info(f"Total neighbourhoods in input: {len(gdf)}")
@@ -155,6 +175,7 @@ def run(input_url: str = INPUT_URL, output_path: Path = DEFAULT_OUTPUT_PATH, cit
     if skipped:
         warning(f"Skipped: {len(skipped)} entries → {set(skipped)}")
     success(f"Output saved to: {output_path}")
+    return True
 
 
 # =====================
@@ -169,7 +190,10 @@ if __name__ == "__main__":
     parser.add_argument("--output_path", type=str, default=str(DEFAULT_OUTPUT_PATH), help="Path to output file.")
     parser.add_argument("--city_id", type=int, default=CITY_ID, help="City ID to assign to each record.")
 
+    profiling.add_arguments(parser)
+
     args = parser.parse_args()
+    profiling.configure_from_args(args)
     run(
         input_url=args.input_url,
         output_path=Path(args.output_path),
@@ -7,7 +7,8 @@ This script performs the following tasks:
 - Loads point feature data from Madrid's Open Data API
 - Processes each file according to its specific format
 - Transforms the data into a standardized format for database insertion
-- Saves the processed point features as a JSON file in the /data/processed folder
+- Saves the processed point features as an NDJSON file in the /data/processed folder
+- Skips the run when the source files, database IDs and code are unchanged (see fingerprint.py)
 
 Usage:
     python load_point_features.py
@@ -23,13 +24,16 @@ License: MIT License
 import json
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, Iterator, List, Any, Optional
 import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
 from shared.common_lib.emoji_logger import info, success, warning, error, debug
-from .api_client import run as fetch_madrid_data
+from .api_client import run as fetch_madrid_data, stream_graph, resolve_url, DEFAULT_BATCH_SIZE
+from shared.common_lib.diagnostics import Diagnostics
+from shared.common_lib import instrumentation, profiling, ndjson
+from auq_data_engine import spatial_join, fingerprint
 
 # ============================
 # Configuration & Constants
@@ -265,376 +269,258 @@ def get_area_id(supabase: Client, area_name: str) -> Optional[int]:
         error(f"Failed to get neighbourhood ID from database: {str(e)}")
         return None
 
-# ===================
-# File Processors
-# ===================
+class NeighbourhoodResolver:
+    """
+    Resolve area names (from the area.@id URL) to neighbourhood IDs in memory.
 
-def process_parques_y_jardines(data: Dict) -> List[Dict]:
-    """Process parks and gardens data."""
-    processed = []
-    feature_def = FEATURE_DEFINITIONS.get('Parks and gardens')
-    
-    if not feature_def:
-        warning("'Parks and gardens' feature definition not found in database - skipping all records")
-        return processed
-    
-    # Get Supabase client for area lookups
-    supabase = get_supabase_client()
-    if not supabase:
-        error("Failed to initialize Supabase client. Cannot process areas.")
-        return processed
-    
-    for item in data.get('@graph', []):
-        try:
-            # Extract required fields
-            name = item.get('title')
-            location = item.get('location', {})
-            lat = location.get('latitude')
-            lon = location.get('longitude')
-            address = item.get('address', {})
-            district = address.get('district', {}).get('@id', '').split('/')[-1]
-            
-            # Extract neighbourhood name from the area.@id URL
-            area_url = address.get('area', {}).get('@id', '')
-            area = area_url.split('/')[-1] if area_url else None
-            
-            # Skip if required fields are missing
-            if not all([name, lat, lon, district, area]):
-                debug(f"Skipping park/garden record due to missing required fields")
-                continue
-            
-            # Get the neighbourhood ID using the mapping
-            area_id = get_area_id(supabase, area)
-            if not area_id:
-                warning(f"Skipping record due to missing area ID: {area}")
-                continue
-            
-            # Create properties
-            properties = {
-                'address': address.get('street-address'),
-                'postal_code': address.get('postal-code'),
-                'district': district,
-                'area': area,
-                'description': item.get('organization', {}).get('organization-desc'),
-                'services': item.get('organization', {}).get('services'),
-                'schedule': item.get('organization', {}).get('schedule'),
-                'accessibility': item.get('organization', {}).get('accesibility')
-            }
-            
-            # Create the processed record
-            processed.append({
-                'feature_definition_id': feature_def,
-                'name': name,
-                'latitude': lat,
-                'longitude': lon,
-                'geom': f"SRID=4326;POINT({lon} {lat})",
-                'geo_level_id': GEO_LEVELS['Neighbourhood'],
-                'geo_id': area_id,  # Use the neighbourhood ID from database
-                'city_id': CITY_ID,
-                'properties': properties
-            })
-        except Exception as e:
-            error(f"Error processing park/garden record: {str(e)}")
-            continue
-    
-    info(f"Processed {len(processed)} parks and gardens records")
-    return processed
+    The (neighbourhood_code → id) table for the city is fetched once per run.
+    Codes that are not in the preloaded index fall back to `get_area_id`, and
+    the outcome is cached so each code costs at most one extra query.
+    """
 
-def process_museos(data: Dict) -> List[Dict]:
-    """Process museums data."""
-    processed = []
-    feature_def = FEATURE_DEFINITIONS.get('Museums')
-    
-    if not feature_def:
-        warning("'Museums' feature definition not found in database - skipping all records")
-        return processed
-    
-    # Get Supabase client for area lookups
-    supabase = get_supabase_client()
-    if not supabase:
-        error("Failed to initialize Supabase client. Cannot process areas.")
-        return processed
-    
-    for item in data.get('@graph', []):
-        try:
-            # Extract required fields
-            name = item.get('title')
-            location = item.get('location', {})
-            lat = location.get('latitude')
-            lon = location.get('longitude')
-            address = item.get('address', {})
-            district = address.get('district', {}).get('@id', '').split('/')[-1]
-            
-            # Extract neighbourhood name from the area.@id URL
-            area_url = address.get('area', {}).get('@id', '')
-            area = area_url.split('/')[-1] if area_url else None
-            
-            # Skip if required fields are missing
-            if not all([name, lat, lon, district, area]):
-                debug(f"Skipping museum record due to missing required fields")
-                continue
-            
-            # Get the neighbourhood ID using the mapping
-            area_id = get_area_id(supabase, area)
-            if not area_id:
-                warning(f"Skipping record due to missing area ID: {area}")
-                continue
-            
-            # Create properties
-            properties = {
-                'address': address.get('street-address'),
-                'postal_code': address.get('postal-code'),
-                'district': district,
-                'area': area,
-                'description': item.get('organization', {}).get('organization-desc'),
-                'services': item.get('organization', {}).get('services'),
-                'schedule': item.get('organization', {}).get('schedule'),
-                'accessibility': item.get('organization', {}).get('accesibility')
-            }
-            
-            # Create the processed record
-            processed.append({
-                'feature_definition_id': feature_def,
-                'name': name,
-                'latitude': lat,
-                'longitude': lon,
-                'geom': f"SRID=4326;POINT({lon} {lat})",
-                'geo_level_id': GEO_LEVELS['Neighbourhood'],
-                'geo_id': area_id,  # Use the neighbourhood ID from database
-                'city_id': CITY_ID,
-                'properties': properties
-            })
-        except Exception as e:
-            error(f"Error processing museum record: {str(e)}")
-            continue
-    
-    info(f"Processed {len(processed)} museum records")
-    return processed
+    def __init__(self, supabase: Client, city_id: int = CITY_ID):
+        self.supabase = supabase
+        self.city_id = city_id
+        self.index: Dict[int, Optional[int]] = {}
+        self.stats = {"hits": 0, "misses": 0, "fallbacks": 0}
 
-def process_salud(data: Dict) -> List[Dict]:
-    """Process health centers data."""
-    processed = []
-    feature_def = FEATURE_DEFINITIONS.get('Health centers')
-    
-    if not feature_def:
-        warning("'Health centers' feature definition not found in database - skipping all records")
-        return processed
-    
-    # Get Supabase client for area lookups
-    supabase = get_supabase_client()
-    if not supabase:
-        error("Failed to initialize Supabase client. Cannot process areas.")
-        return processed
-    
-    for item in data.get('@graph', []):
-        try:
-            # Extract required fields
-            name = item.get('title')
-            location = item.get('location', {})
-            lat = location.get('latitude')
-            lon = location.get('longitude')
-            address = item.get('address', {})
-            district = address.get('district', {}).get('@id', '').split('/')[-1]
-            
-            # Extract neighbourhood name from the area.@id URL
-            area_url = address.get('area', {}).get('@id', '')
-            area = area_url.split('/')[-1] if area_url else None
-            
-            # Skip if required fields are missing
-            if not all([name, lat, lon, district, area]):
-                debug(f"Skipping health center record due to missing required fields")
-                continue
-            
-            # Get the neighbourhood ID using the mapping
-            area_id = get_area_id(supabase, area)
-            if not area_id:
-                warning(f"Skipping record due to missing area ID: {area}")
-                continue
-            
-            # Create properties
-            properties = {
-                'address': address.get('street-address'),
-                'postal_code': address.get('postal-code'),
-                'district': district,
-                'area': area,
-                'description': item.get('organization', {}).get('organization-desc'),
-                'services': item.get('organization', {}).get('services'),
-                'schedule': item.get('organization', {}).get('schedule'),
-                'accessibility': item.get('organization', {}).get('accesibility')
-            }
-            
-            # Create the processed record
-            processed.append({
-                'feature_definition_id': feature_def,
-                'name': name,
-                'latitude': lat,
-                'longitude': lon,
-                'geom': f"SRID=4326;POINT({lon} {lat})",
-                'geo_level_id': GEO_LEVELS['Neighbourhood'],
-                'geo_id': area_id,  # Use the neighbourhood ID from database
-                'city_id': CITY_ID,
-                'properties': properties
-            })
-        except Exception as e:
-            error(f"Error processing health center record: {str(e)}")
-            continue
-    
-    info(f"Processed {len(processed)} health center records")
-    return processed
+    def load(self) -> int:
+        """
+        Preload the neighbourhood code → ID index for the city.
 
-def process_centros_educativos(data: Dict) -> List[Dict]:
-    """Process educational centers data."""
-    processed = []
-    feature_def = FEATURE_DEFINITIONS.get('Educational centers')
-    
-    if not feature_def:
-        warning("'Educational centers' feature definition not found in database - skipping all records")
-        return processed
-    
-    # Get Supabase client for area lookups
-    supabase = get_supabase_client()
-    if not supabase:
-        error("Failed to initialize Supabase client. Cannot process areas.")
-        return processed
-    
-    for item in data.get('@graph', []):
+        Returns:
+            int: Number of neighbourhoods loaded into the index
+        """
         try:
-            # Extract required fields
-            name = item.get('title')
-            location = item.get('location', {})
-            lat = location.get('latitude')
-            lon = location.get('longitude')
-            address = item.get('address', {})
-            district = address.get('district', {}).get('@id', '').split('/')[-1]
-            
-            # Extract neighbourhood name from the area.@id URL
-            area_url = address.get('area', {}).get('@id', '')
-            area = area_url.split('/')[-1] if area_url else None
-            
-            # Skip if required fields are missing
-            if not all([name, lat, lon, district, area]):
-                debug(f"Skipping educational center record due to missing required fields")
-                continue
-            
-            # Get the neighbourhood ID using the mapping
-            area_id = get_area_id(supabase, area)
-            if not area_id:
-                warning(f"Skipping record due to missing area ID: {area}")
-                continue
-            
-            # Create properties
-            properties = {
-                'address': address.get('street-address'),
-                'postal_code': address.get('postal-code'),
-                'district': district,
-                'area': area,
-                'description': item.get('organization', {}).get('organization-desc'),
-                'services': item.get('organization', {}).get('services'),
-                'schedule': item.get('organization', {}).get('schedule'),
-                'accessibility': item.get('organization', {}).get('accesibility')
+            response = self.supabase.table("neighbourhoods") \
+                .select("id, neighbourhood_code") \
+                .eq("city_id", self.city_id) \
+                .execute()
+            self.index = {
+                int(row["neighbourhood_code"]): row["id"]
+                for row in response.data or []
             }
-            
-            # Create the processed record
-            processed.append({
-                'feature_definition_id': feature_def,
-                'name': name,
-                'latitude': lat,
-                'longitude': lon,
-                'geom': f"SRID=4326;POINT({lon} {lat})",
-                'geo_level_id': GEO_LEVELS['Neighbourhood'],
-                'geo_id': area_id,  # Use the neighbourhood ID from database
-                'city_id': CITY_ID,
-                'properties': properties
-            })
+            info(f"Preloaded {len(self.index)} neighbourhood IDs for city_id = {self.city_id}")
         except Exception as e:
-            error(f"Error processing educational center record: {str(e)}")
-            continue
-    
-    info(f"Processed {len(processed)} educational center records")
-    return processed
+            error(f"Failed to preload neighbourhood IDs, falling back to per-code queries: {str(e)}")
+            self.index = {}
+        return len(self.index)
+
+    def resolve(self, area_name: str) -> Optional[int]:
+        """
+        Resolve an area name to its neighbourhood ID.
+
+        Args:
+            area_name: Name of the neighbourhood (from the area.@id URL)
+
+        Returns:
+            Optional[int]: The neighbourhood ID if found, None otherwise
+        """
+        neighbourhood_code = CODE_MAPPING.get(area_name)
+        if not neighbourhood_code:
+            self.stats["misses"] += 1
+            return None
+
+        if neighbourhood_code in self.index:
+            area_id = self.index[neighbourhood_code]
+            self.stats["hits" if area_id else "misses"] += 1
+            return area_id
+
+        # Code not preloaded: query it once and remember the outcome
+        self.stats["fallbacks"] += 1
+        area_id = get_area_id(self.supabase, area_name)
+        self.index[neighbourhood_code] = area_id
+        if not area_id:
+            self.stats["misses"] += 1
+        return area_id
 
-def process_bibliotecas(data: Dict) -> List[Dict]:
-    """Process libraries data."""
-    processed = []
-    feature_def = FEATURE_DEFINITIONS.get('Libraries')
+    def report(self) -> None:
+        """Log how many lookups hit the index, missed or fell back to a query."""
+        info(
+            f"Neighbourhood lookups: {self.stats['hits']} hits, "
+            f"{self.stats['misses']} misses, {self.stats['fallbacks']} fallbacks"
+        )
+
+# ===================
+# Dataset Processor
+# ===================
+
+# Madrid JSON-LD datasets, keyed by their entry in the API manifest
+# (madrid.point_features.raw_file). Adding a dataset only needs a new entry.
+DATASETS = {
+    "parques_y_jardines": {"feature": "Parks and gardens", "label": "parks and gardens"},
+    "museos": {"feature": "Museums", "label": "museum"},
+    "bibliotecas": {"feature": "Libraries", "label": "library"},
+    "centros_educativos": {"feature": "Educational centers", "label": "educational center"},
+    "salud": {"feature": "Health centers", "label": "health center"},
+}
+
+# Flattened @graph columns (pandas.json_normalize) read by the processor
+GRAPH_COLUMNS = {
+    "name": "title",
+    "latitude": "location.latitude",
+    "longitude": "location.longitude",
+    "district_url": "address.district.@id",
+    "area_url": "address.area.@id",
+}
+
+# Output property → flattened @graph column
+PROPERTY_COLUMNS = {
+    "address": "address.street-address",
+    "postal_code": "address.postal-code",
+    "description": "organization.organization-desc",
+    "services": "organization.services",
+    "schedule": "organization.schedule",
+    "accessibility": "organization.accesibility",
+}
+
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    """Return a flattened column, or an all-missing column if no item has it."""
+    if name in df.columns:
+        return df[name].astype(object)
+    return pd.Series(None, index=df.index, dtype=object)
+
+def _present(column: pd.Series) -> pd.Series:
+    """Mask of values that are neither missing nor empty."""
+    return column.notna() & column.astype(str).str.strip().ne("")
+
+def _last_url_segment(column: pd.Series, missing: Optional[str] = None) -> pd.Series:
+    """Vectorized `url.split('/')[-1]`, with missing URLs → `missing`."""
+    segments = column.where(_present(column), "").astype(str).str.rsplit("/", n=1).str[-1]
+    return segments.where(_present(column), missing).astype(object)
+
+def process_dataset(
+    data: Dict,
+    dataset: Dict[str, str],
+    resolver: NeighbourhoodResolver,
+    diagnostics: Optional[Diagnostics] = None
+) -> List[Dict]:
+    """
+    Process a Madrid JSON-LD dataset into point feature records.
+    
+    The @graph items are flattened with `pandas.json_normalize`; area and district
+    are extracted from their @id URLs column-wise and incomplete items are
+    filtered out with masks before the records are built in bulk.
     
+    Args:
+        data: Parsed JSON-LD response with an @graph list
+        dataset: Entry of DATASETS (feature definition name and log label)
+        resolver: Neighbourhood resolver shared by every dataset
+        diagnostics: Collector for skipped items (logged as a count when omitted)
+        
+    Returns:
+        List[Dict]: Point feature records ready for database insertion
+    """
+    feature_def = FEATURE_DEFINITIONS.get(dataset["feature"])
     if not feature_def:
-        warning("'Libraries' feature definition not found in database - skipping all records")
-        return processed
+        warning(f"'{dataset['feature']}' feature definition not found in database - skipping all records")
+        return []
     
-    # Get Supabase client for area lookups
-    supabase = get_supabase_client()
-    if not supabase:
-        error("Failed to initialize Supabase client. Cannot process areas.")
-        return processed
+    items = data.get('@graph', [])
+    if not items:
+        return []
+    instrumentation.count("records_in", len(items))
+    
+    df = pd.json_normalize(items)
+    graph = {key: _column(df, column) for key, column in GRAPH_COLUMNS.items()}
+    
+    # Skip items with missing required fields
+    complete = _present(graph["name"]) & _present(graph["latitude"]) & _present(graph["longitude"])
+    skipped = int((~complete).sum())
+    if skipped and diagnostics is not None:
+        sample = items[int((~complete).to_numpy().argmax())]
+        diagnostics.count(f"{dataset['label']}: missing name or coordinates", sample=sample, n=skipped)
+    elif skipped:
+        debug(f"Skipping {skipped} {dataset['label']} records due to missing required fields")
+    
+    df = df[complete]
+    graph = {key: column[complete] for key, column in graph.items()}
+    if df.empty:
+        return []
     
-    for item in data.get('@graph', []):
-        try:
-            # Extract required fields
-            name = item.get('title')
-            location = item.get('location', {})
-            lat = location.get('latitude')
-            lon = location.get('longitude')
-            address = item.get('address', {})
-            district = address.get('district', {}).get('@id', '').split('/')[-1]
-            
-            # Extract neighbourhood name from the area.@id URL
-            area_url = address.get('area', {}).get('@id', '')
-            area = area_url.split('/')[-1] if area_url else None
-            
-            # Skip if required fields are missing
-            if not all([name, lat, lon, district, area]):
-                debug(f"Skipping library record due to missing required fields")
-                continue
-            
-            # Get the neighbourhood ID using the mapping
-            area_id = get_area_id(supabase, area)
-            if not area_id:
-                warning(f"Skipping record due to missing area ID: {area}")
-                continue
-            
-            # Create properties
-            properties = {
-                'address': address.get('street-address'),
-                'postal_code': address.get('postal-code'),
-                'district': district,
-                'area': area,
-                'description': item.get('organization', {}).get('organization-desc'),
-                'services': item.get('organization', {}).get('services'),
-                'schedule': item.get('organization', {}).get('schedule'),
-                'accessibility': item.get('organization', {}).get('accesibility')
-            }
-            
-            # Create the processed record
-            processed.append({
-                'feature_definition_id': feature_def,
-                'name': name,
-                'latitude': lat,
-                'longitude': lon,
-                'geom': f"SRID=4326;POINT({lon} {lat})",
-                'geo_level_id': GEO_LEVELS['Neighbourhood'],
-                'geo_id': area_id,  # Use the neighbourhood ID from database
-                'city_id': CITY_ID,
-                'properties': properties
-            })
-        except Exception as e:
-            error(f"Error processing library record: {str(e)}")
-            continue
+    district = _last_url_segment(graph["district_url"], missing="")
+    area = _last_url_segment(graph["area_url"])
+    
+    # API-provided neighbourhood ID (one lookup per distinct area); checked and
+    # completed by the spatial join
+    area_ids = {name: resolver.resolve(name) for name in area.dropna().unique()}
+    geo_id = pd.Series([area_ids.get(name) for name in area], index=area.index, dtype=object)
+    
+    # Properties, with missing values as None
+    properties = pd.DataFrame({
+        "address": _column(df, PROPERTY_COLUMNS["address"]),
+        "postal_code": _column(df, PROPERTY_COLUMNS["postal_code"]),
+        "district": district,
+        "area": area,
+        **{key: _column(df, column) for key, column in PROPERTY_COLUMNS.items()
+           if key not in ("address", "postal_code")},
+    })
+    properties = properties.where(properties.notna(), None)
+    
+    lat = graph["latitude"]
+    lon = graph["longitude"]
+    records = pd.DataFrame({
+        "feature_definition_id": feature_def,
+        "name": graph["name"],
+        "latitude": lat,
+        "longitude": lon,
+        "geom": [f"SRID=4326;POINT({x} {y})" for x, y in zip(lon, lat)],
+        "geo_level_id": GEO_LEVELS['Neighbourhood'],
+        "geo_id": geo_id,
+        "city_id": CITY_ID,
+        "properties": properties.to_dict("records"),
+    }).to_dict("records")
+    
+    debug(f"Processed {len(records)} {dataset['label']} records")
+    return records
+
+def stream_dataset(
+    url: str,
+    dataset: Dict[str, str],
+    resolver: NeighbourhoodResolver,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    diagnostics: Optional[Diagnostics] = None
+) -> Iterator[List[Dict]]:
+    """
+    Stream a Madrid JSON-LD dataset and process its @graph items batch by batch.
     
-    info(f"Processed {len(processed)} library records")
-    return processed
+    Args:
+        url: URL of the JSON-LD file
+        dataset: Entry of DATASETS (feature definition name and log label)
+        resolver: Neighbourhood resolver shared by every dataset
+        batch_size: Maximum number of @graph items held in memory at once
+        diagnostics: Collector for skipped items
+        
+    Yields:
+        List[Dict]: Point feature records of each batch
+    """
+    for items in stream_graph(url, batch_size):
+        yield process_dataset({'@graph': items}, dataset, resolver, diagnostics)
 
 # ===================
 # Core ETL Process
 # ===================
 
-def run(output_path: Path = DEFAULT_OUTPUT_PATH, manifest_path: Path = None) -> None:
+@instrumentation.instrument("madrid:point_features:etl")
+def run(
+    output_path: Path = DEFAULT_OUTPUT_PATH,
+    manifest_path: Path = None,
+    stream: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    sink: Optional[Callable[[List[Dict]], None]] = None
+) -> bool:
     """
     Main execution logic to fetch, process, and store point feature data.
     
     Args:
         output_path: Path where to save the processed data
         manifest_path: Path to the api-file-manifest.json file
+        stream: Parse @graph items incrementally instead of loading whole files
+        batch_size: @graph items per batch in streaming mode
+        sink: Receives the processed records (pipelined upload)
+    
+    Returns:
+        bool: False if the data could not be fetched or no point features were processed
     """
     info(f"Starting ETL process for Madrid point features...")
     
@@ -642,14 +528,21 @@ def run(output_path: Path = DEFAULT_OUTPUT_PATH, manifest_path: Path = None) ->
     supabase = get_supabase_client()
     if not supabase:
         error("Failed to initialize Supabase client. Exiting.")
-        return
+        return False
     
     # Load feature definitions from database
     global FEATURE_DEFINITIONS
     FEATURE_DEFINITIONS = load_feature_definitions(supabase)
     
+    # Preload the neighbourhood index shared by every processor
+    resolver = NeighbourhoodResolver(supabase)
+    resolver.load()
+    
     # Process all features
     all_processed_data = []
+    failed = []  # datasets that could not be fetched or processed
+    stage = None
+    diag = Diagnostics("point_features/madrid")
     
     try:
         # Load the resource URLs from the api-file-manifest.json file
@@ -660,187 +553,71 @@ def run(output_path: Path = DEFAULT_OUTPUT_PATH, manifest_path: Path = None) ->
             manifest = json.load(f)
             urls = manifest['madrid']['point_features']['raw_file']
         
-        # Process each feature type
+        # Skip everything below if the source files, IDs and code are unchanged
+        stage = fingerprint.Stage(output_path, code=[__file__, spatial_join],
+                                  inputs=[resolve_url(url) for url in urls.values()],
+                                  files=[spatial_join.neighbourhoods_path("madrid")],
+                                  params={"datasets": sorted(urls), "feature_definitions": FEATURE_DEFINITIONS,
+                                          "neighbourhood_ids": resolver.index})
+        if stage.reuse(sink):
+            return True
+        
+        # Process each dataset listed in the manifest
         for feature_type, url in urls.items():
-            # Fetch and process data
-            data = fetch_madrid_data(url)
-            if data:
-                if 'parques-jardines' in url:
-                    processed_data = process_parques_y_jardines(data)
-                elif 'museos' in url:
-                    processed_data = process_museos(data)
-                elif 'bibliotecas' in url:
-                    processed_data = process_bibliotecas(data)
-                elif 'centros-educativos' in url:
-                    processed_data = process_centros_educativos(data)
-                elif 'atencion-medica' in url:
-                    processed_data = process_salud(data)
-                else:
-                    warning(f"Unknown feature type: {feature_type}")
+            dataset = DATASETS.get(feature_type)
+            if not dataset:
+                warning(f"Unknown feature type: {feature_type}")
+                continue
+            
+            # Stream the file in batches of @graph items
+            processed_before = len(all_processed_data)
+            if stream:
+                try:
+                    for records in stream_dataset(url, dataset, resolver, batch_size, diag):
+                        all_processed_data.extend(records)
+                except Exception as e:
+                    error(f"Failed to stream data for {feature_type}: {str(e)}")
+                    failed.append(f"{feature_type}: {url}")
                     continue
-                    
-                all_processed_data.extend(processed_data)
             else:
-                error(f"Failed to fetch data for {feature_type}")
+                # Fetch and process data
+                data = fetch_madrid_data(url)
+                if not data:
+                    error(f"Failed to fetch data for {feature_type}")
+                    failed.append(f"{feature_type}: {url}")
+                    continue
+                all_processed_data.extend(process_dataset(data, dataset, resolver, diag))
+            
+            # One summary per dataset (batches are logged at debug level)
+            info(f"Processed {len(all_processed_data) - processed_before} {dataset['label']} records")
             
     except Exception as e:
         error(f"Error processing data: {str(e)}")
-    
-    # Save the processed data
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(all_processed_data, f, ensure_ascii=False, indent=2)
+        failed.append(f"run: {e}")
+    diag.report()
+    
+    # Assign neighbourhoods by polygon containment
+    spatial_join.join_city(all_processed_data, "madrid", resolver.index)
+    
+    # Save the processed data; failed datasets are listed in the .incomplete marker
+    # so the upload does not delete their records
+    ndjson.write_records(output_path, all_processed_data, incomplete=failed)
+    if failed:
+        warning(f"{len(failed)} datasets failed; the output is marked incomplete")
+    elif stage and all_processed_data:
+        stage.save()
+    instrumentation.count("records_out", len(all_processed_data))
+    if sink:
+        sink(all_processed_data)
     
     # Summary log
+    resolver.report()
     info(f"Total point features processed: {len(all_processed_data)}")
     success(f"Output saved to: {output_path}")
-
-def process_records(data: Dict, feature_defs: Dict[str, int], supabase: Client) -> List[Dict]:
-    """
-    Process records from the API response and transform them into the required format.
-    
-    Args:
-        data: Dictionary containing the API response data
-        feature_defs: Dictionary mapping feature names to their IDs
-        supabase: Supabase client instance
-        
-    Returns:
-        List of processed records ready for database insertion
-    """
-    processed_records = []
-    
-    try:
-        # Get the records from the response - handle both API formats
-        records = data.get('records', []) or data.get('@graph', [])
-        if not records:
-            warning("No records found in API response")
-            return processed_records
-            
-        info(f"Processing {len(records)} records from API response")
-        
-        # Process each record
-        for record in records:
-            try:
-                # Extract required fields - handle both API formats
-                name = record.get('name') or record.get('title', '')
-                if not name:
-                    warning("Skipping record with missing name")
-                    continue
-                    
-                # Get coordinates - handle both API formats
-                coordinates = record.get('geo_epgs_4326', {})
-                if not coordinates:
-                    location = record.get('location', {})
-                    if location:
-                        coordinates = {
-                            'lon': location.get('longitude'),
-                            'lat': location.get('latitude')
-                        }
-                
-                if not coordinates:
-                    warning(f"Skipping record with missing coordinates: {name}")
-                    continue
-                    
-                lon = coordinates.get('lon')
-                lat = coordinates.get('lat')
-                if not lon or not lat:
-                    warning(f"Skipping record with invalid coordinates: {name}")
-                    continue
-                
-                # Convert coordinates to float
-                try:
-                    lon = float(lon)
-                    lat = float(lat)
-                except (ValueError, TypeError):
-                    warning(f"Invalid coordinate format: lon={lon}, lat={lat}")
-                    continue
-                    
-                # Get address information - handle both API formats
-                address = record.get('addresses', {}) or record.get('address', {})
-                road_name = address.get('road_name') or address.get('street-address', '')
-                street_number = address.get('start_street_number') or address.get('street-number', '')
-                zip_code = address.get('zip_code') or address.get('postal-code', '')
-                
-                # Get phone number if available
-                phone = None
-                values = record.get('values', [])
-                for value in values:
-                    if value.get('category') == 'Teléfonos':
-                        phone = value.get('value')
-                        break
-                
-                # Determine feature type based on the endpoint or record type
-                feature_type = None
-                if 'parques-jardines' in str(record) or 'parque' in name.lower() or 'jardín' in name.lower() or 'jardin' in name.lower():
-                    feature_type = 'Parks and gardens'
-                elif 'museos' in str(record) or 'museo' in name.lower():
-                    feature_type = 'Museums'
-                elif 'bibliotecas' in str(record) or 'biblioteca' in name.lower():
-                    feature_type = 'Libraries'
-                elif 'centros-educativos' in str(record) or 'colegio' in name.lower() or 'escuela' in name.lower():
-                    feature_type = 'Educational centers'
-                elif 'atencion-medica' in str(record) or 'centro de salud' in name.lower() or 'hospital' in name.lower():
-                    feature_type = 'Health centers'
-                
-                if not feature_type:
-                    warning(f"Could not determine feature type for: {name}")
-                    continue
-                
-                feature_def_id = feature_defs.get(feature_type)
-                if not feature_def_id:
-                    warning(f"No feature definition found for type: {feature_type}")
-                    continue
-                
-                # Get the neighbourhood code from the area.@id URL
-                area_url = address.get('area', {}).get('@id', '')
-                area_code = area_url.split('/')[-1] if area_url else None
-                
-                if not area_code:
-                    warning(f"Missing area code for: {name}")
-                    continue
-                
-                # Get the neighbourhood ID using the code mapping
-                neighbourhood_code = CODE_MAPPING.get(area_code)
-                if not neighbourhood_code:
-                    warning(f"No neighbourhood code mapping found for: {area_code}")
-                    continue
-                
-                # Look up the neighbourhood ID in the database
-                neighbourhood_id = get_area_id(supabase, area_code)
-                if not neighbourhood_id:
-                    warning(f"Could not find neighbourhood ID for code: {neighbourhood_code}")
-                    continue
-                
-                # Create the point feature record
-                point_feature = {
-                    "name": name,
-                    "latitude": lat,
-                    "longitude": lon,
-                    "geom": f"POINT({lon} {lat})",
-                    "properties": {
-                        "address_road_name": road_name,
-                        "address_street_number": street_number,
-                        "address_zip_code": zip_code,
-                        "phone": phone
-                    },
-                    "city_id": CITY_ID,
-                    "geo_level_id": GEO_LEVELS["Neighbourhood"],
-                    "feature_definition_id": feature_def_id,
-                    "geo_id": neighbourhood_id
-                }
-                
-                processed_records.append(point_feature)
-                
-            except Exception as e:
-                warning(f"Error processing record: {str(e)}")
-                continue
-                
-        info(f"Successfully processed {len(processed_records)} records")
-        return processed_records
-        
-    except Exception as e:
-        error(f"Error processing records: {str(e)}")
-        return []
+    if failed and not all_processed_data:
+        error("No point features were processed")
+        return False
+    return True
 
 # ==========================
 # CLI Entry Point
@@ -852,6 +629,13 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="ETL script for loading Madrid point features.")
     parser.add_argument("--output_path", type=str, default=str(DEFAULT_OUTPUT_PATH), 
                       help="Path where to save the processed data.")
+    parser.add_argument("--stream", action="store_true",
+                      help="Parse JSON-LD @graph items incrementally instead of loading whole files.")
+    parser.add_argument("--batch_size", type=int, default=DEFAULT_BATCH_SIZE,
+                      help="@graph items per batch in streaming mode.")
     
+    profiling.add_arguments(parser)
+
     args = parser.parse_args()
-    run(output_path=Path(args.output_path))
+    profiling.configure_from_args(args)
+    run(output_path=Path(args.output_path), stream=args.stream, batch_size=args.batch_size)
@@ -9,10 +9,21 @@ This script runs the full ETL + Validation + Upload workflow in this order:
 3. Point Features
 4. Indicators
 
+With --pipelined, each loader's records are uploaded while the next loader runs
+(see pipeline.py); stages still run in the order above.
+
+With --parallel, the same steps run as a dependency graph (see scheduler.py):
+each city advances on its own, and independent steps run concurrently.
+
+Every loader and upload is measured as a stage (time, records, HTTP traffic,
+memory); --metrics / --metrics-prom write the run report (see instrumentation.py),
+and --profile DIR profiles each stage (see profiling.py).
+
 Author: Nico D'Alessandro Calderon (nico.dalessandro@gmail.com)
 Date: 2025-04-17
 """
 
+import atexit
 import subprocess
 import sys
 import argparse
@@ -25,10 +36,18 @@ from auq_data_engine.madrid import load_neighbourhoods as mad_n
 from auq_data_engine.madrid import load_point_features as mad_p
 from auq_data_engine.madrid import load_indicators as mad_i
 from auq_data_engine.upload import upload_to_supabase as upload
+from auq_data_engine import geometry, pipeline, scheduler, fingerprint
+from shared.common_lib import raw_cache, diagnostics, instrumentation, profiling
 from pathlib import Path
 
 F = "[main.py]"
 
+# Loader modules per city; a new city only needs an entry here (and its expected counts)
+CITY_LOADERS = {
+    "bcn": {"districts": bcn_d, "neighbourhoods": bcn_n, "point_features": bcn_p, "indicators": bcn_i},
+    "madrid": {"districts": mad_d, "neighbourhoods": mad_n, "point_features": mad_p, "indicators": mad_i},
+}
+
 # =====================
 # Utility
 # =====================
@@ -103,11 +122,139 @@ def run_all():
     process_point_features()
     process_indicators()
 
+# =====================
+# Pipelined Entry Point
+# =====================
+
+def run_pipelined():
+    """
+    Run every stage with uploads overlapping extraction.
+
+    Loaders hand their records to upload workers through bounded queues
+    (see pipeline.py). Each stage waits for its uploads before the next one
+    starts, because the next loaders look up the IDs that were just uploaded.
+    The test suites run after each stage's uploads instead of before them.
+    """
+    print(f"{F} 🔀 Running pipelined ETL + upload...")
+    manifest_path = Path(__file__).resolve().parent / "data/api-file-manifest.json"
+    stages = [
+        ("districts", [(bcn_d.run, "bcn", {}), (mad_d.run, "madrid", {})], None),
+        ("neighbourhoods", [(bcn_n.run, "bcn", {}), (mad_n.run, "madrid", {})], "test_base_data_upload.py"),
+        ("point_features", [(bcn_p.run, "bcn", {"manifest_path": manifest_path}),
+                            (mad_p.run, "madrid", {"manifest_path": manifest_path})], "test_point_features_upload.py"),
+        ("indicators", [(bcn_i.run, "bcn", {}), (mad_i.run, "madrid", {})], "test_indicators_upload.py"),
+    ]
+
+    runner = pipeline.UploadPipeline(upload)
+    for table, loaders, tests in stages:
+        for loader, city, kwargs in loaders:
+            runner.run_loader(loader, table, city, **kwargs)
+        if not runner.wait():
+            print(f"{F} ❌ {table} upload failed. Aborting remaining stages.")
+            sys.exit(1)
+        if tests:
+            run_tests(tests)
+    print(f"{F} ✅ Pipelined ETL and upload complete.")
+
+# =====================
+# Parallel Entry Point
+# =====================
+
+def build_graph(workers: int = scheduler.DEFAULT_WORKERS) -> scheduler.Scheduler:
+    """
+    Build the ETL dependency graph.
+
+    Per city: districts ETL -> upload -> neighbourhoods ETL -> upload. Once every
+    city's reference tables are uploaded and validated, point feature and indicator
+    ETLs of all cities run concurrently. Point features are uploaded in one node
+    (deduplicated across cities), indicators per city.
+    """
+    manifest_path = Path(__file__).resolve().parent / "data/api-file-manifest.json"
+    graph = scheduler.Scheduler(workers)
+
+    reference_uploads = []
+    for city, loaders in CITY_LOADERS.items():
+        districts = graph.add(f"{city}:districts:etl", loaders["districts"].run)
+        districts = graph.add(f"{city}:districts:upload",
+                              lambda city=city: upload.run_district_upload([city]), [districts])
+        neighbourhoods = graph.add(f"{city}:neighbourhoods:etl", loaders["neighbourhoods"].run, [districts])
+        reference_uploads.append(graph.add(f"{city}:neighbourhoods:upload",
+                                           lambda city=city: upload.run_neighbourhood_upload([city]), [neighbourhoods]))
+    base_data = graph.add("validate:base_data", lambda: run_tests("test_base_data_upload.py"), reference_uploads)
+
+    point_etls, indicator_etls = [], []
+    for city, loaders in CITY_LOADERS.items():
+        point_etls.append(graph.add(f"{city}:point_features:etl",
+                                    lambda run=loaders["point_features"].run: run(manifest_path=manifest_path),
+                                    [base_data]))
+        indicator_etls.append(graph.add(f"{city}:indicators:etl", loaders["indicators"].run, [base_data]))
+
+    points = graph.add("validate:point_features", lambda: run_tests("test_point_features_upload.py"), point_etls)
+    graph.add("point_features:upload", lambda: upload.run_point_feature_upload(list(CITY_LOADERS)), [points])
+
+    indicators = graph.add("validate:indicators", lambda: run_tests("test_indicators_upload.py"), indicator_etls)
+    for city in CITY_LOADERS:
+        graph.add(f"{city}:indicators:upload", lambda city=city: upload.run_indicator_upload([city]), [indicators])
+    return graph
+
+
+def run_parallel(workers: int = scheduler.DEFAULT_WORKERS):
+    print(f"{F} 🕸️ Running ETL + upload as a dependency graph on {workers} workers...")
+    graph = build_graph(workers)
+    ok = graph.run()
+    graph.report()
+    if not ok:
+        print(f"{F} ❌ Some steps failed or were skipped.")
+        sys.exit(1)
+    print(f"{F} ✅ Parallel ETL and upload complete.")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the full ETL pipeline for Are-U-Query-ous.")
     parser.add_argument("--skip-upload", action="store_true", help="Run ETLs only (skip Supabase upload)")
+    parser.add_argument("--offline", action="store_true", help="Read raw files from the local cache only (no downloads)")
+    parser.add_argument("--no-cache", action="store_true", help="Always download raw files (bypass the local cache)")
+    parser.add_argument("--backend", choices=upload.BACKENDS, default=upload.BACKEND,
+                        help="Upload backend: rest (PostgREST upserts) or copy (PostgreSQL COPY, needs SUPABASE_DB_URL)")
+
+    parser.add_argument("--geom-encoding", choices=geometry.ENCODINGS, default=geometry.ENCODING,
+                        help="Geometry encoding of the processed files: wkt (full precision), wkt7 (7 decimals) or ewkb (hex)")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="Upload each loader's records while the next loader runs (bounded queues per table and city)")
+    parser.add_argument("--parallel", type=int, nargs="?", const=scheduler.DEFAULT_WORKERS, default=0, metavar="WORKERS",
+                        help=f"Run the steps as a dependency graph with independent steps in parallel "
+                             f"(default {scheduler.DEFAULT_WORKERS} workers)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Upload only records changed since the last upload from this machine, and delete removed ones")
+    parser.add_argument("--allow-mass-delete", action="store_true",
+                        help="With --incremental, allow deleting more than a small share of a table/city in one run")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted upload, skipping records it already committed")
+    parser.add_argument("--diagnostics-dir", type=Path, default=None,
+                        help="Write each stage's skipped-record counts and samples as JSON into this directory")
+    parser.add_argument("--metrics", type=Path, default=None, metavar="FILE",
+                        help="Write per-stage time, record, HTTP and memory metrics as JSON to FILE")
+    parser.add_argument("--metrics-prom", type=Path, default=None, metavar="FILE",
+                        help="Write the same metrics as a Prometheus textfile (node_exporter textfile collector)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Trace Python allocations to report each stage's peak memory (slower)")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-run every ETL stage even when its inputs, parameters and code are unchanged")
+
+    profiling.add_arguments(parser)
 
     args = parser.parse_args()
+    profiling.configure_from_args(args)
+    raw_cache.configure(enabled=not args.no_cache, offline=args.offline)
+    upload.set_backend(args.backend)
+    upload.set_incremental(args.incremental)
+    upload.set_allow_mass_delete(args.allow_mass_delete)
+    upload.set_resume(args.resume)
+    geometry.set_encoding(args.geom_encoding)
+    fingerprint.set_force(args.force)
+    diagnostics.configure(report_dir=args.diagnostics_dir)
+    instrumentation.configure(report_path=args.metrics, prometheus_path=args.metrics_prom,
+                              trace_memory=args.trace_memory or None)
+    atexit.register(instrumentation.log_summary)
 
     if args.skip_upload:
         print(f"{F} ⚙️ Developer mode: running ETLs and tests only (no upload)...")
@@ -123,5 +270,9 @@ if __name__ == "__main__":
         mad_i.run()
         run_tests("test_indicators_upload.py")
         print(f"{F} ✅ Developer ETL and test run complete.")
+    elif args.pipelined:
+        run_pipelined()
+    elif args.parallel:
+        run_parallel(args.parallel)
     else:
         run_all()
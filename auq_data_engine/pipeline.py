@@ -0,0 +1,202 @@
+# auq_data_engine/pipeline.py
+
+"""
+ETL Stage Runner: Overlapped Extraction and Upload
+
+- Gives every loader a sink; the loader hands over its record batches as soon as
+  they are ready (per file for indicators, per dataset/city otherwise)
+- Each (table, city) gets a bounded queue and an upload worker thread that consumes
+  it while extraction continues, so the next loader runs while the previous upload is in flight
+- Stage barriers (`wait`) keep the dependencies: districts are in the database before
+  the neighbourhood loaders look them up, neighbourhoods before point features and indicators
+- Tables validated against expected counts are buffered and uploaded whole
+- A loader that raises fails its channel: the upload reading it raises too, so a
+  partial stream is never committed as the whole table (and nothing is deleted)
+
+Used by `python -m auq_data_engine.main --pipelined`.
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from shared.common_lib.emoji_logger import info, success, error
+from auq_data_engine.upload import dedup
+
+# ==================
+# Configuration
+# ==================
+
+DEFAULT_QUEUE_BATCHES = 8  # batches buffered per (table, city) before the loader blocks
+
+_CLOSED = object()
+
+
+class LoaderFailed(RuntimeError):
+    """Raised on the consumer side of a channel whose loader failed."""
+
+
+class _Failure:
+    """Channel sentinel carrying the loader's exception."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+# ==================
+# Channel
+# ==================
+
+class Channel:
+    """
+    Bounded queue of record batches from one loader to one upload.
+
+    Calling the channel (the loader's `sink`) enqueues a batch and blocks while the
+    queue is full; `records()` yields the records on the consumer side until `close()`,
+    or raises LoaderFailed if the channel was closed with an error.
+
+    Args:
+        table_name: Target table
+        city: City key
+        maxsize: Maximum number of queued batches
+    """
+
+    def __init__(self, table_name: str, city: str, maxsize: int = DEFAULT_QUEUE_BATCHES):
+        self.table_name = table_name
+        self.city = city
+        self.queue: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self.batches = 0
+        self.records_in = 0
+        self.done = False
+        self.failed = False
+
+    def __call__(self, batch: List[Dict]) -> None:
+        if not batch:
+            return
+        self.batches += 1
+        self.records_in += len(batch)
+        self.queue.put(list(batch))
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        """End the stream; with `error`, the consumer raises instead of seeing a normal end."""
+        if error is not None:
+            self.failed = True
+        self.queue.put(_CLOSED if error is None else _Failure(error))
+
+    def records(self) -> Iterator[Dict]:
+        while True:
+            batch = self.queue.get()
+            if batch is _CLOSED:
+                self.done = True
+                return
+            if isinstance(batch, _Failure):
+                self.done = True
+                raise LoaderFailed(f"{self.table_name}/{self.city} loader failed: {batch.error}") from batch.error
+            yield from batch
+
+    def drain(self) -> None:
+        """Discard whatever the consumer did not read, so the producer never blocks."""
+        if not self.done:
+            for _ in self.records():
+                pass
+
+# ==================
+# Pipeline
+# ==================
+
+class UploadPipeline:
+    """
+    Run loaders with their uploads overlapped.
+
+    Args:
+        upload_module: Module providing `upload(table, records, city, total)` and
+                       `EXPECTED_COUNTS` (default: upload.upload_to_supabase)
+        maxsize: Queue size per (table, city), in batches
+    """
+
+    def __init__(self, upload_module=None, maxsize: int = DEFAULT_QUEUE_BATCHES):
+        if upload_module is None:
+            from auq_data_engine.upload import upload_to_supabase as upload_module
+        self.upload = upload_module
+        self.maxsize = maxsize
+        self.workers: List[threading.Thread] = []
+        self.results: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def _consume(self, channel: Channel) -> None:
+        label = f"{channel.table_name}/{channel.city}"
+        ok = False
+        try:
+            records: Any = channel.records()
+            if self.upload.EXPECTED_COUNTS[channel.city].get(channel.table_name, 0) > 0:
+                # Small reference tables are validated as a whole before anything is sent
+                records = list(records)
+            elif channel.table_name == "point_features":
+                records = dedup.iter_unique(records)
+            ok = bool(self.upload.upload(channel.table_name, records, channel.city))
+        except Exception as e:
+            error(f"[{label}] Upload worker failed: {e}")
+        finally:
+            try:
+                channel.drain()
+            except LoaderFailed:
+                pass
+            with self._lock:
+                self.results[label] = ok and not channel.failed
+
+    def channel(self, table_name: str, city: str) -> Channel:
+        """Open a channel and start its upload worker."""
+        channel = Channel(table_name, city, self.maxsize)
+        worker = threading.Thread(target=self._consume, args=(channel,), name=f"upload-{table_name}-{city}", daemon=True)
+        worker.start()
+        self.workers.append(worker)
+        return channel
+
+    def run_loader(self, loader: Callable[..., Any], table_name: str, city: str, **kwargs) -> None:
+        """
+        Run a loader's `run()` with a sink feeding the upload of (table, city).
+
+        Args:
+            loader: Loader entry point accepting a `sink` keyword; returns False on failure
+            table_name: Target table
+            city: City key
+            **kwargs: Extra arguments for the loader
+        """
+        channel = self.channel(table_name, city)
+        try:
+            if loader(sink=channel, **kwargs) is False:
+                raise LoaderFailed("loader returned False")
+        except Exception as e:
+            error(f"[{table_name}/{city}] Loader failed after {channel.records_in} records: {e}")
+            channel.close(error=e)
+            return
+        except BaseException as e:  # interrupted: fail the upload, then stop
+            channel.close(error=e)
+            raise
+        channel.close()
+        info(f"[{table_name}/{city}] Extraction done: {channel.records_in} records in {channel.batches} batches")
+
+    def wait(self) -> bool:
+        """
+        Stage barrier: wait for every pending upload.
+
+        Returns:
+            bool: True if every upload since the last barrier succeeded
+        """
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+        with self._lock:
+            results, self.results = self.results, {}
+        failed = [label for label, ok in results.items() if not ok]
+        if failed:
+            error(f"Uploads failed: {', '.join(sorted(failed))}")
+            return False
+        if results:
+            success(f"Uploads complete: {', '.join(sorted(results))}")
+        return True
@@ -0,0 +1,220 @@
+# auq_data_engine/scheduler.py
+
+"""
+ETL Stage Runner: Dependency-Graph Scheduler
+
+- Runs named nodes (e.g. "bcn:districts:etl", "validate:base_data") on a thread pool
+  as soon as all of their dependencies have finished
+- Independent nodes (different cities, or stages that only need reference tables)
+  run concurrently; the pool size bounds the concurrency
+- A node fails when it raises (including sys.exit) or returns False; its dependants
+  are skipped, independent branches keep running
+- Prints a timing summary per node and the critical path (the chain of dependencies
+  that determined the wall-clock time)
+
+Used by `python -m auq_data_engine.main --parallel`.
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from shared.common_lib.emoji_logger import info, success, warning, error
+
+# ==================
+# Configuration
+# ==================
+
+DEFAULT_WORKERS = 4
+
+PENDING, RUNNING, DONE, FAILED, SKIPPED = "pending", "running", "done", "failed", "skipped"
+
+# ==================
+# Graph
+# ==================
+
+class Node:
+    """
+    One unit of work in the graph.
+
+    Args:
+        name: Unique node name
+        func: Callable run without arguments
+        deps: Names of the nodes that must finish first
+    """
+
+    def __init__(self, name: str, func: Callable[[], Any], deps: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.state = PENDING
+        self.start: Optional[float] = None
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        if self.start is None or self.end is None:
+            return 0.0
+        return self.end - self.start
+
+
+class Scheduler:
+    """
+    Dependency-graph scheduler on a thread pool.
+
+    Args:
+        max_workers: Nodes run at the same time
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS):
+        self.max_workers = max_workers
+        self.nodes: Dict[str, Node] = {}
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def add(self, name: str, func: Callable[[], Any], deps: Iterable[str] = ()) -> str:
+        """
+        Add a node.
+
+        Args:
+            name: Unique node name
+            func: Callable run without arguments; returning False marks the node failed
+            deps: Names of the nodes it depends on
+
+        Returns:
+            str: The node name (convenient for wiring dependencies)
+        """
+        if name in self.nodes:
+            raise ValueError(f"Duplicate node '{name}'")
+        self.nodes[name] = Node(name, func, deps)
+        return name
+
+    def _check(self) -> None:
+        for node in self.nodes.values():
+            for dep in node.deps:
+                if dep not in self.nodes:
+                    raise ValueError(f"Node '{node.name}' depends on unknown node '{dep}'")
+
+        # Kahn's algorithm: every node must be reachable in topological order
+        indegree = {name: len(node.deps) for name, node in self.nodes.items()}
+        ready = [name for name, n in indegree.items() if n == 0]
+        visited = 0
+        while ready:
+            name = ready.pop()
+            visited += 1
+            for other in self.nodes.values():
+                if name in other.deps:
+                    indegree[other.name] -= 1
+                    if indegree[other.name] == 0:
+                        ready.append(other.name)
+        if visited != len(self.nodes):
+            cyclic = sorted(name for name, n in indegree.items() if n > 0)
+            raise ValueError(f"Dependency cycle among: {', '.join(cyclic)}")
+
+    def _execute(self, node: Node) -> None:
+        node.start = time.perf_counter()
+        try:
+            result = node.func()
+            node.state = FAILED if result is False else DONE
+            if result is False:
+                node.error = "returned False"
+        except (Exception, SystemExit) as e:
+            node.state = FAILED
+            node.error = str(e) or type(e).__name__
+        finally:
+            node.end = time.perf_counter()
+
+    def _skip_dependants(self, failed: str) -> None:
+        for node in self.nodes.values():
+            if node.state == PENDING and failed in node.deps:
+                node.state = SKIPPED
+                warning(f"[scheduler] Skipping '{node.name}' ('{failed}' did not complete)")
+                self._skip_dependants(node.name)
+
+    def run(self) -> bool:
+        """
+        Run the graph to completion.
+
+        Returns:
+            bool: True if every node succeeded
+        """
+        self._check()
+        self.started = time.perf_counter()
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="etl") as pool:
+            while True:
+                for node in self.nodes.values():
+                    if node.state == PENDING and all(self.nodes[dep].state == DONE for dep in node.deps):
+                        node.state = RUNNING
+                        info(f"[scheduler] Starting '{node.name}'")
+                        running[pool.submit(self._execute, node)] = node.name
+                if not running:
+                    break
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    node = self.nodes[running.pop(future)]
+                    if node.state == DONE:
+                        success(f"[scheduler] '{node.name}' finished in {node.duration:.1f}s")
+                    else:
+                        error(f"[scheduler] '{node.name}' failed after {node.duration:.1f}s: {node.error}")
+                        self._skip_dependants(node.name)
+        self.finished = time.perf_counter()
+        return all(node.state == DONE for node in self.nodes.values())
+
+    # ==================
+    # Timing Summary
+    # ==================
+
+    def critical_path(self) -> List[Node]:
+        """
+        Chain of nodes that determined the wall-clock time: starting from the node
+        that finished last, follow the dependency that finished last.
+        """
+        finished = [node for node in self.nodes.values() if node.end is not None]
+        if not finished:
+            return []
+        path = [max(finished, key=lambda n: n.end)]
+        while True:
+            deps = [self.nodes[dep] for dep in path[-1].deps if self.nodes[dep].end is not None]
+            if not deps:
+                break
+            path.append(max(deps, key=lambda n: n.end))
+        return list(reversed(path))
+
+    def summary(self) -> Dict[str, Any]:
+        """Wall-clock time, summed node time, node timings and the critical path."""
+        wall = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        path = self.critical_path()
+        return {
+            "wall_seconds": round(wall, 3),
+            "busy_seconds": round(sum(node.duration for node in self.nodes.values()), 3),
+            "nodes": {
+                name: {"state": node.state, "seconds": round(node.duration, 3),
+                       "start": round(node.start - self.started, 3) if node.start is not None else None}
+                for name, node in self.nodes.items()
+            },
+            "critical_path": [node.name for node in path],
+            "critical_path_seconds": round(sum(node.duration for node in path), 3),
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """Log the timing summary."""
+        summary = self.summary()
+        width = max((len(name) for name in self.nodes), default=0)
+        on_path = set(summary["critical_path"])
+        for name, node in summary["nodes"].items():
+            start = f"+{node['start']:.1f}s" if node["start"] is not None else "-"
+            marker = " *" if name in on_path else ""
+            info(f"[scheduler] {name:<{width}}  {node['state']:<7}  {start:>8}  {node['seconds']:>7.1f}s{marker}")
+        info(f"[scheduler] Critical path (*): {' -> '.join(summary['critical_path'])} "
+             f"({summary['critical_path_seconds']:.1f}s)")
+        info(f"[scheduler] Wall clock {summary['wall_seconds']:.1f}s for {summary['busy_seconds']:.1f}s of work "
+             f"on {self.max_workers} workers")
+        return summary
@@ -0,0 +1,291 @@
+# auq_data_engine/spatial_join.py
+
+"""
+ETL Stage: Spatial Join of Point Features to Neighbourhoods
+
+- Loads the neighbourhood polygons produced by the neighbourhood ETLs
+  (insert_ready_neighbourhoods_[city].json)
+- Builds a shapely STRtree and locates every point with one vectorized query
+- Assigns geo_id from the containing polygon, keeping the API-provided value
+  only when a point falls outside every polygon
+- Reports disagreements between the API-provided neighbourhood and the polygon
+- Keeps unresolved points at city level instead of dropping them
+
+Usage:
+    python -m auq_data_engine.spatial_join --city bcn
+    (Re-assigns geo_id in the processed point features file of a city)
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from dotenv import load_dotenv
+from supabase import create_client, Client
+
+from shared.common_lib.emoji_logger import info, success, warning, error
+from shared.common_lib import ndjson
+from auq_data_engine import geometry
+
+# ============================
+# Configuration & Constants
+# ============================
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+
+BASE_DIR = Path(__file__).resolve().parent
+PROCESSED_DIR = BASE_DIR / "data/processed"
+
+CITIES = {
+    "bcn": {"city_id": 1, "suffix": "bcn"},
+    "madrid": {"city_id": 2, "suffix": "madrid"},
+}
+
+GEO_LEVEL_CITY = 1
+GEO_LEVEL_NEIGHBOURHOOD = 3
+
+NO_MATCH = -1
+MAX_REPORTED_DISAGREEMENTS = 10
+
+
+def neighbourhoods_path(city: str) -> Path:
+    return PROCESSED_DIR / f"insert_ready_neighbourhoods_{CITIES[city]['suffix']}.json"
+
+
+def point_features_path(city: str) -> Path:
+    return PROCESSED_DIR / f"insert_ready_point_features_{CITIES[city]['suffix']}.json"
+
+# ===================
+# Polygon Index
+# ===================
+
+def parse_geom(geom: str):
+    """Parse a geometry value (EWKT, WKT or hex EWKB) into a shapely geometry."""
+    return geometry.decode(geom)
+
+
+class NeighbourhoodIndex:
+    """
+    STRtree over the neighbourhood polygons of one city.
+
+    Args:
+        codes: Neighbourhood codes, aligned with `geoms`
+        geoms: Neighbourhood (multi)polygons
+    """
+
+    def __init__(self, codes: List[int], geoms: List[Any]):
+        self.codes = np.asarray(codes, dtype="int64")
+        self.tree = STRtree(geoms)
+
+    @classmethod
+    def from_file(cls, path: Path) -> "NeighbourhoodIndex":
+        """Build the index from an insert_ready_neighbourhoods_[city].json file."""
+        neighbourhoods = ndjson.read_records(path)
+        codes = [int(n["neighbourhood_code"]) for n in neighbourhoods]
+        geoms = [parse_geom(n["geom"]) for n in neighbourhoods]
+        info(f"Indexed {len(geoms)} neighbourhood polygons from {Path(path).name}")
+        return cls(codes, geoms)
+
+    def locate(self, lons: np.ndarray, lats: np.ndarray) -> np.ndarray:
+        """
+        Find the neighbourhood code of every point in a single tree query.
+
+        Args:
+            lons: Longitudes
+            lats: Latitudes
+
+        Returns:
+            np.ndarray: Neighbourhood code per point, NO_MATCH (-1) outside every polygon
+        """
+        points = shapely.points(np.asarray(lons, dtype="float64"), np.asarray(lats, dtype="float64"))
+        # The predicate is evaluated as predicate(point, polygon); "intersects"
+        # also keeps points that lie exactly on a shared boundary
+        point_idx, polygon_idx = self.tree.query(points, predicate="intersects")
+
+        codes = np.full(len(points), NO_MATCH, dtype="int64")
+        # Results are sorted by point; keep the first polygon for boundary points
+        first_match = np.unique(point_idx, return_index=True)[1]
+        codes[point_idx[first_match]] = self.codes[polygon_idx[first_match]]
+        return codes
+
+# ===================
+# Database Lookup
+# ===================
+
+def get_supabase_client() -> Optional[Client]:
+    """Initialize and return a Supabase client"""
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        error("Supabase credentials not found in environment variables")
+        return None
+
+    try:
+        return create_client(SUPABASE_URL, SUPABASE_KEY)
+    except Exception as e:
+        error(f"Failed to initialize Supabase client: {str(e)}")
+        return None
+
+
+def load_code_index(supabase: Client, city_id: int) -> Dict[int, int]:
+    """
+    Load the neighbourhood code → ID table of a city with a single query.
+
+    Args:
+        supabase: Supabase client
+        city_id: City ID
+
+    Returns:
+        Dict[int, int]: Neighbourhood ID per neighbourhood code
+    """
+    try:
+        response = supabase.table("neighbourhoods") \
+            .select("id, neighbourhood_code") \
+            .eq("city_id", city_id) \
+            .execute()
+        return {int(row["neighbourhood_code"]): row["id"] for row in response.data or []}
+    except Exception as e:
+        error(f"Failed to load neighbourhood IDs for city_id = {city_id}: {str(e)}")
+        return {}
+
+# ===================
+# Assignment
+# ===================
+
+def assign_neighbourhoods(
+    records: List[Dict],
+    index: Optional[NeighbourhoodIndex],
+    code_to_id: Dict[int, int],
+    city_id: int
+) -> Dict[str, int]:
+    """
+    Set `geo_id` on every point feature record from its containing polygon (in place).
+
+    - Inside a polygon: geo_id is the neighbourhood ID of that polygon
+    - Outside every polygon: the API-provided geo_id is kept
+    - No polygon and no API value: the record is kept at city level
+
+    Args:
+        records: Point feature records with latitude/longitude and an optional geo_id
+        index: Neighbourhood polygon index (None skips the spatial lookup)
+        code_to_id: Neighbourhood code → ID table of the city
+        city_id: City ID (used for the city-level fallback)
+
+    Returns:
+        Dict[str, int]: Counts of spatial, api, city_level and disagreement assignments
+    """
+    stats = {"spatial": 0, "api": 0, "city_level": 0, "disagreements": 0}
+    if not records:
+        return stats
+
+    if index is not None:
+        codes = index.locate(
+            np.fromiter((float(r["longitude"]) for r in records), dtype="float64", count=len(records)),
+            np.fromiter((float(r["latitude"]) for r in records), dtype="float64", count=len(records)),
+        )
+    else:
+        codes = np.full(len(records), NO_MATCH, dtype="int64")
+
+    disagreements = []
+    for record, code in zip(records, codes.tolist()):
+        api_id = record.get("geo_id")
+        spatial_id = code_to_id.get(code) if code != NO_MATCH else None
+
+        if spatial_id is not None:
+            if api_id is not None and api_id != spatial_id:
+                stats["disagreements"] += 1
+                if len(disagreements) < MAX_REPORTED_DISAGREEMENTS:
+                    disagreements.append((record.get("name"), api_id, spatial_id))
+            record["geo_id"] = spatial_id
+            record["geo_level_id"] = GEO_LEVEL_NEIGHBOURHOOD
+            stats["spatial"] += 1
+        elif api_id is not None:
+            stats["api"] += 1
+        else:
+            record["geo_id"] = city_id
+            record["geo_level_id"] = GEO_LEVEL_CITY
+            stats["city_level"] += 1
+
+    info(
+        f"Spatial join: {stats['spatial']} by polygon, {stats['api']} kept from API, "
+        f"{stats['city_level']} at city level"
+    )
+    if stats["disagreements"]:
+        warning(f"{stats['disagreements']} points disagree with the API-provided neighbourhood")
+        for name, api_id, spatial_id in disagreements:
+            warning(f"  '{name}': API geo_id {api_id} → polygon geo_id {spatial_id}")
+    if stats["city_level"]:
+        warning(f"{stats['city_level']} points could not be placed in a neighbourhood and were kept at city level")
+    return stats
+
+
+def join_city(records: List[Dict], city: str, code_to_id: Dict[int, int]) -> Dict[str, int]:
+    """
+    Run the spatial join for a city using its processed neighbourhood polygons.
+
+    Args:
+        records: Point feature records of the city (updated in place)
+        city: City key ("bcn" or "madrid")
+        code_to_id: Neighbourhood code → ID table of the city
+
+    Returns:
+        Dict[str, int]: Assignment counts (see `assign_neighbourhoods`)
+    """
+    path = neighbourhoods_path(city)
+    index = None
+    if path.exists():
+        index = NeighbourhoodIndex.from_file(path)
+    else:
+        warning(f"Neighbourhood polygons not found at {path}; keeping API-provided neighbourhoods")
+    return assign_neighbourhoods(records, index, code_to_id, CITIES[city]["city_id"])
+
+# ===================
+# Core ETL Process
+# ===================
+
+def run(city: str, points_path: Path = None) -> None:
+    """
+    Re-assign geo_id in the processed point features file of a city.
+
+    Args:
+        city: City key ("bcn" or "madrid")
+        points_path: Point features file (default: insert_ready_point_features_[city].json)
+    """
+    points_path = Path(points_path or point_features_path(city))
+    info(f"Starting spatial join for {city} point features...")
+
+    supabase = get_supabase_client()
+    if not supabase:
+        error("Failed to initialize Supabase client. Exiting.")
+        return
+
+    records = ndjson.read_records(points_path)
+
+    join_city(records, city, load_code_index(supabase, CITIES[city]["city_id"]))
+
+    ndjson.write_records(points_path, records)
+    success(f"Output saved to: {points_path}")
+
+# ==========================
+# CLI Entry Point
+# ==========================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Assign point features to neighbourhoods by polygon containment.")
+    parser.add_argument("--city", choices=sorted(CITIES), required=True)
+    parser.add_argument("--points_path", type=str, default=None)
+
+    args = parser.parse_args()
+    run(args.city, args.points_path)
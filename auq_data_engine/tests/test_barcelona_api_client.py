@@ -0,0 +1,58 @@
+# auq_data_engine/tests/test_barcelona_api_client.py
+
+"""
+Test Suite: Barcelona CKAN API Client
+
+This test module ensures that the paginated datastore fetcher:
+- Returns the same records in the same order in sequential and concurrent mode
+- Honours the configured page size
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import time
+import random
+
+from auq_data_engine.barcelona import api_client
+
+TOTAL_RECORDS = 2350
+
+# =====================
+# Fake Datastore
+# =====================
+
+def fake_fetch_page(resource_id, offset, limit=api_client.DEFAULT_LIMIT, **_kwargs):
+    # Random latency so concurrent pages complete out of order
+    time.sleep(random.uniform(0, 0.01))
+    records = [{"_id": i} for i in range(offset, min(offset + limit, TOTAL_RECORDS))]
+    return {"total": TOTAL_RECORDS, "records": records}
+
+# =====================
+# Tests
+# =====================
+
+def test_sequential_and_concurrent_modes_match(monkeypatch):
+    monkeypatch.setattr(api_client, "fetch_page", fake_fetch_page)
+
+    sequential = api_client.fetch_resource_data("resource", page_size=500)
+    concurrent = api_client.fetch_resource_data("resource", page_size=500, concurrent=True, max_workers=4)
+
+    assert [r["_id"] for r in sequential] == list(range(TOTAL_RECORDS))
+    assert concurrent == sequential
+
+
+def test_concurrent_mode_requests_each_offset_once(monkeypatch):
+    requested = []
+
+    def recording_fetch_page(resource_id, offset, limit=api_client.DEFAULT_LIMIT, **kwargs):
+        requested.append((offset, limit))
+        return fake_fetch_page(resource_id, offset, limit, **kwargs)
+
+    monkeypatch.setattr(api_client, "fetch_page", recording_fetch_page)
+    api_client.fetch_resource_data("resource", page_size=1000, concurrent=True)
+
+    assert sorted(requested) == [(0, 1000), (1000, 1000), (2000, 1000)]
@@ -20,7 +20,9 @@ import pytest
 import requests
 import geopandas as gpd
 from shapely import wkt
+from auq_data_engine import geometry
 from pathlib import Path
+from shared.common_lib import ndjson
 
 # =====================
 # Paths & Manifest
@@ -41,7 +43,7 @@ with open(MANIFEST_PATH, encoding="utf-8") as f:
 def compare_geometries(raw_geom, processed_geom, tolerance=0.00001):
     try:
         shape_raw = wkt.loads(raw_geom)
-        shape_processed = wkt.loads(processed_geom.replace("SRID=4326;", ""))
+        shape_processed = geometry.decode(processed_geom)
         return shape_raw.equals_exact(shape_processed, tolerance)
     except Exception as e:
         print(f"⚠️ Geometry comparison error: {e}")
@@ -71,8 +73,7 @@ def get_base_data_cases():
 def test_processed_file_not_empty(city, dtype, raw_data_url, processed_filename):
     path = PROCESSED_DIR / processed_filename
     assert path.exists(), f"❌ Missing processed file for {city}/{dtype}: {processed_filename}"
-    with path.open(encoding="utf-8") as f:
-        data = json.load(f)
+    data = ndjson.read_records(path)
     assert isinstance(data, list), f"❌ Expected list in {processed_filename}"
     assert len(data) > 0, f"❌ {processed_filename} is empty"
 
@@ -107,8 +108,7 @@ def test_geometry_preserved(city, dtype, raw_data_url, processed_filename):
 
     # 🗂️ Load processed geometry
     try:
-        with processed_path.open(encoding="utf-8") as f:
-            processed = json.load(f)
+        processed = ndjson.read_records(processed_path)
         processed_geom = processed[0]["geom"]
     except Exception as e:
         pytest.fail(f"❌ Could not read processed file: {processed_filename}: {e}")
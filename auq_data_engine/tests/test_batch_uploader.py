@@ -0,0 +1,186 @@
+# auq_data_engine/tests/test_batch_uploader.py
+
+"""
+Test Suite: Concurrent Adaptive-Batch Uploader
+
+This test module ensures that the uploader:
+- Uploads every record exactly once with a bounded number of requests in flight
+- Retries transient failures and gives up on permanent ones
+- Splits failing batches until the bad records are isolated
+- Does not split batches on systemic errors or when both halves fail like their parent
+- Grows the batch size after fast requests and shrinks it after slow or large ones
+- Never builds a request body above the byte limit
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import threading
+import time
+
+from auq_data_engine.upload.batch_uploader import AdaptiveBatchUploader, is_systemic, is_transient, payload_size
+
+
+def make_records(n):
+    return [{"id": i, "name": f"point {i}"} for i in range(n)]
+
+
+class RecordingSender:
+    """Fake send function that records batches and tracks concurrency."""
+
+    def __init__(self, delay=0.0, fail_ids=(), transient_failures=0):
+        self.delay = delay
+        self.fail_ids = set(fail_ids)
+        self.transient_failures = transient_failures
+        self.batches = []
+        self.batches_records = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, batch):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            with self.lock:
+                if self.transient_failures:
+                    self.transient_failures -= 1
+                    raise TimeoutError("read timed out")
+            bad = [r["id"] for r in batch if r["id"] in self.fail_ids]
+            if bad:
+                raise ValueError(f"Failing row contains ({bad[0]}): violates check constraint")
+            with self.lock:
+                self.batches.append([r["id"] for r in batch])
+                self.batches_records.append(batch)
+            return len(batch)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+# =====================
+# Upload Tests
+# =====================
+
+def test_uploads_all_records_with_bounded_concurrency():
+    sender = RecordingSender(delay=0.01)
+    uploader = AdaptiveBatchUploader(sender, initial_batch=10, max_in_flight=3)
+
+    summary = uploader.run(make_records(250))
+
+    uploaded = sorted(i for batch in sender.batches for i in batch)
+    assert uploaded == list(range(250))
+    assert summary["rows_uploaded"] == 250
+    assert summary["rows_failed"] == 0
+    assert 1 < sender.max_in_flight <= 3
+    assert len(uploader.metrics) == summary["requests"]
+    assert all({"size", "rows", "bytes", "latency"} <= set(m) for m in uploader.metrics)
+
+
+def test_retries_transient_failures():
+    sender = RecordingSender(transient_failures=2)
+    sleeps = []
+    uploader = AdaptiveBatchUploader(sender, initial_batch=50, max_in_flight=1, sleep=sleeps.append)
+
+    summary = uploader.run(make_records(50))
+
+    assert summary["rows_uploaded"] == 50
+    assert summary["retries"] == 2
+    assert len(sleeps) == 2
+
+
+def test_isolates_bad_records_by_bisection():
+    sender = RecordingSender(fail_ids={7, 33})
+    uploader = AdaptiveBatchUploader(sender, initial_batch=64, min_batch=64, max_in_flight=1)
+
+    summary = uploader.run(make_records(64))
+
+    assert summary["rows_uploaded"] == 62
+    assert sorted(r["id"] for r in uploader.failed_records) == [7, 33]
+    assert summary["retries"] == 0  # permanent errors are not retried
+
+
+class APIError(Exception):
+    def __init__(self, code, message="request failed"):
+        super().__init__(message)
+        self.code = code
+
+
+def test_systemic_errors_are_not_split():
+    calls = []
+
+    def send(batch):
+        calls.append(len(batch))
+        raise APIError(401, "Invalid API key")
+
+    uploader = AdaptiveBatchUploader(send, initial_batch=64, min_batch=64, max_in_flight=1)
+    summary = uploader.run(make_records(64))
+
+    assert calls == [64]
+    assert summary["rows_failed"] == 64 and summary["rows_uploaded"] == 0
+
+
+def test_stops_splitting_when_halves_fail_like_the_parent():
+    calls = []
+
+    def send(batch):
+        calls.append(len(batch))
+        raise ValueError("violates check constraint")
+
+    uploader = AdaptiveBatchUploader(send, initial_batch=64, min_batch=64, max_in_flight=1)
+    summary = uploader.run(make_records(64))
+
+    assert calls == [64, 32, 32]
+    assert summary["rows_failed"] == 64
+
+
+def test_batch_size_adapts_to_latency():
+    fast = AdaptiveBatchUploader(RecordingSender(), initial_batch=10, increase_step=10, max_in_flight=1)
+    fast.run(make_records(200))
+    assert fast.batch_size > 10
+
+    slow = AdaptiveBatchUploader(RecordingSender(delay=0.02), initial_batch=40, min_batch=5,
+                                 target_latency=0.01, max_in_flight=1)
+    slow.run(make_records(100))
+    assert slow.batch_size < 40
+
+
+def test_batch_size_respects_payload_limit():
+    sender = RecordingSender()
+    uploader = AdaptiveBatchUploader(sender, initial_batch=100, max_in_flight=1, max_payload_bytes=2000)
+
+    summary = uploader.run(iter(make_records(300)))
+
+    assert summary["rows_uploaded"] == 300
+    assert all(m["bytes"] <= 2000 for m in uploader.metrics)
+    assert all(m["bytes"] == payload_size(batch) for m, batch in zip(uploader.metrics, sender.batches_records))
+
+
+def test_oversized_record_is_sent_alone():
+    sender = RecordingSender()
+    uploader = AdaptiveBatchUploader(sender, initial_batch=10, max_in_flight=1, max_payload_bytes=100)
+
+    records = make_records(3)
+    records[1]["name"] = "x" * 500
+    uploader.run(records)
+
+    assert sender.batches == [[0], [1], [2]]
+
+
+def test_is_transient():
+    assert is_transient(TimeoutError())
+    assert is_transient(APIError("503"))
+    assert not is_transient(APIError("23505"))
+    assert not is_transient(ValueError("bad value"))
+
+
+def test_is_systemic():
+    assert is_systemic(APIError("42501", "new row violates row-level security policy"))
+    assert is_systemic(APIError("PGRST204", "Could not find the 'foo' column"))
+    assert is_systemic(APIError(None, "JWT expired"))
+    assert not is_systemic(APIError("23505", "duplicate key value violates unique constraint"))
+    assert not is_systemic(TimeoutError())
@@ -0,0 +1,94 @@
+# auq_data_engine/tests/test_bcn_indicators_csv.py
+
+"""
+Test Suite: Barcelona Indicator CSV Parsing
+
+This test module ensures that indicator CSVs are:
+- Decoded with the right encoding, detected from a byte prefix
+- Parsed keeping only the neighborhood and value columns, with compact dtypes
+- Parsed without failing on non-numeric values, which are dropped (comma decimals are accepted)
+- Aggregated to the same values as a plain full-file parse
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import codecs
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from auq_data_engine import indicator_records
+from auq_data_engine.barcelona import load_indicators
+
+SAMPLE_DIR = Path(__file__).resolve().parent.parent / "data/raw_sample/barcelona_sample/indicators"
+SAMPLE_FILES = sorted(SAMPLE_DIR.rglob("*.csv"))
+
+# =====================
+# Tests
+# =====================
+
+@pytest.mark.parametrize("content,expected", [
+    ("Nom_Barri\nel Barri Gòtic\n".encode("utf-8"), "utf-8"),
+    (codecs.BOM_UTF8 + "Nom_Barri\nSant Gervasi\n".encode("utf-8"), "utf-8-sig"),
+    ("Nom_Barri\nel Barri Gòtic\n".encode("latin1"), "latin1"),
+])
+def test_detect_encoding(content, expected):
+    assert load_indicators.detect_encoding(content) == expected
+
+
+def test_detect_encoding_ignores_character_cut_by_prefix(monkeypatch):
+    monkeypatch.setattr(indicator_records, "ENCODING_SNIFF_BYTES", 4)
+    assert load_indicators.detect_encoding("Gòtic".encode("utf-8")) == "utf-8"
+
+
+def test_latin1_file_keeps_only_needed_columns():
+    content = (
+        "Any,Codi_Barri,Nom_Barri,Seccio_Censal,Superfície (ha)\n"
+        "2020,6,la Sagrada Família,1,3.5\n"
+        "2020,6,la Sagrada Família,2,1.5\n"
+    ).encode("latin1")
+
+    df = load_indicators.parse_csv_bytes(content, "surface")
+
+    assert list(df.columns) == ["Codi_Barri", "Nom_Barri", "Superfície (ha)"]
+    assert str(df["Codi_Barri"].dtype) == "Int16"
+    assert str(df["Nom_Barri"].dtype) == "category"
+    assert df["Nom_Barri"].iloc[0] == "la Sagrada Família"
+    assert str(df["Superfície (ha)"].dtype) == "float64"
+
+
+def test_non_numeric_values_are_dropped():
+    content = (
+        "Any,Codi_Barri,Nom_Barri,Seccio_Censal,Superfície (ha)\n"
+        "2020,6,la Sagrada Família,1,3.5\n"
+        "2020,6,la Sagrada Família,2,n/d\n"
+        "2020,6,la Sagrada Família,3,\n"
+        "2020,7,la Nova Esquerra de l'Eixample,1,\"1,5\"\n"
+    ).encode("utf-8")
+
+    df = load_indicators.parse_csv_bytes(content, "surface")
+
+    assert df["Codi_Barri"].tolist() == [6, 6, 7]
+    assert df["Superfície (ha)"].tolist()[0] == 3.5
+    assert pd.isna(df["Superfície (ha)"].iloc[1])
+    assert df["Superfície (ha)"].tolist()[2] == 1.5
+
+
+@pytest.mark.parametrize("path", SAMPLE_FILES, ids=lambda p: f"{p.parent.name}/{p.name}")
+def test_sample_files_aggregate_like_full_parse(path):
+    indicator_name = path.parent.name
+    content = path.read_bytes()
+
+    compact = load_indicators.aggregate_by_neighborhood(
+        load_indicators.parse_csv_bytes(content, indicator_name), indicator_name
+    )
+    full = load_indicators.aggregate_by_neighborhood(pd.read_csv(BytesIO(content)), indicator_name)
+
+    assert compact["Codi_Barri"].tolist() == full["Codi_Barri"].tolist()
+    assert compact["Valor"].tolist() == pytest.approx(full["Valor"].tolist())
@@ -0,0 +1,226 @@
+# auq_data_engine/tests/test_changeset.py
+
+"""
+Test Suite: Incremental Change-Set Upload
+
+This test module ensures that:
+- Record hashes are stable and key-order independent
+- Only new and changed records are sent on a re-run
+- Records that disappeared upstream are deleted and dropped from the manifest
+- Point features are keyed on coordinates rounded like the database's unique index
+- Records that failed to upload are sent again on the next run
+- Full uploads send everything and refresh the manifest without deleting
+- Nothing is deleted after a truncated read, a loader failure or a mass removal
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import os
+
+import pytest
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "header.payload.signature")
+
+from shared.common_lib import ndjson  # noqa: E402
+from auq_data_engine.upload import changeset, upload_to_supabase  # noqa: E402
+from auq_data_engine.upload.ledger import UploadLedger  # noqa: E402
+
+
+def indicator(geo_id, name, value=1.0):
+    # "name" is not an indicator column; it only labels records in the fake client
+    return {"indicator_def_id": 1, "geo_level_id": 3, "geo_id": geo_id, "city_id": 1,
+            "year": 2023, "value": value, "name": name}
+
+
+class FakeSupabase:
+    """Records upserted rows and delete filters."""
+
+    def __init__(self, fail_names=()):
+        self.upserted = []
+        self.deleted = []
+        self.fail_names = set(fail_names)
+
+    def table(self, name):
+        return self
+
+    def upsert(self, rows, on_conflict=""):
+        self._rows = list(rows)
+        self._action = "upsert"
+        return self
+
+    def delete(self):
+        self._action = "delete"
+        return self
+
+    def or_(self, filters):
+        self._filters = filters
+        return self
+
+    def execute(self):
+        if self._action == "delete":
+            self.deleted.append(self._filters)
+            return type("Response", (), {"data": []})()
+        if any(r["name"] in self.fail_names for r in self._rows):
+            raise ValueError("violates check constraint")
+        self.upserted.extend(r["name"] for r in self._rows)
+        return type("Response", (), {"data": self._rows})()
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    fake = FakeSupabase()
+    monkeypatch.setattr(upload_to_supabase, "supabase", fake)
+    monkeypatch.setattr(upload_to_supabase, "BACKEND", "rest")
+    monkeypatch.setattr(upload_to_supabase, "INCREMENTAL", True)
+    monkeypatch.setattr(changeset, "MANIFEST_DIR", tmp_path)
+    monkeypatch.setattr(upload_to_supabase, "LEDGER", UploadLedger(":memory:"))
+    # The tables below are tiny, so any deletion is a large share of them
+    monkeypatch.setattr(upload_to_supabase, "ALLOW_MASS_DELETE", True)
+    return fake
+
+# =====================
+# Hashing Tests
+# =====================
+
+def test_record_hash_is_key_order_independent():
+    a = {"name": "x", "city_id": 1, "properties": {"b": 1, "a": 2}}
+    b = {"properties": {"a": 2, "b": 1}, "city_id": 1, "name": "x"}
+    assert changeset.record_hash(a) == changeset.record_hash(b)
+    assert changeset.record_hash(a) != changeset.record_hash(dict(a, name="y"))
+
+
+def test_postgrest_key_filter():
+    keys = [{"city_id": 1, "district_code": 3}, {"city_id": 1, "district_code": 'a"b'}]
+    assert changeset.postgrest_key_filter(keys) == (
+        'and(city_id.eq."1",district_code.eq."3"),and(city_id.eq."1",district_code.eq."a\\"b")'
+    )
+
+# =====================
+# Upload Tests
+# =====================
+
+def test_second_run_sends_only_changes_and_deletes_removed(client):
+    first = [indicator(1, "a"), indicator(2, "b"), indicator(3, "c")]
+    assert upload_to_supabase.upload("indicators", first, "bcn")
+    assert sorted(client.upserted) == ["a", "b", "c"]
+
+    client.upserted.clear()
+    assert upload_to_supabase.upload("indicators", first, "bcn")
+    assert client.upserted == []
+    assert client.deleted == []
+
+    second = [indicator(1, "a"), indicator(2, "b renamed"), indicator(4, "d")]
+    assert upload_to_supabase.upload("indicators", second, "bcn")
+    assert sorted(client.upserted) == ["b renamed", "d"]
+    assert client.deleted == [
+        'and(indicator_def_id.eq."1",geo_level_id.eq."3",geo_id.eq."3",city_id.eq."1",year.eq."2023")'
+    ]
+
+    client.upserted.clear()
+    client.deleted.clear()
+    assert upload_to_supabase.upload("indicators", second, "bcn")
+    assert client.upserted == [] and client.deleted == []
+
+
+def test_failed_records_are_retried_next_run(client):
+    records = [indicator(1, "a"), indicator(2, "bad")]
+    client.fail_names = {"bad"}
+    upload_to_supabase.upload("indicators", records, "bcn")
+    assert client.upserted == ["a"]
+
+    client.fail_names = set()
+    client.upserted.clear()
+    assert upload_to_supabase.upload("indicators", records, "bcn")
+    assert client.upserted == ["bad"]
+
+
+def test_full_upload_sends_everything_and_refreshes_the_manifest(client, monkeypatch):
+    records = [indicator(1, "a"), indicator(2, "b")]
+    upload_to_supabase.upload("indicators", records, "bcn")
+
+    monkeypatch.setattr(upload_to_supabase, "INCREMENTAL", False)
+    client.upserted.clear()
+    assert upload_to_supabase.upload("indicators", records[:1] + [indicator(3, "c")], "bcn")
+    assert sorted(client.upserted) == ["a", "c"]
+    assert client.deleted == []
+
+    # The manifest now holds a and c; b is still pending deletion
+    monkeypatch.setattr(upload_to_supabase, "INCREMENTAL", True)
+    client.upserted.clear()
+    assert upload_to_supabase.upload("indicators", records[:1] + [indicator(3, "c")], "bcn")
+    assert client.upserted == []
+    assert client.deleted == [
+        'and(indicator_def_id.eq."1",geo_level_id.eq."3",geo_id.eq."2",city_id.eq."1",year.eq."2023")'
+    ]
+
+
+def test_point_moved_below_rounding_keeps_its_key(client):
+    point = {"feature_definition_id": 1, "latitude": 41.38792341, "longitude": 2.16991212,
+             "city_id": 1, "name": "library"}
+    assert upload_to_supabase.upload("point_features", [point], "bcn")
+
+    client.upserted.clear()
+    moved = dict(point, latitude=41.38792344)
+    assert upload_to_supabase.upload("point_features", [moved], "bcn")
+    assert client.upserted == ["library"]
+    assert client.deleted == []
+
+    # Removing it deletes the exact coordinates that were uploaded last
+    assert upload_to_supabase.upload("point_features", [dict(point, longitude=2.2, name="other")], "bcn")
+    assert client.deleted == [
+        'and(feature_definition_id.eq."1",latitude.eq."41.38792344",longitude.eq."2.16991212",city_id.eq."1")'
+    ]
+
+# =====================
+# Deletion Guard Tests
+# =====================
+
+def test_truncated_file_triggers_no_deletes(client, tmp_path):
+    path = tmp_path / "insert_ready_indicators_bcn.json"
+    ndjson.write_records(path, [indicator(i, f"n{i}") for i in range(1, 12)])
+    assert upload_to_supabase.upload_file("indicators", path)
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    lines[1] = lines[1][:-5]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    assert not upload_to_supabase.upload_file("indicators", path)
+    assert client.deleted == []
+
+    # The manifest was left alone: the intact file is unchanged, nothing is deleted
+    ndjson.write_records(path, [indicator(i, f"n{i}") for i in range(1, 12)])
+    client.upserted.clear()
+    assert upload_to_supabase.upload_file("indicators", path)
+    assert client.upserted == [] and client.deleted == []
+
+
+def test_failed_loader_inputs_block_deletes(client, tmp_path):
+    path = tmp_path / "insert_ready_indicators_bcn.json"
+    ndjson.write_records(path, [indicator(i, f"n{i}") for i in range(1, 21)])
+    assert upload_to_supabase.upload_file("indicators", path)
+
+    ndjson.write_records(path, [indicator(i, f"n{i}") for i in range(2, 21)],
+                         incomplete=["population 2023: https://example.org/population.csv"])
+    assert upload_to_supabase.upload_file("indicators", path)
+    assert client.deleted == []
+
+    ndjson.write_records(path, [indicator(i, f"n{i}") for i in range(2, 21)])
+    assert upload_to_supabase.upload_file("indicators", path)
+    assert len(client.deleted) == 1
+
+
+def test_mass_deletion_needs_override(client, monkeypatch):
+    monkeypatch.setattr(upload_to_supabase, "ALLOW_MASS_DELETE", False)
+    records = [indicator(i, f"n{i}") for i in range(1, 21)]
+    assert upload_to_supabase.upload("indicators", records, "bcn")
+
+    assert upload_to_supabase.upload("indicators", records[:5], "bcn")
+    assert client.deleted == []
+
+    monkeypatch.setattr(upload_to_supabase, "ALLOW_MASS_DELETE", True)
+    assert upload_to_supabase.upload("indicators", records[:5], "bcn")
+    assert client.deleted[0].count("and(") == 15
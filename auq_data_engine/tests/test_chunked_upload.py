@@ -0,0 +1,181 @@
+# auq_data_engine/tests/test_chunked_upload.py
+
+"""
+Test Suite: Chunked Streaming Upload
+
+This test module ensures that upload_to_supabase:
+- Reads insert_ready files lazily, one record at a time
+- Splits every table into byte-bounded upsert requests
+- Uses the right on_conflict target per table
+- Validates expected counts without loading the file into memory
+- Still uploads the readable cities' point features when another city's file is malformed
+
+The Supabase client is replaced by an in-memory fake; no network access is needed.
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import os
+import json
+import threading
+
+import pytest
+
+# The module creates its client at import time; any well-formed values will do
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "header.payload.signature")
+
+from auq_data_engine.upload import upload_to_supabase  # noqa: E402
+from auq_data_engine.upload import batch_uploader  # noqa: E402
+from auq_data_engine.upload.ledger import UploadLedger  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeSupabase:
+    """Records every upsert request as (table, rows, on_conflict, body bytes)."""
+
+    def __init__(self):
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def table(self, name):
+        self._table = name
+        return self
+
+    def upsert(self, rows, on_conflict=""):
+        request = (self._table, list(rows), on_conflict, batch_uploader.payload_size(rows))
+        return FakeQuery(self, request)
+
+
+class FakeQuery:
+    def __init__(self, client, request):
+        self.client = client
+        self.request = request
+
+    def execute(self):
+        with self.client.lock:
+            self.client.requests.append(self.request)
+        return FakeResponse(self.request[1])
+
+
+@pytest.fixture
+def fake_supabase(monkeypatch, tmp_path):
+    client = FakeSupabase()
+    monkeypatch.setattr(upload_to_supabase, "supabase", client)
+    monkeypatch.setattr(upload_to_supabase, "BACKEND", "rest")
+    monkeypatch.setattr(upload_to_supabase, "INCREMENTAL", False)
+    monkeypatch.setattr(upload_to_supabase.changeset, "MANIFEST_DIR", tmp_path / "upload_manifest")
+    monkeypatch.setattr(upload_to_supabase, "LEDGER", UploadLedger(":memory:"))
+    return client
+
+
+def write_json(path, records):
+    path.write_text(json.dumps(records, indent=2), encoding="utf-8")
+    return path
+
+# =====================
+# Streaming Read Tests
+# =====================
+
+def test_iter_json_records_streams_the_file(tmp_path):
+    records = [{"id": i, "geom": "SRID=4326;POINT(2.1 41.3)"} for i in range(5)]
+    path = write_json(tmp_path / "insert_ready_districts_bcn.json", records)
+
+    iterator = upload_to_supabase.iter_json_records(path)
+
+    assert next(iterator) == records[0]
+    assert list(iterator) == records[1:]
+    assert upload_to_supabase.count_json_records(path) == 5
+
+
+def test_iter_json_records_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        list(upload_to_supabase.iter_json_records(tmp_path / "missing.json"))
+    assert not upload_to_supabase.upload_file("districts", tmp_path / "missing_districts_bcn.json")
+
+
+def test_corrupt_line_fails_the_upload(tmp_path, fake_supabase):
+    path = tmp_path / "insert_ready_point_features_bcn.json"
+    lines = [json.dumps({"feature_definition_id": 1, "latitude": 41.0, "longitude": 2.0 + i, "city_id": 1})
+             for i in range(11)]
+    lines[1] = lines[1][:-5]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    assert not upload_to_supabase.upload_file("point_features", path)
+
+# =====================
+# Chunked Upload Tests
+# =====================
+
+def test_large_rows_are_split_by_bytes(tmp_path, fake_supabase, monkeypatch):
+    monkeypatch.setattr(upload_to_supabase, "MAX_REQUEST_BYTES", 50_000)
+    polygon = "SRID=4326;MULTIPOLYGON(((" + ", ".join(["2.1234567 41.1234567"] * 400) + ")))"
+    records = [{"city_id": 1, "district_code": i, "name": f"d{i}", "geom": polygon} for i in range(1, 31)]
+    path = write_json(tmp_path / "insert_ready_districts_bcn.json", records)
+
+    assert upload_to_supabase.upload_file("districts", path)
+
+    uploaded = [row for _, rows, _, _ in fake_supabase.requests for row in rows]
+    assert sorted(r["district_code"] for r in uploaded) == list(range(1, 31))
+    assert len(fake_supabase.requests) > 1
+    assert all(size <= 50_000 for *_, size in fake_supabase.requests)
+
+
+def test_count_validation_aborts_before_upload(tmp_path, fake_supabase):
+    path = write_json(tmp_path / "insert_ready_districts_bcn.json", [{"city_id": 1, "district_code": 1}])
+
+    assert not upload_to_supabase.upload_file("districts", path)
+    assert fake_supabase.requests == []
+
+
+def test_point_features_use_conflict_key(fake_supabase):
+    record = {"feature_definition_id": 1, "latitude": 41.3, "longitude": 2.1, "city_id": 1, "name": "a"}
+    records = [record, dict(record, latitude=41.4)]
+
+    assert upload_to_supabase.upload("point_features", iter(records), "bcn")
+
+    assert {on_conflict for _, _, on_conflict, _ in fake_supabase.requests} == {
+        upload_to_supabase.ON_CONFLICT["point_features"]
+    }
+
+
+def test_empty_input_is_not_uploaded(fake_supabase):
+    assert not upload_to_supabase.upload("indicators", iter([]), "bcn")
+    assert fake_supabase.requests == []
+
+
+def test_point_feature_upload_deduplicates_all_cities(tmp_path, fake_supabase, monkeypatch):
+    monkeypatch.setattr(upload_to_supabase, "PROCESSED_DIR", tmp_path)
+    monkeypatch.setattr(upload_to_supabase.dedup, "REPORT_PATH", tmp_path / "duplicates.json")
+    record = {"feature_definition_id": 1, "latitude": 41.3, "longitude": 2.1, "city_id": 1, "name": "a"}
+    write_json(tmp_path / "insert_ready_point_features_bcn.json",
+               [record, dict(record, name="dup", latitude=41.3000001), dict(record, latitude=41.4)])
+    write_json(tmp_path / "insert_ready_point_features_madrid.json",
+               [dict(record, city_id=2, name="m")])
+
+    assert upload_to_supabase.run_point_feature_upload()
+
+    uploaded = [row["name"] for _, rows, _, _ in fake_supabase.requests for row in rows]
+    assert sorted(uploaded) == ["a", "a", "m"]
+    assert json.loads((tmp_path / "duplicates.json").read_text())["duplicates"] == 1
+
+
+def test_point_feature_upload_skips_unreadable_file(tmp_path, fake_supabase, monkeypatch):
+    monkeypatch.setattr(upload_to_supabase, "PROCESSED_DIR", tmp_path)
+    monkeypatch.setattr(upload_to_supabase.dedup, "REPORT_PATH", tmp_path / "duplicates.json")
+    record = {"feature_definition_id": 1, "latitude": 41.3, "longitude": 2.1, "city_id": 1, "name": "a"}
+    write_json(tmp_path / "insert_ready_point_features_bcn.json", [record])
+    (tmp_path / "insert_ready_point_features_madrid.json").write_text('{"name": "trunc', encoding="utf-8")
+
+    assert not upload_to_supabase.run_point_feature_upload()
+
+    uploaded = [row["name"] for _, rows, _, _ in fake_supabase.requests for row in rows]
+    assert uploaded == ["a"]
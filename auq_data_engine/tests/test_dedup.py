@@ -0,0 +1,90 @@
+# auq_data_engine/tests/test_dedup.py
+
+"""
+Test Suite: Point Feature Deduplication
+
+This test module ensures that the deduplication stage:
+- Rounds coordinates like ROUND(x::numeric, 6) in the database (half away from zero)
+- Detects duplicates across batches and across files, keeping the first occurrence
+- Streams processed files and reports duplicates per city and feature type
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import json
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+from auq_data_engine.upload import dedup
+
+
+def point(feature_id, lat, lon, city_id=1, name=None):
+    return {"feature_definition_id": feature_id, "latitude": lat, "longitude": lon,
+            "city_id": city_id, "name": name}
+
+# =====================
+# Rounding Tests
+# =====================
+
+def test_quantize_matches_numeric_rounding():
+    values = [41.1234565, -41.1234565, 2.0000005, 2.1234564999, 0.0, -3.7038, 40.4167754, 1e-7]
+    expected = [
+        int(Decimal(repr(v)).scaleb(6).quantize(Decimal(1), rounding=ROUND_HALF_UP)) for v in values
+    ]
+    assert dedup.quantize(values).tolist() == expected
+
+
+def test_quantize_random_values_match_decimal():
+    rng = np.random.default_rng(0)
+    values = np.round(rng.uniform(-180, 180, 2000), 7)
+    expected = [
+        int(Decimal(repr(float(v))).scaleb(6).quantize(Decimal(1), rounding=ROUND_HALF_UP)) for v in values
+    ]
+    assert dedup.quantize(values).tolist() == expected
+
+# =====================
+# Index Tests
+# =====================
+
+def test_duplicates_past_sixth_decimal_and_across_sources():
+    bcn = [point(1, 41.1, 2.1, name="a"), point(1, 41.10000001, 2.1, name="a2"),
+           point(2, 41.1, 2.1, name="other type")]
+    madrid = [point(1, 40.4, -3.7, 2, name="m"), point(1, 40.4, -3.7, 2, name="m2")]
+
+    index = dedup.DedupIndex({"bcn": bcn, "madrid": madrid})
+
+    assert [r["name"] for r in index.unique_records("bcn")] == ["a", "other type"]
+    assert [r["name"] for r in index.unique_records("madrid")] == ["m"]
+
+    report = index.report()
+    assert report["total"] == 5
+    assert report["duplicates"] == 2
+    assert report["by_source"] == {"bcn": 1, "madrid": 1}
+    assert report["by_feature_definition_id"] == {"1": 2}
+    assert report["examples"][0] == {
+        "source": "bcn", "row": 1, "first_source": "bcn", "first_row": 0,
+        "key": {"feature_definition_id": 1, "latitude": 41100000, "longitude": 2100000, "city_id": 1},
+    }
+
+
+def test_index_streams_files(tmp_path):
+    path = tmp_path / "insert_ready_point_features_bcn.json"
+    path.write_text(json.dumps([point(1, 41.1, 2.1, name="a"), point(1, 41.1, 2.1, name="b")]), encoding="utf-8")
+    report_path = tmp_path / "report.json"
+
+    report = dedup.run({"bcn": path}, report_path)
+
+    assert report["duplicates"] == 1
+    assert json.loads(report_path.read_text(encoding="utf-8")) == report
+    assert [r["name"] for r in dedup.DedupIndex({"bcn": path}).unique_records("bcn")] == ["a"]
+
+
+def test_empty_index():
+    index = dedup.DedupIndex({"bcn": []})
+    assert list(index.unique_records("bcn")) == []
+    assert index.report()["total"] == 0
@@ -0,0 +1,80 @@
+# auq_data_engine/tests/test_diagnostics.py
+
+"""
+Test Suite: ETL Diagnostics Collector
+
+This test module ensures that:
+- Problems are counted per reason, with at most N samples each
+- Counting is safe from several threads
+- The stage report is a compact table, plus a JSON file when requested
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import io
+import json
+import threading
+
+from shared.common_lib import emoji_logger
+from shared.common_lib.diagnostics import Diagnostics
+
+# =====================
+# Counting Tests
+# =====================
+
+def test_counts_and_samples_per_reason():
+    diag = Diagnostics("point_features/bcn", max_samples=2)
+    for i in range(5):
+        diag.count("missing coordinates", sample={"name": f"p{i}"})
+    diag.count("unknown feature type", sample="Zoo")
+    diag.count("missing name", n=10)
+
+    summary = diag.summary()
+    assert summary["total"] == 16
+    assert list(summary["reasons"]) == ["missing name", "missing coordinates", "unknown feature type"]
+    assert summary["reasons"]["missing coordinates"] == {"count": 5, "samples": [{"name": "p0"}, {"name": "p1"}]}
+    assert summary["reasons"]["missing name"]["samples"] == []
+
+
+def test_counting_from_threads():
+    diag = Diagnostics("indicators/bcn")
+    threads = [threading.Thread(target=lambda: [diag.count("invalid value") for _ in range(1000)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert diag.counts == {"invalid value": 4000}
+
+# =====================
+# Report Tests
+# =====================
+
+def test_report_prints_one_table_and_writes_json(tmp_path):
+    out = io.StringIO()
+    saved = dict(emoji_logger._settings)
+    emoji_logger.configure(level="info", buffer_lines=1, stream=out)
+    try:
+        diag = Diagnostics("point_features/madrid")
+        for _ in range(1000):
+            diag.count("missing area code", sample="Museo del Prado")
+        summary = diag.report(tmp_path / "report.json")
+    finally:
+        emoji_logger._settings.update(saved)
+
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 4  # header, table header, one reason, saved report
+    assert "1000 problems in 1 categories" in lines[0]
+    assert "missing area code" in lines[2] and "1000" in lines[2] and "Museo del Prado" in lines[2]
+    assert json.loads((tmp_path / "report.json").read_text()) == summary
+
+
+def test_long_samples_are_shortened_in_the_table():
+    diag = Diagnostics("stage")
+    diag.count("error: ValueError", sample="x" * 200)
+    row = diag.table()[1]
+    assert row.endswith("…") and len(row) < 120
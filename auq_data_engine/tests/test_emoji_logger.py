@@ -0,0 +1,110 @@
+# auq_data_engine/tests/test_emoji_logger.py
+
+"""
+Test Suite: Emoji Logger
+
+This test module ensures that the logger:
+- Keeps the line format, with the calling file's name
+- Returns before formatting messages below the configured level
+- Writes one JSON object per line in JSON mode
+- Buffers lines and flushes on size, on warnings and errors, and on request
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import io
+import json
+
+import pytest
+
+from shared.common_lib import emoji_logger
+from shared.common_lib.emoji_logger import info, success, warning, error, debug
+
+
+@pytest.fixture
+def stream():
+    saved = dict(emoji_logger._settings)
+    out = io.StringIO()
+    emoji_logger.configure(level="debug", fmt="text", buffer_lines=1, stream=out)
+    yield out
+    emoji_logger.flush()
+    emoji_logger._settings.update(saved)
+
+
+class Unformattable:
+    def __str__(self):
+        raise AssertionError("message was formatted")
+
+# =====================
+# Format Tests
+# =====================
+
+def test_text_lines_name_the_calling_file(stream):
+    info("Starting ETL process")
+    success("Done")
+    warning("Skipped %d records", 3)
+    error("Failed: 100%")
+    debug("details")
+    assert stream.getvalue().splitlines() == [
+        "📊 [test_emoji_logger.py - info] Starting ETL process",
+        "✅ [test_emoji_logger.py - success] Done",
+        "⚠️ [test_emoji_logger.py - warning] Skipped 3 records",
+        "❗ [test_emoji_logger.py - error] Failed: 100%",
+        "🐞 [test_emoji_logger.py - debug] details",
+    ]
+
+
+def test_json_lines(stream):
+    emoji_logger.configure(fmt="json")
+    warning("Skipped %s", "el Raval")
+    record = json.loads(stream.getvalue())
+    assert record["level"] == "warning"
+    assert record["source"] == "test_emoji_logger.py"
+    assert record["message"] == "Skipped el Raval"
+    assert "time" in record
+
+# =====================
+# Filtering Tests
+# =====================
+
+def test_suppressed_levels_are_not_formatted(stream):
+    emoji_logger.configure(level="warning")
+    debug("row %s", Unformattable())
+    info("row %s", Unformattable())
+    success("row %s", Unformattable())
+    warning("kept")
+    assert stream.getvalue() == "⚠️ [test_emoji_logger.py - warning] kept\n"
+    assert not emoji_logger.is_enabled("info") and emoji_logger.is_enabled("error")
+
+
+def test_invalid_settings_are_rejected(stream):
+    with pytest.raises(ValueError):
+        emoji_logger.configure(level="verbose")
+    with pytest.raises(ValueError):
+        emoji_logger.configure(fmt="xml")
+
+# =====================
+# Buffering Tests
+# =====================
+
+def test_buffer_flushes_on_size_warnings_and_request(stream):
+    emoji_logger.configure(buffer_lines=3)
+    info("a")
+    info("b")
+    assert stream.getvalue() == ""
+    info("c")
+    assert len(stream.getvalue().splitlines()) == 3
+
+    info("d")
+    error("e")
+    assert stream.getvalue().splitlines()[-2:] == [
+        "📊 [test_emoji_logger.py - info] d", "❗ [test_emoji_logger.py - error] e"
+    ]
+
+    debug("f")
+    emoji_logger.flush()
+    assert stream.getvalue().splitlines()[-1] == "🐞 [test_emoji_logger.py - debug] f"
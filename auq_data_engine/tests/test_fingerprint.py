@@ -0,0 +1,164 @@
+# auq_data_engine/tests/test_fingerprint.py
+
+"""
+Test Suite: Content-Hash Stage Skipping
+
+This test module ensures that:
+- A stage with unchanged inputs, parameters and code reuses its output
+- Any change to an input, a parameter, the code or the output re-runs the stage
+- --force and a disabled raw cache never skip
+- A loader skips its second run and hands the cached records to its sink
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from shared.common_lib import raw_cache, ndjson
+from auq_data_engine import fingerprint
+from auq_data_engine.madrid import load_districts as mad_d
+
+URL = "https://example.org/input.json"
+
+# =====================
+# Fixtures
+# =====================
+
+@pytest.fixture
+def hashes(monkeypatch):
+    """Content hash per URL, as the raw cache would report it."""
+    table = {URL: "a" * 64}
+    monkeypatch.setattr(fingerprint.raw_cache, "content_hash", lambda url: table[url])
+    monkeypatch.setattr(fingerprint.raw_cache, "enabled", lambda: True)
+    monkeypatch.setattr(fingerprint, "FORCE", False)
+    return table
+
+
+@pytest.fixture
+def stage_files(tmp_path):
+    output = tmp_path / "insert_ready_districts_test.json"
+    code = tmp_path / "loader.py"
+    code.write_text("VERSION = 1\n")
+    return output, code
+
+
+def make_stage(output, code, params=None):
+    return fingerprint.Stage(output, code=[code], inputs=[URL], params=params or {"city_id": 1})
+
+
+def write_output(output, records):
+    output.write_text(json.dumps(records), encoding="utf-8")
+
+# =====================
+# Stage Tests
+# =====================
+
+def test_unchanged_stage_is_reused(hashes, stage_files):
+    output, code = stage_files
+    stage = make_stage(output, code)
+    assert not stage.reuse()
+    write_output(output, [{"id": 1}, {"id": 2}])
+    stage.save()
+    assert fingerprint.fingerprint_path(output).name == "insert_ready_districts_test.fingerprint.json"
+
+    received = []
+    assert make_stage(output, code).reuse(sink=received.extend)
+    assert received == [{"id": 1}, {"id": 2}]
+
+
+def test_changes_rerun_the_stage(hashes, stage_files):
+    output, code = stage_files
+    write_output(output, [{"id": 1}])
+    make_stage(output, code).save()
+
+    hashes[URL] = "b" * 64
+    assert make_stage(output, code).changes() == [f"inputs changed: {URL}"]
+    hashes[URL] = "a" * 64
+
+    assert make_stage(output, code, {"city_id": 2}).changes() == ["params changed: city_id"]
+
+    code.write_text("VERSION = 2\n")
+    assert make_stage(output, code).changes() == ["code changed: loader.py"]
+    code.write_text("VERSION = 1\n")
+
+    assert make_stage(output, code).changes() == []
+    write_output(output, [{"id": 1, "edited": True}])
+    assert make_stage(output, code).changes() == ["output missing or modified"]
+
+
+def test_force_and_disabled_cache_never_skip(hashes, stage_files, monkeypatch):
+    output, code = stage_files
+    write_output(output, [])
+    make_stage(output, code).save()
+    assert make_stage(output, code).reuse()
+
+    monkeypatch.setattr(fingerprint, "FORCE", True)
+    assert not make_stage(output, code).reuse()
+    monkeypatch.setattr(fingerprint, "FORCE", False)
+
+    monkeypatch.setattr(fingerprint.raw_cache, "enabled", lambda: False)
+    assert not make_stage(output, code).reuse()
+
+# =====================
+# Loader Test
+# =====================
+
+GEOJSON = {
+    "type": "FeatureCollection",
+    "features": [{
+        "type": "Feature",
+        "properties": {"NOMBRE": "Centro", "COD_DIS_TX": "01"},
+        "geometry": {"type": "Polygon", "coordinates": [[[-3.7, 40.4], [-3.69, 40.4], [-3.69, 40.41], [-3.7, 40.4]]]},
+    }],
+}
+
+
+class GeoJSONHandler(BaseHTTPRequestHandler):
+    body = json.dumps(GEOJSON).encode()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url(tmp_path):
+    raw_cache.configure(enabled=True, cache_dir=tmp_path / "cache", offline=False)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GeoJSONHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/districts.json"
+    server.shutdown()
+    raw_cache.configure(enabled=True, cache_dir=raw_cache.DEFAULT_CACHE_DIR)
+
+
+def test_loader_skips_unchanged_second_run(server_url, tmp_path, monkeypatch):
+    monkeypatch.setattr(fingerprint, "FORCE", False)
+    output = tmp_path / "insert_ready_districts_madrid.json"
+
+    mad_d.run(input_url=server_url, output_path=output)
+    assert ndjson.read_records(output)[0]["district_code"] == 1
+    os.utime(output, (1, 1))  # a rewrite would update the timestamp
+
+    received = []
+    mad_d.run(input_url=server_url, output_path=output, sink=received.extend)
+    assert output.stat().st_mtime == 1
+    assert [r["district_code"] for r in received] == [1]
+
+    monkeypatch.setattr(fingerprint, "FORCE", True)
+    mad_d.run(input_url=server_url, output_path=output)
+    assert output.stat().st_mtime != 1
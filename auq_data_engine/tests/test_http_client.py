@@ -0,0 +1,95 @@
+# auq_data_engine/tests/test_http_client.py
+
+"""
+Test Suite: Shared HTTP Transport
+
+This test module ensures that the shared HTTP client:
+- Reuses a single pooled session
+- Applies the retry policy to transient 5xx responses
+- Negotiates compressed responses
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from shared.common_lib import http_client
+
+# =====================
+# Local Test Server
+# =====================
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    failures_left = 0
+    requests_seen = 0
+
+    def do_GET(self):
+        FlakyHandler.requests_seen += 1
+        if FlakyHandler.failures_left > 0:
+            FlakyHandler.failures_left -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = b'{"ok": true}'
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    http_client.configure(backoff_factor=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    http_client.configure(backoff_factor=http_client.DEFAULT_BACKOFF_FACTOR)
+
+# =====================
+# Tests
+# =====================
+
+def test_session_is_shared():
+    assert http_client.get_session() is http_client.get_session()
+
+
+def test_transient_errors_are_retried(server_url):
+    FlakyHandler.failures_left = 2
+    FlakyHandler.requests_seen = 0
+
+    response = http_client.get(server_url)
+
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+    assert FlakyHandler.requests_seen == 3
+
+
+def test_gives_up_after_retry_budget(server_url):
+    FlakyHandler.failures_left = http_client.DEFAULT_RETRIES + 1
+    FlakyHandler.requests_seen = 0
+
+    response = http_client.get(server_url)
+
+    assert response.status_code == 503
+    assert FlakyHandler.requests_seen == http_client.DEFAULT_RETRIES + 1
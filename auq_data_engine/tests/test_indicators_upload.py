@@ -17,6 +17,7 @@ import pytest
 import statistics
 from pathlib import Path
 from typing import Dict, List, Any, Tuple, Optional
+from shared.common_lib import ndjson
 
 # Get the base directory
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -72,8 +73,7 @@ def test_indicators_file_is_valid_json(city: str = "barcelona"):
     """Test that the indicators file is valid JSON"""
     file_path = CITY_CONFIG[city]["file_path"]
     try:
-        with file_path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = ndjson.read_records(file_path)
         assert isinstance(data, list), "Indicators data should be a list"
     except json.JSONDecodeError as e:
         pytest.fail(f"Invalid JSON in indicators file: {str(e)}")
@@ -81,8 +81,7 @@ def test_indicators_file_is_valid_json(city: str = "barcelona"):
 def test_indicator_structure(city: str = "barcelona"):
     """Test that each indicator has the required fields"""
     file_path = CITY_CONFIG[city]["file_path"]
-    with file_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = ndjson.read_records(file_path)
     
     required_fields = ["indicator_def_id", "geo_level_id", "geo_id", "year", "value"]
     
@@ -103,8 +102,7 @@ def test_indicator_structure(city: str = "barcelona"):
 def test_indicator_values(city: str = "barcelona"):
     """Test that indicator values are within expected ranges"""
     file_path = CITY_CONFIG[city]["file_path"]
-    with file_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = ndjson.read_records(file_path)
     
     for i, indicator in enumerate(data):
         # Check year is reasonable
@@ -124,8 +122,7 @@ def test_indicator_values(city: str = "barcelona"):
 def test_neighborhood_coverage(city: str = "barcelona"):
     """Test that all neighborhoods are included for each indicator and year"""
     file_path = CITY_CONFIG[city]["file_path"]
-    with file_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = ndjson.read_records(file_path)
     
     # Group indicators by type and year
     indicators_by_type_year: Dict[int, Dict[int, List[int]]] = {}
@@ -155,8 +152,7 @@ def test_neighborhood_coverage(city: str = "barcelona"):
 def test_year_coverage(city: str = "barcelona"):
     """Test that all expected years are included for each indicator type"""
     file_path = CITY_CONFIG[city]["file_path"]
-    with file_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = ndjson.read_records(file_path)
     
     # Group indicators by type
     indicators_by_type: Dict[int, List[int]] = {}
@@ -184,8 +180,7 @@ def test_year_coverage(city: str = "barcelona"):
 def test_data_consistency(city: str = "barcelona"):
     """Test for data consistency across years and neighborhoods"""
     file_path = CITY_CONFIG[city]["file_path"]
-    with file_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = ndjson.read_records(file_path)
     
     # Group indicators by type and neighborhood
     indicators_by_type_neighborhood: Dict[int, Dict[int, List[Dict[str, Any]]]] = {}
@@ -229,8 +224,7 @@ def test_data_consistency(city: str = "barcelona"):
 def test_statistical_consistency(city: str = "barcelona"):
     """Test for statistical consistency of the data"""
     file_path = CITY_CONFIG[city]["file_path"]
-    with file_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = ndjson.read_records(file_path)
     
     # Group indicators by type and year
     indicators_by_type_year: Dict[int, Dict[int, List[float]]] = {}
@@ -299,8 +293,7 @@ def test_statistical_consistency(city: str = "barcelona"):
 def test_data_completeness(city: str = "barcelona"):
     """Test that all expected data points are present"""
     file_path = CITY_CONFIG[city]["file_path"]
-    with file_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = ndjson.read_records(file_path)
     
     # Calculate expected number of records
     expected_records = 0
@@ -336,8 +329,7 @@ def test_data_completeness(city: str = "barcelona"):
 def test_data_format(city: str = "barcelona"):
     """Test that the data format is consistent"""
     file_path = CITY_CONFIG[city]["file_path"]
-    with file_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = ndjson.read_records(file_path)
     
     # Check that all records have the same structure
     first_record = data[0]
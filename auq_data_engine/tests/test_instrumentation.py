@@ -0,0 +1,169 @@
+# auq_data_engine/tests/test_instrumentation.py
+
+"""
+Test Suite: Per-Stage Run Metrics
+
+This test module ensures that:
+- Stages record wall/CPU time, success and overlap with other stages
+- Counters reach the open stages (including from bound worker threads) and the run totals
+- Peak memory is reported when allocation tracing is on
+- HTTP requests and body bytes are counted, for streamed and buffered responses
+- The run report is written as JSON and as a Prometheus textfile
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from shared.common_lib import instrumentation, http_client
+
+
+@pytest.fixture(autouse=True)
+def fresh_run(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_stages", [])
+    monkeypatch.setattr(instrumentation, "_totals", dict.fromkeys(instrumentation.COUNTERS, 0))
+    monkeypatch.setitem(instrumentation._settings, "report_path", None)
+    monkeypatch.setitem(instrumentation._settings, "prometheus_path", None)
+    monkeypatch.setitem(instrumentation._settings, "trace_memory", False)
+
+
+def stages():
+    return {s["name"]: s for s in instrumentation.report()["stages"]}
+
+# =====================
+# Stage Tests
+# =====================
+
+def test_counters_reach_open_stages_and_totals():
+    with instrumentation.stage("bcn:point_features:etl"):
+        instrumentation.count("records_in", 10)
+        with instrumentation.stage("bcn:spatial_join"):
+            instrumentation.count("records_out", 8)
+    instrumentation.count("records_in", 1)  # outside any stage
+
+    report = stages()
+    assert report["bcn:point_features:etl"]["counters"]["records_in"] == 10
+    assert report["bcn:point_features:etl"]["counters"]["records_out"] == 8
+    assert report["bcn:spatial_join"]["counters"]["records_in"] == 0
+    assert instrumentation.report()["totals"]["records_in"] == 11
+    assert report["bcn:point_features:etl"]["wall_seconds"] >= report["bcn:spatial_join"]["wall_seconds"]
+
+
+def test_bound_worker_threads_count_towards_the_stage():
+    def download(n):
+        instrumentation.count("http_requests")
+        return n
+
+    with instrumentation.stage("bound"):
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(instrumentation.bind(download), range(20)))
+    with instrumentation.stage("unbound"):
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(download, range(20)))
+
+    assert stages()["bound"]["counters"]["http_requests"] == 20
+    assert stages()["unbound"]["counters"]["http_requests"] == 0
+    assert instrumentation.report()["totals"]["http_requests"] == 40
+
+
+def test_failures_and_overlap_are_recorded():
+    @instrumentation.instrument("upload")
+    def upload(ok):
+        return ok
+
+    upload(True)
+    upload(False)
+    with pytest.raises(RuntimeError):
+        with instrumentation.stage("raises"):
+            raise RuntimeError("boom")
+
+    assert [s["ok"] for s in instrumentation.report()["stages"]] == [True, False, False]
+    assert not any(s["overlapped"] for s in instrumentation.report()["stages"])
+
+    started, release = threading.Event(), threading.Event()
+
+    def background():
+        with instrumentation.stage("madrid:districts:etl"):
+            started.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=background)
+    thread.start()
+    started.wait(5)
+    with instrumentation.stage("bcn:districts:etl"):
+        pass
+    release.set()
+    thread.join()
+    assert stages()["madrid:districts:etl"]["overlapped"] and stages()["bcn:districts:etl"]["overlapped"]
+
+
+def test_peak_memory_is_traced_on_request():
+    with instrumentation.stage("untraced"):
+        pass
+    instrumentation.configure(trace_memory=True)
+    with instrumentation.stage("traced"):
+        block = bytearray(8 * 1024 * 1024)
+        del block
+
+    assert stages()["untraced"]["memory_peak_bytes"] is None
+    assert stages()["traced"]["memory_peak_bytes"] >= 8 * 1024 * 1024
+
+# =====================
+# HTTP Counting Test
+# =====================
+
+class PayloadHandler(BaseHTTPRequestHandler):
+    body = b"x" * 100_000
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_http_requests_and_bytes_are_counted():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PayloadHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/file"
+    try:
+        with instrumentation.stage("download"):
+            assert len(http_client.get(url).content) == 100_000
+            streamed = http_client.get(url, stream=True)
+            assert sum(len(chunk) for chunk in streamed.iter_content(8192)) == 100_000
+    finally:
+        server.shutdown()
+
+    counters = stages()["download"]["counters"]
+    assert counters["http_requests"] == 2
+    assert counters["http_bytes_in"] == 200_000
+
+# =====================
+# Report Tests
+# =====================
+
+def test_report_files(tmp_path):
+    with instrumentation.stage("bcn:districts:etl"):
+        instrumentation.count("records_out", 10)
+
+    run_report = instrumentation.write_report(tmp_path / "metrics.json", tmp_path / "auq.prom")
+    assert json.loads((tmp_path / "metrics.json").read_text()) == run_report
+    assert run_report["stages"][0]["counters"]["records_out"] == 10
+
+    prom = (tmp_path / "auq.prom").read_text().splitlines()
+    assert "# TYPE auq_etl_stage_wall_seconds gauge" in prom
+    assert 'auq_etl_stage_records_out_total{stage="bcn:districts:etl"} 10' in prom
+    assert 'auq_etl_stage_success{stage="bcn:districts:etl"} 1' in prom
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,64 @@
+# auq_data_engine/tests/test_json_stream.py
+
+"""
+Test Suite: Streaming JSON Array Reader
+
+This test module ensures that the incremental JSON reader:
+- Yields the same items as json.load, whatever the read chunk size
+- Handles multi-byte UTF-8 characters split across chunks
+- Skips other top-level keys and fails cleanly on malformed input
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import io
+import json
+
+import pytest
+
+from shared.common_lib import json_stream
+
+DOCUMENT = {
+    "@context": {"c": "http://datos.madrid.es", "@graph": "not this one"},
+    "@graph": [
+        {"title": f"Jardín {i}", "description": "Conservación " * (i % 7), "location": {"latitude": 40.4 + i / 1000}}
+        for i in range(300)
+    ] + [12345, "plain string", None],
+    "tail": True,
+}
+RAW = json.dumps(DOCUMENT, ensure_ascii=False, indent=1).encode("utf-8")
+
+# =====================
+# Tests
+# =====================
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64, 4096, 10 ** 7])
+def test_items_match_json_load(chunk_size):
+    items = list(json_stream.iter_array_items(io.BytesIO(RAW), "@graph", chunk_size=chunk_size))
+    assert items == DOCUMENT["@graph"]
+
+
+def test_top_level_array_and_batches():
+    items = json_stream.iter_array_items(io.BytesIO(b"[1, 2 ,3,4,5]"), key=None, chunk_size=2)
+    assert list(json_stream.iter_batches(items, 2)) == [[1, 2], [3, 4], [5]]
+
+
+def test_reader_is_lazy():
+    stream = io.BytesIO(RAW)
+    first = next(json_stream.iter_array_items(stream, "@graph", chunk_size=1024))
+    assert first == DOCUMENT["@graph"][0]
+    assert stream.tell() < len(RAW)
+
+
+@pytest.mark.parametrize("raw,exception", [
+    (b'{"other": []}', KeyError),
+    (b'{"@graph": [1, 2', json.JSONDecodeError),
+    (b'{"@graph": [1 2]}', json.JSONDecodeError),
+])
+def test_malformed_input(raw, exception):
+    with pytest.raises(exception):
+        list(json_stream.iter_array_items(io.BytesIO(raw), "@graph"))
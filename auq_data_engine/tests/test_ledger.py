@@ -0,0 +1,150 @@
+# auq_data_engine/tests/test_ledger.py
+
+"""
+Test Suite: Resumable Upload Ledger
+
+This test module ensures that:
+- Committed batches are checkpointed per record hash, failed batches are logged only
+- A fresh (non-resumed) upload clears the checkpoints of a table/city
+- An upload interrupted mid-stream resumes with the first uncommitted record
+- Records that failed in the interrupted run are sent again on resume
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import os
+
+import pytest
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "header.payload.signature")
+
+from auq_data_engine.upload import upload_to_supabase  # noqa: E402
+from auq_data_engine.upload.ledger import UploadLedger, skip_landed  # noqa: E402
+
+
+def indicator(geo_id, name):
+    return {"indicator_def_id": 1, "geo_level_id": 3, "geo_id": geo_id, "city_id": 1,
+            "year": 2023, "value": 1.0, "name": name}
+
+
+class FakeSupabase:
+    """Records upserted names; rejects rows whose name is in fail_names."""
+
+    def __init__(self):
+        self.upserted = []
+        self.fail_names = set()
+
+    def table(self, name):
+        return self
+
+    def upsert(self, rows, on_conflict=""):
+        self._rows = list(rows)
+        return self
+
+    def execute(self):
+        if any(r["name"] in self.fail_names for r in self._rows):
+            raise ValueError("violates check constraint")
+        self.upserted.extend(r["name"] for r in self._rows)
+        return type("Response", (), {"data": self._rows})()
+
+
+def interrupted_after(records, n):
+    """Yield n records, then fail like a killed extraction."""
+    for i, record in enumerate(records):
+        if i == n:
+            raise RuntimeError("interrupted")
+        yield record
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    fake = FakeSupabase()
+    monkeypatch.setattr(upload_to_supabase, "supabase", fake)
+    monkeypatch.setattr(upload_to_supabase, "BACKEND", "rest")
+    monkeypatch.setattr(upload_to_supabase, "INCREMENTAL", False)
+    monkeypatch.setattr(upload_to_supabase.changeset, "MANIFEST_DIR", tmp_path / "upload_manifest")
+    monkeypatch.setattr(upload_to_supabase, "LEDGER", UploadLedger(":memory:"))
+    # One record per request, so every record is its own checkpoint
+    monkeypatch.setattr(upload_to_supabase, "MAX_REQUEST_BYTES", 150)
+    return fake
+
+# =====================
+# Ledger Tests
+# =====================
+
+def test_record_batch_checkpoints_only_landed_batches():
+    ledger = UploadLedger(":memory:")
+    assert ledger.begin("indicators", "bcn") == set()
+    ledger.record_batch("indicators", "bcn", ["h1", "h2"], ok=True, nbytes=100)
+    ledger.record_batch("indicators", "bcn", ["h3"], ok=False, error="boom")
+
+    assert ledger.begin("indicators", "bcn", resume=True) == {"h1", "h2"}
+    assert ledger.summary("indicators", "bcn") == {
+        "landed_batches": 1, "landed_rows": 2, "failed_batches": 1, "failed_rows": 1
+    }
+    assert ledger.begin("indicators", "madrid", resume=True) == set()
+
+    assert ledger.begin("indicators", "bcn") == set()
+    assert ledger.begin("indicators", "bcn", resume=True) == set()
+
+
+def test_skip_landed():
+    records = [{"id": 1}, {"id": 2}, {"id": 3}]
+    kept = list(skip_landed(records, {"h2"}, lambda r: f"h{r['id']}", "test"))
+    assert kept == [{"id": 1}, {"id": 3}]
+
+
+def test_ledger_file_persists(tmp_path):
+    path = tmp_path / "ledger.sqlite"
+    ledger = UploadLedger(path)
+    ledger.begin("districts", "bcn")
+    ledger.record_batch("districts", "bcn", ["h1"], ok=True)
+    ledger.close()
+
+    assert UploadLedger(path).begin("districts", "bcn", resume=True) == {"h1"}
+
+# =====================
+# Resume Tests
+# =====================
+
+def test_interrupted_upload_resumes_after_last_checkpoint(client, monkeypatch):
+    records = [indicator(i, f"r{i}") for i in range(6)]
+    assert not upload_to_supabase.upload("indicators", interrupted_after(records, 3), "bcn")
+    first_run = list(client.upserted)
+    assert first_run and set(first_run) <= {"r0", "r1", "r2"}
+
+    client.upserted.clear()
+    monkeypatch.setattr(upload_to_supabase, "RESUME", True)
+    assert upload_to_supabase.upload("indicators", records, "bcn")
+    assert sorted(first_run + client.upserted) == [f"r{i}" for i in range(6)]
+
+    client.upserted.clear()
+    assert upload_to_supabase.upload("indicators", records, "bcn")
+    assert client.upserted == []
+
+
+def test_resume_resends_failed_records(client, monkeypatch):
+    records = [indicator(1, "a"), indicator(2, "bad"), indicator(3, "c")]
+    client.fail_names = {"bad"}
+    upload_to_supabase.upload("indicators", records, "bcn")
+    assert sorted(client.upserted) == ["a", "c"]
+
+    client.fail_names = set()
+    client.upserted.clear()
+    monkeypatch.setattr(upload_to_supabase, "RESUME", True)
+    assert upload_to_supabase.upload("indicators", records, "bcn")
+    assert client.upserted == ["bad"]
+
+
+def test_fresh_upload_ignores_previous_checkpoints(client):
+    records = [indicator(1, "a"), indicator(2, "b")]
+    assert upload_to_supabase.upload("indicators", records, "bcn")
+
+    client.upserted.clear()
+    assert upload_to_supabase.upload("indicators", records, "bcn")
+    assert sorted(client.upserted) == ["a", "b"]
@@ -0,0 +1,111 @@
+# auq_data_engine/tests/test_madrid_point_features.py
+
+"""
+Test Suite: Madrid JSON-LD Dataset Processor
+
+This test module ensures that the table-driven Madrid processor:
+- Flattens @graph items and extracts area/district from their @id URLs
+- Skips items without name or coordinates and keeps items without an area
+- Covers every dataset listed in the API manifest
+- Produces the same records when @graph items are streamed in batches
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import io
+import json
+from pathlib import Path
+
+from auq_data_engine.madrid import api_client as mad_api
+from auq_data_engine.madrid import load_point_features as mad_p
+
+MANIFEST_PATH = Path(__file__).resolve().parents[1] / "data/api-file-manifest.json"
+
+GRAPH = [
+    {
+        "title": "Museo del Prado",
+        "location": {"latitude": 40.4138, "longitude": -3.6921},
+        "address": {
+            "district": {"@id": "https://datos.madrid.es/egob/kos/Provincia/Madrid/Municipio/Madrid/Distrito/Retiro"},
+            "area": {"@id": "https://datos.madrid.es/egob/kos/Provincia/Madrid/Municipio/Madrid/Distrito/Retiro/Barrio/Jeronimos"},
+            "street-address": "CALLE RUIZ DE ALARCON 23",
+            "postal-code": "28014",
+        },
+        "organization": {"organization-desc": "Museo", "services": "", "schedule": "10-20", "accesibility": "1"},
+    },
+    {"title": "No area", "location": {"latitude": 40.42, "longitude": -3.70}, "address": {}},
+    {"title": "No coordinates", "address": {"area": {"@id": "https://x/Barrio/Sol"}}},
+    {"title": "", "location": {"latitude": 40.42, "longitude": -3.70}},
+]
+
+
+class FakeResolver:
+    def resolve(self, area_name):
+        return {"Jeronimos": 35}.get(area_name)
+
+# =====================
+# Tests
+# =====================
+
+def test_process_dataset(monkeypatch):
+    monkeypatch.setattr(mad_p, "FEATURE_DEFINITIONS", {"Museums": 4}, raising=False)
+
+    records = mad_p.process_dataset({"@graph": GRAPH}, mad_p.DATASETS["museos"], FakeResolver())
+
+    assert [r["name"] for r in records] == ["Museo del Prado", "No area"]
+    prado, no_area = records
+    assert prado == {
+        "feature_definition_id": 4,
+        "name": "Museo del Prado",
+        "latitude": 40.4138,
+        "longitude": -3.6921,
+        "geom": "SRID=4326;POINT(-3.6921 40.4138)",
+        "geo_level_id": 3,
+        "geo_id": 35,
+        "city_id": mad_p.CITY_ID,
+        "properties": {
+            "address": "CALLE RUIZ DE ALARCON 23",
+            "postal_code": "28014",
+            "district": "Retiro",
+            "area": "Jeronimos",
+            "description": "Museo",
+            "services": "",
+            "schedule": "10-20",
+            "accessibility": "1",
+        },
+    }
+    # Left for the spatial join to resolve
+    assert no_area["geo_id"] is None
+    assert no_area["properties"]["district"] == "" and no_area["properties"]["area"] is None
+    json.dumps(records)
+
+
+def test_unknown_feature_definition_skips_dataset(monkeypatch):
+    monkeypatch.setattr(mad_p, "FEATURE_DEFINITIONS", {}, raising=False)
+    assert mad_p.process_dataset({"@graph": GRAPH}, mad_p.DATASETS["museos"], FakeResolver()) == []
+
+
+def test_every_manifest_dataset_is_configured():
+    with MANIFEST_PATH.open(encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert set(manifest["madrid"]["point_features"]["raw_file"]) <= set(mad_p.DATASETS)
+
+
+def test_streaming_matches_whole_file(monkeypatch):
+    monkeypatch.setattr(mad_p, "FEATURE_DEFINITIONS", {"Museums": 4}, raising=False)
+    raw = json.dumps({"@context": {}, "@graph": GRAPH * 5}).encode("utf-8")
+    monkeypatch.setattr(mad_api.raw_cache, "open", lambda url: io.BytesIO(raw))
+
+    streamed = [
+        record
+        for batch in mad_p.stream_dataset("https://example.org/museos.json", mad_p.DATASETS["museos"],
+                                          FakeResolver(), batch_size=3)
+        for record in batch
+    ]
+
+    whole = mad_p.process_dataset({"@graph": GRAPH * 5}, mad_p.DATASETS["museos"], FakeResolver())
+    assert streamed == whole
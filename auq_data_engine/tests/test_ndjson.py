@@ -0,0 +1,110 @@
+# auq_data_engine/tests/test_ndjson.py
+
+"""
+Test Suite: NDJSON Record Files
+
+This test module ensures that:
+- Records written as NDJSON read back unchanged, one per line
+- Files holding one JSON array (the earlier format) are still read and counted
+- A lazy writer that writes nothing keeps the previous file
+- Failed inputs are listed in an .incomplete marker, cleared by the next complete write
+- A reader can follow a file while it is still being written
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import json
+import threading
+
+from shared.common_lib import ndjson
+
+RECORDS = [
+    {"name": "Sant Martí", "district_code": 10, "geom": "SRID=4326;POINT(2.19 41.41)"},
+    {"name": "Centro", "district_code": 1, "properties": {"area": None, "tags": [1, 2]}},
+]
+
+# =====================
+# Writer / Reader Tests
+# =====================
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "insert_ready_districts_test.json"
+    assert ndjson.write_records(path, iter(RECORDS)) == 2
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == RECORDS
+    assert ndjson.read_records(path) == RECORDS
+    assert ndjson.count_records(path) == 2
+    assert not ndjson.writing_marker(path).exists()
+
+
+def test_json_arrays_are_still_read(tmp_path):
+    path = tmp_path / "legacy.json"
+    path.write_text(json.dumps(RECORDS, ensure_ascii=False, indent=2), encoding="utf-8")
+    assert ndjson.read_records(path) == RECORDS
+    assert ndjson.count_records(path) == 2
+
+    path.write_text("[]")
+    assert ndjson.read_records(path) == [] and ndjson.count_records(path) == 0
+
+
+def test_count_without_trailing_newline(tmp_path):
+    path = tmp_path / "records.json"
+    path.write_text('{"a": 1}\n{"a": 2}', encoding="utf-8")
+    assert ndjson.read_records(path) == [{"a": 1}, {"a": 2}]
+    assert ndjson.count_records(path) == 2
+
+
+def test_lazy_writer_keeps_previous_file(tmp_path):
+    path = tmp_path / "insert_ready_indicators_test.json"
+    ndjson.write_records(path, RECORDS)
+
+    with ndjson.Writer(path, lazy=True) as writer:
+        writer.write_many([])
+    assert writer.count == 0 and ndjson.read_records(path) == RECORDS
+
+    with ndjson.Writer(path, lazy=True) as writer:
+        writer(RECORDS[:1])
+    assert ndjson.read_records(path) == RECORDS[:1]
+
+
+def test_incomplete_marker(tmp_path):
+    path = tmp_path / "insert_ready_indicators_test.json"
+    with ndjson.Writer(path) as writer:
+        writer.write_many(RECORDS)
+        writer.mark_incomplete("population 2023: https://example.org/population.csv")
+    assert ndjson.incomplete_reasons(path) == ["population 2023: https://example.org/population.csv"]
+
+    ndjson.write_records(path, RECORDS)
+    assert ndjson.incomplete_reasons(path) == []
+
+# =====================
+# Follow Test
+# =====================
+
+def test_reader_follows_a_file_being_written(tmp_path):
+    path = tmp_path / "insert_ready_point_features_test.json"
+    writer = ndjson.Writer(path)
+    writer.write_many([{"i": 0}])
+
+    received, first_read = [], threading.Event()
+
+    def consume():
+        for record in ndjson.iter_records(path, follow=True):
+            received.append(record)
+            first_read.set()
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    assert first_read.wait(5)
+    for i in range(1, 5):
+        writer.write_many([{"i": i}])
+    writer.close()
+    consumer.join(5)
+
+    assert not consumer.is_alive()
+    assert [r["i"] for r in received] == [0, 1, 2, 3, 4]
@@ -0,0 +1,87 @@
+# auq_data_engine/tests/test_neighbourhood_resolver.py
+
+"""
+Test Suite: Madrid Neighbourhood Resolver
+
+This test module ensures that the preloaded neighbourhood index:
+- Is fetched once and answers mapped area names from memory
+- Falls back to a single query for codes missing from the index
+- Reports hits, misses and fallbacks
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+from types import SimpleNamespace
+
+from auq_data_engine.madrid import load_point_features as mad_p
+
+# =====================
+# Fake Supabase Client
+# =====================
+
+class FakeQuery:
+    def __init__(self, client, filters=None):
+        self.client = client
+        self.filters = filters or {}
+
+    def select(self, _columns):
+        return self
+
+    def eq(self, column, value):
+        return FakeQuery(self.client, {**self.filters, column: value})
+
+    def execute(self):
+        self.client.calls += 1
+        rows = [
+            row for row in self.client.rows
+            if all(row.get(k) == v for k, v in self.filters.items())
+        ]
+        return SimpleNamespace(data=rows)
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def table(self, _name):
+        return FakeQuery(self)
+
+# =====================
+# Tests
+# =====================
+
+def test_resolver_answers_from_preloaded_index():
+    client = FakeSupabase([
+        {"id": 501, "neighbourhood_code": 11, "city_id": mad_p.CITY_ID},
+        {"id": 502, "neighbourhood_code": 12, "city_id": mad_p.CITY_ID},
+    ])
+    resolver = mad_p.NeighbourhoodResolver(client)
+    assert resolver.load() == 2
+
+    assert resolver.resolve("Palacio") == 501
+    assert resolver.resolve("Embajadores") == 502
+    assert resolver.resolve("Palacio") == 501
+    assert client.calls == 1
+    assert resolver.stats == {"hits": 3, "misses": 0, "fallbacks": 0}
+
+
+def test_resolver_falls_back_once_per_code():
+    client = FakeSupabase([{"id": 501, "neighbourhood_code": 11, "city_id": mad_p.CITY_ID}])
+    resolver = mad_p.NeighbourhoodResolver(client)
+    resolver.load()
+    client.rows.append({"id": 613, "neighbourhood_code": 13, "city_id": mad_p.CITY_ID})
+
+    assert resolver.resolve("Cortes") == 613
+    assert resolver.resolve("Cortes") == 613
+    assert resolver.resolve("Justicia") is None
+    assert resolver.resolve("Justicia") is None
+    assert resolver.resolve("NotAnArea") is None
+
+    # One preload + one fallback per unknown code
+    assert client.calls == 3
+    assert resolver.stats == {"hits": 1, "misses": 3, "fallbacks": 2}
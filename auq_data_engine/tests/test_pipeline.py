@@ -0,0 +1,190 @@
+# auq_data_engine/tests/test_pipeline.py
+
+"""
+Test Suite: Overlapped ETL → Upload Pipeline
+
+This test module ensures that the pipeline:
+- Uploads records while later loaders are still extracting
+- Delivers every record of a (table, city) to a single upload call
+- Keeps stage order with `wait()` barriers and reports failed uploads
+- Never blocks a loader when its upload fails early
+- Fails the upload of a loader that raises or returns False, without committing or deleting anything
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import os
+import threading
+import time
+
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "header.payload.signature")
+
+from auq_data_engine import pipeline  # noqa: E402
+from auq_data_engine.upload import upload_to_supabase  # noqa: E402
+from auq_data_engine.upload.ledger import UploadLedger  # noqa: E402
+
+
+class FakeUploadModule:
+    """Stands in for upload_to_supabase; records each upload call."""
+
+    EXPECTED_COUNTS = {
+        "bcn": {"districts": 2, "point_features": 0, "indicators": 0},
+        "madrid": {"districts": 2, "point_features": 0, "indicators": 0},
+    }
+
+    def __init__(self, delay=0.0, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.calls = []
+        self.events = []
+        self.lock = threading.Lock()
+
+    def upload(self, table_name, records, city, total=None):
+        if (table_name, city) in self.fail:
+            return False
+        received = []
+        for record in records:
+            time.sleep(self.delay)
+            received.append(record)
+            with self.lock:
+                self.events.append(("upload", city, record["n"]))
+        with self.lock:
+            self.calls.append((table_name, city, received, type(records).__name__))
+        return True
+
+
+class FakeSupabase:
+    """Accepts every upsert and records delete filters."""
+
+    def __init__(self):
+        self.deleted = []
+
+    def table(self, name):
+        return self
+
+    def upsert(self, rows, on_conflict=""):
+        self._rows, self._action = list(rows), "upsert"
+        return self
+
+    def delete(self):
+        self._action = "delete"
+        return self
+
+    def or_(self, filters):
+        self.deleted.append(filters)
+        return self
+
+    def execute(self):
+        return type("Response", (), {"data": self._rows if self._action == "upsert" else []})()
+
+
+def indicator(geo_id):
+    return {"indicator_def_id": 1, "geo_level_id": 3, "geo_id": geo_id, "city_id": 1, "year": 2023,
+            "value": 1.0, "n": geo_id}
+
+
+def make_loader(events, city, batches, delay=0.0):
+    def run(sink=None):
+        for batch in batches:
+            time.sleep(delay)
+            events.append(("extract", city, batch[0]["n"]))
+            sink(batch)
+    return run
+
+# =====================
+# Pipeline Tests
+# =====================
+
+def test_uploads_overlap_extraction():
+    module = FakeUploadModule(delay=0.01)
+    runner = pipeline.UploadPipeline(module)
+
+    batches = [[{"n": i}] for i in range(5)]
+    runner.run_loader(make_loader(module.events, "bcn", batches, delay=0.02), "indicators", "bcn")
+    assert runner.wait()
+
+    # The first record is uploaded before the last one is extracted
+    order = [(kind, n) for kind, _, n in module.events]
+    assert order.index(("upload", 0)) < order.index(("extract", 4))
+    assert module.calls == [("indicators", "bcn", [{"n": i} for i in range(5)], "generator")]
+
+
+def test_validated_tables_are_uploaded_whole_and_point_features_deduplicated():
+    module = FakeUploadModule()
+    runner = pipeline.UploadPipeline(module)
+
+    runner.run_loader(lambda sink: sink([{"n": 1}, {"n": 2}]), "districts", "bcn")
+    point = {"n": 3, "feature_definition_id": 1, "latitude": 41.1, "longitude": 2.1, "city_id": 1}
+    runner.run_loader(lambda sink: sink([point, dict(point, n=4, latitude=41.1000001)]), "point_features", "bcn")
+    assert runner.wait()
+
+    calls = {table: (records, kind) for table, _, records, kind in module.calls}
+    assert calls["districts"] == ([{"n": 1}, {"n": 2}], "list")
+    assert [r["n"] for r in calls["point_features"][0]] == [3]
+
+
+def test_failed_upload_does_not_block_loader():
+    module = FakeUploadModule(fail={("indicators", "madrid")})
+    runner = pipeline.UploadPipeline(module, maxsize=1)
+
+    batches = [[{"n": i}] for i in range(10)]
+    runner.run_loader(make_loader(module.events, "madrid", batches), "indicators", "madrid")
+    runner.run_loader(make_loader(module.events, "bcn", batches[:2]), "indicators", "bcn")
+
+    assert not runner.wait()
+    assert [(t, c) for t, c, _, _ in module.calls] == [("indicators", "bcn")]
+    assert runner.wait()  # results are reset at each barrier
+
+
+def test_loader_exception_fails_the_upload():
+    module = FakeUploadModule()
+    runner = pipeline.UploadPipeline(module)
+
+    def broken(sink=None):
+        sink([{"n": 1}])
+        raise RuntimeError("source unavailable")
+
+    runner.run_loader(broken, "indicators", "bcn")
+    assert not runner.wait()
+    assert module.calls == []  # the upload raised instead of seeing a complete stream
+
+
+def test_loader_returning_false_fails_the_upload():
+    module = FakeUploadModule()
+    runner = pipeline.UploadPipeline(module)
+
+    runner.run_loader(lambda sink=None: False, "districts", "bcn")
+    assert not runner.wait()
+    assert module.calls == []
+
+
+def test_loader_failing_halfway_commits_and_deletes_nothing(monkeypatch, tmp_path):
+    fake = FakeSupabase()
+    monkeypatch.setattr(upload_to_supabase, "supabase", fake)
+    monkeypatch.setattr(upload_to_supabase, "BACKEND", "rest")
+    monkeypatch.setattr(upload_to_supabase, "INCREMENTAL", True)
+    monkeypatch.setattr(upload_to_supabase, "ALLOW_MASS_DELETE", True)
+    monkeypatch.setattr(upload_to_supabase, "PROCESSED_DIR", tmp_path)
+    monkeypatch.setattr(upload_to_supabase.changeset, "MANIFEST_DIR", tmp_path / "upload_manifest")
+    monkeypatch.setattr(upload_to_supabase, "LEDGER", UploadLedger(":memory:"))
+    manifest = tmp_path / "upload_manifest" / "indicators_bcn.json"
+    batches = [[indicator(geo_id) for geo_id in range(start, start + 5)] for start in (1, 6, 11)]
+
+    runner = pipeline.UploadPipeline(upload_to_supabase)
+    runner.run_loader(make_loader([], "bcn", batches), "indicators", "bcn")
+    assert runner.wait()
+    uploaded = manifest.read_text()
+
+    def halfway(sink=None):
+        sink(batches[0])
+        raise RuntimeError("connection reset")
+
+    runner.run_loader(halfway, "indicators", "bcn")
+    assert not runner.wait()
+    assert fake.deleted == []
+    assert manifest.read_text() == uploaded
@@ -14,10 +14,10 @@ Version: 1.0.0
 License: MIT License
 """
 
-import json
 import pytest
 from pathlib import Path
 from typing import Dict, List, Any
+from shared.common_lib import ndjson
 
 # Constants for coordinate validation
 BCN_COORDS = {
@@ -54,8 +54,7 @@ BASE_DIR = Path(__file__).resolve().parents[1]
 def load_json_file(file_path: Path) -> List[Dict[str, Any]]:
     """Load and parse a JSON file."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return ndjson.read_records(file_path)
     except Exception as e:
         pytest.fail(f"Failed to load JSON file {file_path}: {str(e)}")
 
@@ -0,0 +1,83 @@
+# auq_data_engine/tests/test_profiling.py
+
+"""
+Test Suite: Per-Stage Profiling
+
+This test module ensures that:
+- Nothing is profiled or written while profiling is off
+- A profiled stage writes a loadable .pstats file and collapsed stacks naming its hot function
+- Memory profiling writes the lines whose allocations grew during the stage
+- Nested stages are profiled once, by the outermost stage
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import time
+import pstats
+import contextlib
+
+import pytest
+
+from shared.common_lib import instrumentation, profiling
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(profiling._settings, "profile_dir", tmp_path)
+    monkeypatch.setitem(profiling._settings, "interval", 0.001)
+    monkeypatch.setitem(profiling._settings, "memory", False)
+    return tmp_path
+
+
+def hot_loop(seconds=0.15):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+# =====================
+# Profiling Tests
+# =====================
+
+def test_off_by_default(tmp_path, monkeypatch):
+    monkeypatch.setitem(profiling._settings, "profile_dir", None)
+    assert isinstance(profiling.profile("stage"), contextlib.nullcontext)
+    with instrumentation.stage("stage"):
+        pass
+    assert not list(tmp_path.iterdir())
+
+
+def test_stage_writes_pstats_and_collapsed_stacks(profile_dir):
+    with instrumentation.stage("bcn:point_features:etl"):
+        hot_loop()
+
+    stats = pstats.Stats(str(profile_dir / "bcn_point_features_etl.pstats"))
+    assert any(func[2] == "hot_loop" for func in stats.stats)
+
+    lines = (profile_dir / "bcn_point_features_etl.collapsed").read_text().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("hot_loop (test_profiling.py:" in line for line in lines)
+    assert not (profile_dir / "bcn_point_features_etl.memory.txt").exists()
+
+
+def test_memory_diff(profile_dir, monkeypatch):
+    monkeypatch.setitem(profiling._settings, "memory", True)
+    kept = []
+    with profiling.profile("madrid:indicators:etl"):
+        kept.append(bytearray(4 * 1024 * 1024))
+
+    report = (profile_dir / "madrid_indicators_etl.memory.txt").read_text()
+    assert "test_profiling.py" in report.splitlines()[2]
+    assert not profiling._tracemalloc_users
+
+
+def test_nested_stages_are_profiled_once(profile_dir):
+    with instrumentation.stage("outer"):
+        with instrumentation.stage("inner"):
+            hot_loop(0.02)
+    assert sorted(path.name for path in profile_dir.iterdir()) == ["outer.collapsed", "outer.pstats"]
@@ -0,0 +1,143 @@
+# auq_data_engine/tests/test_raw_cache.py
+
+"""
+Test Suite: Raw File Cache
+
+This test module ensures that the raw file cache:
+- Stores downloads compressed and keyed by content hash
+- Revalidates with ETag and serves 304 responses from disk
+- Serves cached entries in offline mode and fails cleanly on misses
+- Evicts least-recently-used entries above its size cap
+- Deletes the previous blob of a URL whose content changed
+- Re-inserts or re-downloads an entry evicted by another thread during revalidation
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import os
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from shared.common_lib import raw_cache
+
+FILES = {
+    "/a.csv": b"Codi_Barri,Nom_Barri,Valor\n" + b"1,el Raval,10\n" * 2000,
+    "/b.csv": os.urandom(40_000),
+}
+
+# =====================
+# Local Test Server
+# =====================
+
+class ETagHandler(BaseHTTPRequestHandler):
+    hits = {"200": 0, "304": 0}
+
+    def do_GET(self):
+        body = FILES[self.path]
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            ETagHandler.hits["304"] += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        ETagHandler.hits["200"] += 1
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    ETagHandler.hits = {"200": 0, "304": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ETagHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+# =====================
+# Tests
+# =====================
+
+def test_download_then_revalidate(tmp_path, base_url):
+    cache = raw_cache.RawCache(tmp_path)
+    url = f"{base_url}/a.csv"
+
+    assert cache.fetch(url) == FILES["/a.csv"]
+    assert cache.fetch(url) == FILES["/a.csv"]
+    assert ETagHandler.hits == {"200": 1, "304": 1}
+
+    entry = cache.ensure(url)
+    assert entry["sha256"] == hashlib.sha256(FILES["/a.csv"]).hexdigest()
+    assert entry["size"] < entry["raw_size"]  # stored compressed
+
+
+def test_offline_mode(tmp_path, base_url):
+    url = f"{base_url}/a.csv"
+    raw_cache.RawCache(tmp_path).fetch(url)
+
+    offline = raw_cache.RawCache(tmp_path, offline=True)
+    with offline.open(url) as f:
+        assert f.read() == FILES["/a.csv"]
+    with pytest.raises(raw_cache.RawCacheMiss):
+        offline.fetch(f"{base_url}/b.csv")
+    assert ETagHandler.hits["200"] == 1
+
+
+def test_lru_eviction(tmp_path, base_url):
+    cache = raw_cache.RawCache(tmp_path, max_bytes=40_000)
+    cache.fetch(f"{base_url}/a.csv")
+    cache.fetch(f"{base_url}/b.csv")
+
+    index = cache._load_index()
+    assert list(index) == [f"{base_url}/b.csv"]
+    assert len(list((tmp_path / "blobs").glob("*.zst"))) == 1
+
+
+def test_changed_content_replaces_the_old_blob(tmp_path, base_url, monkeypatch):
+    cache = raw_cache.RawCache(tmp_path)
+    url = f"{base_url}/a.csv"
+    old_sha = cache.ensure(url)["sha256"]
+
+    monkeypatch.setitem(FILES, "/a.csv", FILES["/a.csv"] + b"2,el Born,20\n")
+    assert cache.fetch(url) == FILES["/a.csv"]
+
+    blobs = {path.name for path in (tmp_path / "blobs").glob("*.zst")}
+    assert blobs == {f"{cache.ensure(url)['sha256']}.zst"}
+    assert f"{old_sha}.zst" not in blobs
+
+
+def test_entry_evicted_during_revalidation(tmp_path, base_url):
+    cache = raw_cache.RawCache(tmp_path)
+    url = f"{base_url}/a.csv"
+    entry = dict(cache.ensure(url))
+
+    # Another thread evicted the index entry only: it is re-inserted
+    del cache._index[url]
+    assert cache._touch(url, entry)["sha256"] == entry["sha256"]
+    assert url in cache._index
+
+    # ...or the entry and its blob: the 304 is followed by a fresh download
+    original_touch = cache._touch
+
+    def evicting_touch(url, entry):
+        with cache._lock:
+            del cache._index[url]
+            cache._release_blob(entry["sha256"])
+        return original_touch(url, entry)
+
+    cache._touch = evicting_touch
+    assert cache.fetch(url) == FILES["/a.csv"]
+    assert ETagHandler.hits == {"200": 2, "304": 1}
@@ -0,0 +1,171 @@
+# auq_data_engine/tests/test_scheduler.py
+
+"""
+Test Suite: Dependency-Graph Scheduler
+
+This test module ensures that:
+- Nodes run only after their dependencies, independent nodes run concurrently
+- A failing node (exception, sys.exit or False) skips its dependants only
+- In the ETL graph, a loader that cannot fetch its input fails its node, so the stale output is not uploaded
+- Unknown dependencies and cycles are rejected before anything runs
+- The critical path follows the chain that finished last
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import os
+import sys
+import threading
+import time
+from functools import partial
+from types import SimpleNamespace
+
+import pytest
+
+# main imports the upload module, which creates its client at import time
+os.environ.setdefault("SUPABASE_URL", "https://example.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "header.payload.signature")
+
+from auq_data_engine import main  # noqa: E402
+from auq_data_engine.barcelona import load_districts  # noqa: E402
+from auq_data_engine.scheduler import Scheduler, DONE, FAILED, SKIPPED  # noqa: E402
+
+lock = threading.Lock()
+
+
+def step(log, name, seconds=0.0, result=None):
+    def run():
+        time.sleep(seconds)
+        with lock:
+            log.append(name)
+        return result
+    return run
+
+# =====================
+# Ordering Tests
+# =====================
+
+def test_dependencies_run_first():
+    log = []
+    graph = Scheduler(max_workers=4)
+    a = graph.add("a", step(log, "a", 0.02))
+    b = graph.add("b", step(log, "b"), [a])
+    graph.add("c", step(log, "c"), [a, b])
+    assert graph.run()
+    assert log == ["a", "b", "c"]
+
+
+def test_independent_nodes_run_concurrently():
+    barrier = threading.Barrier(3, timeout=2)
+    graph = Scheduler(max_workers=3)
+    for city in ("bcn", "madrid", "third"):
+        graph.add(f"{city}:etl", barrier.wait)
+    assert graph.run()
+
+
+def test_workers_bound_concurrency():
+    active, peak = [0], [0]
+
+    def work():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+
+    graph = Scheduler(max_workers=2)
+    for i in range(6):
+        graph.add(f"n{i}", work)
+    assert graph.run()
+    assert peak[0] == 2
+
+# =====================
+# Failure Tests
+# =====================
+
+def test_failure_skips_dependants_only():
+    log = []
+    graph = Scheduler()
+    graph.add("bcn:etl", step(log, "bcn:etl", result=False))
+    graph.add("bcn:upload", step(log, "bcn:upload"), ["bcn:etl"])
+    graph.add("bcn:validate", step(log, "bcn:validate"), ["bcn:upload"])
+    graph.add("madrid:etl", lambda: sys.exit(1))
+    graph.add("third:etl", step(log, "third:etl"))
+    graph.add("third:upload", step(log, "third:upload"), ["third:etl"])
+
+    assert not graph.run()
+    states = {name: node.state for name, node in graph.nodes.items()}
+    assert states == {"bcn:etl": FAILED, "bcn:upload": SKIPPED, "bcn:validate": SKIPPED,
+                      "madrid:etl": FAILED, "third:etl": DONE, "third:upload": DONE}
+    assert "bcn:upload" not in log
+
+
+def test_exception_is_recorded():
+    graph = Scheduler()
+    graph.add("boom", lambda: 1 / 0)
+    assert not graph.run()
+    assert graph.nodes["boom"].state == FAILED
+    assert "division" in graph.nodes["boom"].error
+
+
+def test_invalid_graphs_are_rejected():
+    graph = Scheduler()
+    graph.add("a", lambda: None, ["missing"])
+    with pytest.raises(ValueError, match="unknown node"):
+        graph.run()
+
+    graph = Scheduler()
+    graph.add("a", lambda: None, ["b"])
+    graph.add("b", lambda: None, ["a"])
+    with pytest.raises(ValueError, match="cycle"):
+        graph.run()
+
+    with pytest.raises(ValueError, match="Duplicate"):
+        graph.add("a", lambda: None)
+
+def test_failing_loader_skips_its_upload(monkeypatch, tmp_path):
+    def unreachable(url):
+        raise ConnectionError("network is unreachable")
+
+    monkeypatch.setattr(load_districts.raw_cache, "fetch", unreachable)
+    uploads = []
+    monkeypatch.setattr(main, "upload", SimpleNamespace(
+        run_district_upload=lambda cities: uploads.append("districts"),
+        run_neighbourhood_upload=lambda cities: uploads.append("neighbourhoods"),
+    ))
+    loader = SimpleNamespace(run=lambda **kwargs: None)
+    monkeypatch.setattr(main, "CITY_LOADERS", {"bcn": {
+        "districts": SimpleNamespace(run=partial(load_districts.run, output_path=tmp_path / "districts.json")),
+        "neighbourhoods": loader, "point_features": loader, "indicators": loader,
+    }})
+
+    graph = main.build_graph(workers=2)
+
+    assert not graph.run()
+    assert graph.nodes["bcn:districts:etl"].state == FAILED
+    assert graph.nodes["bcn:districts:upload"].state == SKIPPED
+    assert uploads == []
+
+# =====================
+# Timing Tests
+# =====================
+
+def test_critical_path_follows_slowest_chain():
+    log = []
+    graph = Scheduler(max_workers=4)
+    graph.add("bcn:etl", step(log, "bcn:etl", 0.01))
+    graph.add("madrid:etl", step(log, "madrid:etl", 0.2))
+    graph.add("validate", step(log, "validate", 0.01), ["bcn:etl", "madrid:etl"])
+    graph.add("upload", step(log, "upload", 0.01), ["validate"])
+    assert graph.run()
+
+    summary = graph.report()
+    assert summary["critical_path"] == ["madrid:etl", "validate", "upload"]
+    # Nodes on the path run one after another, within the wall-clock time
+    assert summary["critical_path_seconds"] <= summary["wall_seconds"] + 0.001
+    assert summary["nodes"]["upload"]["state"] == DONE
@@ -0,0 +1,77 @@
+# auq_data_engine/tests/test_spatial_join.py
+
+"""
+Test Suite: Spatial Join of Point Features
+
+This test module ensures that the spatial join stage:
+- Locates points in their containing polygon with a single tree query
+- Overrides and reports API-provided neighbourhoods that disagree with the polygon
+- Keeps the API value for points outside every polygon
+- Keeps unresolved points at city level instead of dropping them
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import json
+
+import pytest
+
+from auq_data_engine import spatial_join
+
+# Two unit squares side by side: code 1 at x∈[0,1], code 2 at x∈[1,2]
+NEIGHBOURHOODS = [
+    {"name": "West", "neighbourhood_code": "1", "district_id": "1", "city_id": "9",
+     "geom": "SRID=4326;POLYGON ((0 0, 1 0, 1 1, 0 1, 0 0))"},
+    {"name": "East", "neighbourhood_code": "2", "district_id": "1", "city_id": "9",
+     "geom": "SRID=4326;POLYGON ((1 0, 2 0, 2 1, 1 1, 1 0))"},
+]
+CODE_TO_ID = {1: 101, 2: 102}
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "insert_ready_neighbourhoods_test.json"
+    path.write_text(json.dumps(NEIGHBOURHOODS))
+    return spatial_join.NeighbourhoodIndex.from_file(path)
+
+
+def point(name, lon, lat, geo_id=None):
+    return {"name": name, "longitude": lon, "latitude": lat, "geo_level_id": 3, "geo_id": geo_id}
+
+# =====================
+# Tests
+# =====================
+
+def test_locate_points(index):
+    codes = index.locate([0.5, 1.5, 5.0, 1.0], [0.5, 0.5, 5.0, 0.5])
+    assert codes[:3].tolist() == [1, 2, spatial_join.NO_MATCH]
+    assert codes[3] in (1, 2)  # on the shared boundary
+
+
+def test_assign_neighbourhoods(index):
+    records = [
+        point("agrees", 0.5, 0.5, geo_id=101),
+        point("disagrees", 1.5, 0.5, geo_id=101),
+        point("missing", 1.5, 0.5),
+        point("outside with api id", 5.0, 5.0, geo_id=101),
+        point("outside without api id", "5.0", "5.0"),
+    ]
+
+    stats = spatial_join.assign_neighbourhoods(records, index, CODE_TO_ID, city_id=9)
+
+    assert [r["geo_id"] for r in records] == [101, 102, 102, 101, 9]
+    assert [r["geo_level_id"] for r in records] == [3, 3, 3, 3, 1]
+    assert stats == {"spatial": 3, "api": 1, "city_level": 1, "disagreements": 1}
+
+
+def test_without_polygons_keeps_api_ids():
+    records = [point("a", 0.5, 0.5, geo_id=7), point("b", 0.5, 0.5)]
+
+    stats = spatial_join.assign_neighbourhoods(records, None, CODE_TO_ID, city_id=9)
+
+    assert [(r["geo_level_id"], r["geo_id"]) for r in records] == [(3, 7), (1, 9)]
+    assert stats["api"] == 1 and stats["city_level"] == 1
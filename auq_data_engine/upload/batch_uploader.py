@@ -0,0 +1,386 @@
+# auq_data_engine/upload/batch_uploader.py
+
+"""
+Upload Utility: Concurrent Adaptive-Batch Uploader
+
+- Cuts records into batches lazily, bounded by both row count and request bytes
+- Sends batches with a bounded number of batches in flight
+- Adapts the batch size to the observed latency and payload size
+  (additive increase while requests are fast and small, halving when they are not)
+- Retries transient failures (timeouts, connection errors, 429/5xx) with jittered backoff
+- Splits failing batches in half to isolate the bad records instead of skipping the batch,
+  but not on systemic errors (auth, permissions, unknown columns) or when both halves
+  fail exactly like their parent
+- Records per-batch latency, size and row counts
+
+The uploader is transport-agnostic: it calls `send(batch)`, which must upload
+the batch and return the number of rows written (or raise on failure).
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import json
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from shared.common_lib.emoji_logger import info, success, warning, error
+
+# ==================
+# Configuration
+# ==================
+
+DEFAULT_INITIAL_BATCH = 100
+DEFAULT_MIN_BATCH = 10
+DEFAULT_MAX_BATCH = 2000
+DEFAULT_INCREASE_STEP = 50
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_TARGET_LATENCY = 2.0             # seconds per request
+DEFAULT_MAX_PAYLOAD_BYTES = 1024 * 1024  # JSON bytes per request
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5                    # seconds; full jitter up to backoff * 2**attempt
+
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+TRANSIENT_ERROR_NAMES = {"Timeout", "TimeoutError", "TimeoutException", "ConnectionError",
+                         "ConnectError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError",
+                         "ReadError", "WriteError", "PoolTimeout"}
+
+# Failures that do not depend on the records sent: every split would fail the same way
+SYSTEMIC_STATUS_CODES = {401, 403}
+SYSTEMIC_ERROR_CODES = {"42501",     # insufficient privilege / row-level security
+                        "42703",     # undefined column
+                        "42P01",     # undefined table
+                        "PGRST204",  # column not in the schema cache
+                        "PGRST205",  # table not in the schema cache
+                        "PGRST301",  # invalid or expired JWT
+                        "PGRST302"}  # anonymous access disabled
+SYSTEMIC_ERROR_NAMES = {"InsufficientPrivilege", "UndefinedColumn", "UndefinedTable"}
+SYSTEMIC_MESSAGES = ("invalid api key", "jwt expired", "row-level security", "permission denied")
+
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    Tell whether a failure is worth retrying as-is.
+
+    Network errors and timeouts (requests, httpx or built-in) and HTTP 408/429/5xx
+    responses are transient; anything else (e.g. a constraint violation) is not.
+    """
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    if any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(exc).__mro__):
+        return True
+    for attribute in ("status_code", "code", "status"):
+        value = getattr(exc, attribute, None)
+        try:
+            if int(value) in TRANSIENT_STATUS_CODES:
+                return True
+        except (TypeError, ValueError):
+            continue
+    return False
+
+
+def is_systemic(exc: BaseException) -> bool:
+    """
+    Tell whether a failure affects any batch, whatever records it holds.
+
+    Auth and permission errors (HTTP 401/403, expired keys, row-level security)
+    and schema errors (unknown table or column) are systemic; splitting the
+    batch cannot isolate a bad record.
+    """
+    if any(cls.__name__ in SYSTEMIC_ERROR_NAMES for cls in type(exc).__mro__):
+        return True
+    for attribute in ("status_code", "code", "status", "pgcode"):
+        value = getattr(exc, attribute, None)
+        if value is None:
+            continue
+        if str(value) in SYSTEMIC_ERROR_CODES:
+            return True
+        try:
+            if int(value) in SYSTEMIC_STATUS_CODES:
+                return True
+        except (TypeError, ValueError):
+            continue
+    message = str(exc).lower()
+    return any(text in message for text in SYSTEMIC_MESSAGES)
+
+
+def record_size(record: Dict) -> int:
+    """Size of one record in a request body (its JSON encoding in bytes)."""
+    return len(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+def payload_size(batch: List[Dict]) -> int:
+    """Size of a batch request body in bytes."""
+    return sum(record_size(record) for record in batch) + max(len(batch) - 1, 0) + 2
+
+# ==================
+# Uploader
+# ==================
+
+class AdaptiveBatchUploader:
+    """
+    Upload records concurrently in adaptively sized batches.
+
+    Args:
+        send: Callable uploading one batch; returns the number of rows written, raises on failure
+        label: Name used in log messages (e.g. "point_features/bcn")
+        initial_batch: Starting batch size
+        min_batch: Smallest batch size used by the size controller (failing batches are still split down to 1)
+        max_batch: Largest batch size
+        increase_step: Rows added after a fast, small batch
+        max_in_flight: Maximum number of concurrent requests
+        target_latency: Latency (seconds) above which the batch size is halved
+        max_payload_bytes: Hard limit on the request body size of a batch
+        retries: Retries per batch for transient failures
+        backoff: Base backoff in seconds (full jitter)
+        sleep: Sleep function (overridable in tests)
+        on_batch: Called as on_batch(batch, metric) for every committed batch and every
+                  batch or record given up on (e.g. to checkpoint progress)
+    """
+
+    def __init__(
+        self,
+        send: Callable[[List[Dict]], int],
+        label: str = "upload",
+        initial_batch: int = DEFAULT_INITIAL_BATCH,
+        min_batch: int = DEFAULT_MIN_BATCH,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        increase_step: int = DEFAULT_INCREASE_STEP,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        target_latency: float = DEFAULT_TARGET_LATENCY,
+        max_payload_bytes: int = DEFAULT_MAX_PAYLOAD_BYTES,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        sleep: Callable[[float], None] = time.sleep,
+        on_batch: Optional[Callable[[List[Dict], Dict[str, Any]], None]] = None
+    ):
+        self.send = send
+        self.label = label
+        self.batch_size = initial_batch
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.increase_step = increase_step
+        self.max_in_flight = max_in_flight
+        self.target_latency = target_latency
+        self.max_payload_bytes = max_payload_bytes
+        self.retries = retries
+        self.backoff = backoff
+        self.sleep = sleep
+        self.on_batch = on_batch
+
+        self.metrics: List[Dict[str, Any]] = []
+        self.failed_records: List[Dict] = []
+        self.failures: List[str] = []
+        self._lock = threading.Lock()
+
+    # ---------- Batch sizing ----------
+
+    def _next_size(self) -> int:
+        with self._lock:
+            return max(1, self.batch_size)
+
+    def _observe(self, nbytes: int, latency: float) -> None:
+        """AIMD: grow additively after fast, small batches; halve after slow or large ones."""
+        with self._lock:
+            if latency > self.target_latency or nbytes > self.max_payload_bytes:
+                self.batch_size = max(self.min_batch, self.batch_size // 2)
+            elif latency < self.target_latency / 2 and nbytes < self.max_payload_bytes / 2:
+                self.batch_size = min(self.max_batch, self.batch_size + self.increase_step)
+
+    def _shrink(self) -> None:
+        with self._lock:
+            self.batch_size = max(self.min_batch, self.batch_size // 2)
+
+    # ---------- Sending ----------
+
+    def _send_with_retry(self, batch: List[Dict], nbytes: int) -> Dict[str, Any]:
+        """Send one batch, retrying transient failures. Returns its metric entry."""
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                rows = self.send(batch)
+                latency = time.perf_counter() - start
+                self._observe(nbytes, latency)
+                return {"size": len(batch), "rows": rows, "bytes": nbytes,
+                        "latency": latency, "attempts": attempt + 1, "ok": True}
+            except Exception as e:
+                latency = time.perf_counter() - start
+                if attempt < self.retries and is_transient(e):
+                    attempt += 1
+                    delay = random.uniform(0, self.backoff * (2 ** attempt))
+                    warning(f"[{self.label}] Transient error on a batch of {len(batch)} "
+                            f"(attempt {attempt}/{self.retries}, retrying in {delay:.1f}s): {e}")
+                    self.sleep(delay)
+                    continue
+                return {"size": len(batch), "rows": 0, "bytes": nbytes, "latency": latency,
+                        "attempts": attempt + 1, "ok": False, "error": str(e),
+                        "systemic": is_systemic(e)}
+
+    def _send_batch(self, batch: List[Dict], nbytes: Optional[int] = None) -> Dict[str, Any]:
+        """Send one batch and record its metric; committed batches are reported to `on_batch`."""
+        metric = self._send_with_retry(batch, payload_size(batch) if nbytes is None else nbytes)
+        with self._lock:
+            self.metrics.append(metric)
+        if metric["ok"] and self.on_batch:
+            self.on_batch(batch, metric)
+        return metric
+
+    def _fail(self, batch: List[Dict], metric: Dict[str, Any]) -> None:
+        """Give up on every record of a batch."""
+        with self._lock:
+            self.failed_records.extend(batch)
+            self.failures.extend([metric["error"]] * len(batch))
+        if self.on_batch:
+            self.on_batch(batch, metric)
+
+    def _upload_batch(self, batch: List[Dict], nbytes: Optional[int] = None) -> None:
+        """Upload a batch; on failure split it in half until the bad records are isolated."""
+        metric = self._send_batch(batch, nbytes)
+        if not metric["ok"]:
+            self._split(batch, metric)
+
+    def _split(self, batch: List[Dict], metric: Dict[str, Any]) -> None:
+        """
+        Bisect a failed batch, resending each half once.
+
+        Splitting stops at single records, on systemic errors, and when both
+        halves fail with the parent's error (the failure is not record-specific).
+        """
+        self._shrink()
+        if len(batch) == 1 or metric["systemic"]:
+            if len(batch) > 1:
+                error(f"[{self.label}] Not splitting a failed batch of {len(batch)}: {metric['error']}")
+            self._fail(batch, metric)
+            return
+
+        middle = len(batch) // 2
+        halves = [batch[:middle], batch[middle:]]
+        results = [self._send_batch(half) for half in halves]
+        if all(not m["ok"] and m["error"] == metric["error"] for m in results):
+            error(f"[{self.label}] Both halves of a batch of {len(batch)} failed like the whole batch; "
+                  f"not splitting further: {metric['error']}")
+            self._fail(batch, metric)
+            return
+        for half, result in zip(halves, results):
+            if not result["ok"]:
+                self._split(half, result)
+
+    def _batches(self, records: Iterable[Dict]) -> Iterator[Tuple[List[Dict], int]]:
+        """
+        Cut records into batches of at most `batch_size` rows and `max_payload_bytes` bytes.
+
+        Records are consumed one at a time, so only the batches in flight are held in memory.
+        A single record larger than the byte limit is sent on its own.
+        """
+        iterator = iter(records)
+        pending = None
+        while True:
+            size = self._next_size()
+            batch, nbytes = [], 2  # "[" and "]"
+            while len(batch) < size:
+                if pending is None:
+                    record = next(iterator, None)
+                    if record is None:
+                        break
+                    pending = (record, record_size(record))
+                record, record_bytes = pending
+                if batch and nbytes + record_bytes + 1 > self.max_payload_bytes:
+                    break
+                batch.append(record)
+                nbytes += record_bytes + (1 if len(batch) > 1 else 0)
+                pending = None
+            if not batch:
+                return
+            yield batch, nbytes
+
+    def run(self, records: Iterable[Dict]) -> Dict[str, Any]:
+        """
+        Upload all records.
+
+        Args:
+            records: Records to upload (any iterable; consumed lazily)
+
+        Returns:
+            Dict[str, Any]: Summary (see `summary`)
+        """
+        started = time.perf_counter()
+        slots = threading.BoundedSemaphore(self.max_in_flight)
+
+        def task(batch, nbytes):
+            try:
+                self._upload_batch(batch, nbytes)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            futures = []
+            batches = self._batches(records)
+            while True:
+                # Wait for a free slot before cutting the next batch, so its size
+                # reflects the latest completed requests
+                slots.acquire()
+                chunk = next(batches, None)
+                if chunk is None:
+                    slots.release()
+                    break
+                futures.append(pool.submit(task, *chunk))
+            for future in futures:
+                future.result()
+
+        self.elapsed = time.perf_counter() - started
+        return self.summary()
+
+    # ---------- Metrics ----------
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Aggregate per-batch metrics.
+
+        Returns:
+            Dict[str, Any]: requests, failed_requests, rows_uploaded, rows_failed,
+            retries, latency percentiles (p50/p95/max, seconds), rows_per_second
+            and the final batch size
+        """
+        latencies = sorted(m["latency"] for m in self.metrics if m["ok"])
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))]
+
+        rows_uploaded = sum(m["rows"] for m in self.metrics)
+        elapsed = getattr(self, "elapsed", 0.0)
+        return {
+            "requests": len(self.metrics),
+            "failed_requests": sum(1 for m in self.metrics if not m["ok"]),
+            "rows_uploaded": rows_uploaded,
+            "rows_failed": len(self.failed_records),
+            "retries": sum(m["attempts"] - 1 for m in self.metrics),
+            "latency_p50": percentile(0.50),
+            "latency_p95": percentile(0.95),
+            "latency_max": latencies[-1] if latencies else 0.0,
+            "rows_per_second": rows_uploaded / elapsed if elapsed else 0.0,
+            "final_batch_size": self.batch_size,
+        }
+
+    def report(self) -> None:
+        """Log the summary and a sample of isolated bad records."""
+        s = self.summary()
+        info(
+            f"[{self.label}] {s['rows_uploaded']} rows in {s['requests']} requests "
+            f"({s['retries']} retries), latency p50 {s['latency_p50']:.2f}s / p95 {s['latency_p95']:.2f}s, "
+            f"{s['rows_per_second']:.0f} rows/s, final batch size {s['final_batch_size']}"
+        )
+        if self.failed_records:
+            error(f"[{self.label}] {len(self.failed_records)} records could not be uploaded")
+            for record, reason in list(zip(self.failed_records, self.failures))[:5]:
+                error(f"[{self.label}]   {record.get('name', record)}: {reason}")
+        elif s["rows_uploaded"]:
+            success(f"[{self.label}] All batches uploaded")
@@ -0,0 +1,217 @@
+# auq_data_engine/upload/changeset.py
+
+"""
+Upload Utility: Incremental Change Sets from Record Hashes
+
+- Computes a stable content hash per record (canonical JSON, BLAKE2b)
+- Keeps a local manifest per table and city of the hashes from the last successful upload,
+  keyed by the table's natural unique key (point feature coordinates rounded to 6 decimals
+  like the database's unique index and dedup, with the exact values kept for deletes)
+- Passes on only new and changed records; unchanged records are not re-sent
+- Lists the keys that disappeared upstream so they can be deleted explicitly
+- Updates the manifest only for records that actually landed
+
+The manifest describes what this machine last uploaded, not what the database
+holds, so incremental uploads are opt-in (--incremental). Full uploads send
+every record and refresh the manifest, which re-baselines it after a database
+reset or on a new checkout.
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from shared.common_lib.emoji_logger import info, success, warning
+from auq_data_engine.upload import dedup
+
+# ==================
+# Configuration
+# ==================
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+MANIFEST_DIR = BASE_DIR / "data/processed/upload_manifest"
+
+# Natural unique key per table (same columns as the upsert conflict targets)
+KEYS = {
+    "districts": ("city_id", "district_code"),
+    "neighbourhoods": ("district_id", "neighbourhood_code"),
+    "indicators": ("indicator_def_id", "geo_level_id", "geo_id", "city_id", "year"),
+    "point_features": ("feature_definition_id", "latitude", "longitude", "city_id"),
+}
+
+# Key columns compared after rounding to dedup.COORD_DECIMALS, as in the unique index of
+# migration 012; the manifest also stores their exact values, which deletes must match
+QUANTIZED_COLUMNS = {
+    "point_features": ("latitude", "longitude"),
+}
+
+# ==================
+# Hashing
+# ==================
+
+def record_hash(record: Dict) -> str:
+    """Stable content hash of a record (independent of key order)."""
+    canonical = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def record_key(table_name: str, record: Dict) -> str:
+    """Natural key of a record, encoded as a JSON list (the manifest key)."""
+    quantized = QUANTIZED_COLUMNS.get(table_name, ())
+    values = []
+    for column in KEYS[table_name]:
+        value = record.get(column)
+        if column in quantized and value is not None:
+            value = int(dedup.quantize([value])[0])
+        values.append(value)
+    return json.dumps(values, ensure_ascii=False)
+
+
+def _digest(entry) -> str:
+    """Hash of a manifest entry: a hash, or [hash, exact key values] for QUANTIZED_COLUMNS tables."""
+    return entry[0] if isinstance(entry, list) else entry
+
+
+# ==================
+# Change Set
+# ==================
+
+class ChangeSet:
+    """
+    Diff of a table upload against the manifest of the previous successful upload.
+
+    Args:
+        table_name: Target table (one of KEYS)
+        city: City key
+        manifest_dir: Directory holding the manifests
+    """
+
+    def __init__(self, table_name: str, city: str, manifest_dir: Path = None):
+        if table_name not in KEYS:
+            raise ValueError(f"No natural key configured for table '{table_name}'")
+        self.table_name = table_name
+        self.city = city
+        self.path = Path(manifest_dir or MANIFEST_DIR) / f"{table_name}_{city}.json"
+        self._exact_keys = table_name in QUANTIZED_COLUMNS
+        self.previous = self._load()
+        self.current: Dict[str, Any] = {}
+        self.counts = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+
+    def _load(self) -> Dict[str, Any]:
+        if not self.path.exists():
+            return {}
+        try:
+            with self.path.open(encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            warning(f"Ignoring unreadable upload manifest {self.path.name}: {e}")
+            return {}
+        if self._exact_keys:
+            # Entries keyed by exact coordinates (older manifests) are re-keyed by rounded ones
+            columns = KEYS[self.table_name]
+            for key, entry in list(manifest.items()):
+                if not isinstance(entry, list):
+                    exact = json.loads(key)
+                    del manifest[key]
+                    manifest[record_key(self.table_name, dict(zip(columns, exact)))] = [entry, exact]
+        return manifest
+
+    def filter(self, records: Iterable[Dict], send_unchanged: bool = False) -> Iterator[Dict]:
+        """
+        Yield only new and changed records, remembering every record's hash.
+
+        Args:
+            records: All records of the table for this city (consumed lazily)
+            send_unchanged: Yield unchanged records too (full upload)
+
+        Yields:
+            Dict: Records to upsert
+        """
+        for record in records:
+            key = record_key(self.table_name, record)
+            digest = record_hash(record)
+            if self._exact_keys:
+                self.current[key] = [digest, [record.get(column) for column in KEYS[self.table_name]]]
+            else:
+                self.current[key] = digest
+            previous = self.previous.get(key)
+            if previous is not None and _digest(previous) == digest:
+                self.counts["unchanged"] += 1
+                if send_unchanged:
+                    yield record
+                continue
+            self.counts["inserted" if previous is None else "updated"] += 1
+            yield record
+
+    @property
+    def changed(self) -> int:
+        return self.counts["inserted"] + self.counts["updated"]
+
+    def removed_keys(self) -> List[Dict[str, Any]]:
+        """Keys present in the previous upload but not in this one (call after `filter`)."""
+        columns = KEYS[self.table_name]
+        return [
+            dict(zip(columns, entry[1] if isinstance(entry, list) else json.loads(key)))
+            for key, entry in self.previous.items() if key not in self.current
+        ]
+
+    def commit(self, failed: Iterable[Dict] = (), deleted: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Save the manifest for what landed.
+
+        Args:
+            failed: Records that could not be uploaded (they keep their previous hash,
+                    so the next run sends them again)
+            deleted: Keys deleted in the database (None when deletion failed; they stay
+                     in the manifest and are retried next run)
+        """
+        manifest = dict(self.current)
+        for record in failed:
+            key = record_key(self.table_name, record)
+            if key in self.previous:
+                manifest[key] = self.previous[key]
+            else:
+                manifest.pop(key, None)
+        removed = [key for key in self.previous if key not in self.current]
+        if deleted is None:
+            manifest.update({key: self.previous[key] for key in removed})
+        else:
+            self.counts["deleted"] = len(deleted)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def report(self) -> None:
+        c = self.counts
+        message = (f"[{self.table_name}/{self.city}] Change set: {c['inserted']} new, {c['updated']} changed, "
+                   f"{c['unchanged']} unchanged, {c['deleted']} deleted")
+        if self.changed or c["deleted"]:
+            info(message)
+        else:
+            success(message)
+
+
+def postgrest_key_filter(keys: List[Dict[str, Any]]) -> str:
+    """
+    Build a PostgREST `or` filter matching any of the given composite keys.
+
+    Example: or=(and(city_id.eq."1",district_code.eq."3"),and(...))
+    """
+    def literal(value):
+        return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+    return ",".join(
+        "and(" + ",".join(f"{column}.eq.{literal(value)}" for column, value in key.items()) + ")"
+        for key in keys
+    )
@@ -0,0 +1,258 @@
+# auq_data_engine/upload/dedup.py
+
+"""
+Upload Stage: Whole-Dataset Deduplication of Point Features
+
+- Quantises coordinates exactly like the database unique index
+  (ROUND(latitude::numeric, 6), migration 012): half away from zero on the decimal value
+- Keys every point as int64 (feature_definition_id, latitude, longitude, city_id)
+  in one NumPy structured array covering all cities
+- Finds duplicates in a single pass with np.unique, keeping the first occurrence
+- Streams the processed files twice (keys, then records) so records are never all in memory
+- Produces a duplicate report (counts per city and feature type plus examples)
+
+Usage:
+    python -m auq_data_engine.upload.dedup
+    (Writes the duplicate report for the processed point feature files)
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import json
+from collections import Counter
+from decimal import Decimal, ROUND_HALF_UP
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+import numpy as np
+
+from shared.common_lib.emoji_logger import info, success, warning
+from shared.common_lib import ndjson
+
+# ==================
+# Configuration
+# ==================
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+PROCESSED_DIR = BASE_DIR / "data/processed"
+REPORT_PATH = PROCESSED_DIR / "point_feature_duplicates.json"
+
+COORD_DECIMALS = 6
+COORD_SCALE = 10 ** COORD_DECIMALS
+
+KEY_DTYPE = np.dtype([
+    ("feature_definition_id", "i8"),
+    ("latitude", "i8"),
+    ("longitude", "i8"),
+    ("city_id", "i8"),
+])
+
+MAX_REPORTED_EXAMPLES = 20
+
+# ==================
+# Key Building
+# ==================
+
+def quantize(values: Sequence[float]) -> np.ndarray:
+    """
+    Scale coordinates to int64 units of 1e-6 degrees, rounding half away from zero.
+
+    Values whose scaled fraction is within float error of .5 are re-rounded from
+    their decimal representation, so the result matches NUMERIC rounding in the database.
+    """
+    values = np.asarray(values, dtype="float64")
+    scaled = values * COORD_SCALE
+    result = np.trunc(scaled + np.copysign(0.5, scaled))
+
+    fraction = np.abs(scaled - np.trunc(scaled))
+    for i in np.flatnonzero(np.abs(fraction - 0.5) < 1e-6):
+        exact = Decimal(repr(float(values[i]))).scaleb(COORD_DECIMALS)
+        result[i] = float(exact.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    return result.astype("int64")
+
+
+def build_keys(records: Iterable[Dict]) -> np.ndarray:
+    """
+    Build the structured key array of a sequence of point feature records.
+
+    Args:
+        records: Point feature records (consumed once)
+
+    Returns:
+        np.ndarray: One KEY_DTYPE row per record, in input order
+    """
+    feature_ids, lats, lons, city_ids = [], [], [], []
+    for record in records:
+        feature_ids.append(record["feature_definition_id"])
+        lats.append(float(record["latitude"]))
+        lons.append(float(record["longitude"]))
+        city_ids.append(record["city_id"])
+
+    keys = np.empty(len(feature_ids), dtype=KEY_DTYPE)
+    keys["feature_definition_id"] = feature_ids
+    keys["latitude"] = quantize(lats)
+    keys["longitude"] = quantize(lons)
+    keys["city_id"] = city_ids
+    return keys
+
+
+def find_duplicates(keys: np.ndarray) -> np.ndarray:
+    """
+    Locate repeated keys in one sort.
+
+    Args:
+        keys: KEY_DTYPE array
+
+    Returns:
+        np.ndarray: For every row, the index of the first row with the same key
+        (equal to the row's own index when it is the first occurrence)
+    """
+    if len(keys) == 0:
+        return np.empty(0, dtype="int64")
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    return first[inverse.ravel()]
+
+
+def iter_unique(records: Iterable[Dict], label: str = "point features") -> Iterator[Dict]:
+    """
+    Streaming variant for records that cannot be read twice (e.g. a pipeline queue).
+
+    Applies the same quantised key as `build_keys`; since city_id is part of the key,
+    deduplicating each city's stream separately gives the same result as one global pass.
+    """
+    seen = set()
+    duplicates = 0
+    for record in records:
+        lat, lon = quantize([float(record["latitude"]), float(record["longitude"])]).tolist()
+        key = (record["feature_definition_id"], lat, lon, record["city_id"])
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        yield record
+    if duplicates:
+        warning(f"Dropped {duplicates} duplicate {label} (6-decimal coordinates)")
+
+# ==================
+# Dataset Index
+# ==================
+
+class DedupIndex:
+    """
+    Duplicate index over the point features of several files (all cities at once).
+
+    Args:
+        sources: Mapping of source name (e.g. city) to its records or file path
+    """
+
+    def __init__(self, sources: Dict[str, Any]):
+        self.names = list(sources)
+        self.sources = sources
+        key_arrays = [build_keys(self._records(name)) for name in self.names]
+        self.offsets = np.cumsum([0] + [len(k) for k in key_arrays])
+        self.keys = np.concatenate(key_arrays) if key_arrays else np.empty(0, dtype=KEY_DTYPE)
+        self.first = find_duplicates(self.keys)
+        self.keep = self.first == np.arange(len(self.keys))
+
+    def _records(self, name: str) -> Iterator[Dict]:
+        source = self.sources[name]
+        if isinstance(source, (str, Path)):
+            yield from ndjson.iter_records(source)
+        else:
+            yield from source
+
+    def keep_mask(self, name: str) -> np.ndarray:
+        """Boolean mask of the records of a source that are first occurrences."""
+        i = self.names.index(name)
+        return self.keep[self.offsets[i]:self.offsets[i + 1]]
+
+    def unique_records(self, name: str) -> Iterator[Dict]:
+        """Yield the records of a source without duplicates (streams files again)."""
+        for record, keep in zip(self._records(name), self.keep_mask(name).tolist()):
+            if keep:
+                yield record
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Summarise the duplicates.
+
+        Returns:
+            Dict[str, Any]: total, unique and duplicate counts, duplicates per source and
+            per feature_definition_id, and the first examples as (source, row, first source, first row)
+        """
+        duplicates = np.flatnonzero(~self.keep)
+        source_of = np.searchsorted(self.offsets, np.arange(len(self.keys)), side="right") - 1
+
+        by_source = Counter(self.names[s] for s in source_of[duplicates].tolist())
+        by_feature = Counter(self.keys["feature_definition_id"][duplicates].tolist())
+
+        examples = []
+        for row in duplicates[:MAX_REPORTED_EXAMPLES].tolist():
+            first = int(self.first[row])
+            examples.append({
+                "source": self.names[source_of[row]],
+                "row": row - int(self.offsets[source_of[row]]),
+                "first_source": self.names[source_of[first]],
+                "first_row": first - int(self.offsets[source_of[first]]),
+                "key": {field: int(self.keys[field][row]) for field in KEY_DTYPE.names},
+            })
+
+        return {
+            "total": int(len(self.keys)),
+            "unique": int(self.keep.sum()),
+            "duplicates": int(len(duplicates)),
+            "by_source": {name: by_source.get(name, 0) for name in self.names},
+            "by_feature_definition_id": {str(k): v for k, v in sorted(by_feature.items())},
+            "examples": examples,
+        }
+
+    def log_report(self, path: Path = None) -> Dict[str, Any]:
+        """Log the report and optionally write it as JSON."""
+        report = self.report()
+        if report["duplicates"]:
+            warning(
+                f"Found {report['duplicates']} duplicate point features out of {report['total']} "
+                f"(6-decimal coordinates): " + ", ".join(f"{k}: {v}" for k, v in report["by_source"].items())
+            )
+        else:
+            info(f"No duplicate point features among {report['total']} records")
+        if path:
+            with Path(path).open("w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            success(f"Duplicate report saved to: {path}")
+        return report
+
+# ==========================
+# CLI Entry Point
+# ==========================
+
+def run(paths: Dict[str, Path] = None, report_path: Path = REPORT_PATH) -> Dict[str, Any]:
+    """
+    Build the duplicate report for the processed point feature files.
+
+    Args:
+        paths: Mapping of city to point features file (default: both processed files)
+        report_path: Where to write the JSON report
+
+    Returns:
+        Dict[str, Any]: The report
+    """
+    paths = paths or {
+        city: PROCESSED_DIR / f"insert_ready_point_features_{city}.json" for city in ("bcn", "madrid")
+    }
+    existing = {city: path for city, path in paths.items() if Path(path).exists()}
+    return DedupIndex(existing).log_report(report_path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report duplicate point features across all cities.")
+    parser.add_argument("--report_path", type=str, default=str(REPORT_PATH))
+
+    args = parser.parse_args()
+    run(report_path=Path(args.report_path))
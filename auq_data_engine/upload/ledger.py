@@ -0,0 +1,167 @@
+# auq_data_engine/upload/ledger.py
+
+"""
+Upload Utility: Resumable Upload Ledger
+
+- Records every committed batch in a local SQLite file: table, city, rows, bytes,
+  outcome and the content hash of each record it carried
+- A resumed upload (--resume) skips the records that already landed in an
+  interrupted run and continues with the first uncommitted ones
+- Record hashes (not batch boundaries) are checkpointed, so resuming works even
+  though adaptive batch sizes differ between runs
+- A normal (non-resumed) upload of a table/city starts a fresh checkpoint
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from shared.common_lib.emoji_logger import info
+
+# ==================
+# Configuration
+# ==================
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+LEDGER_PATH = BASE_DIR / "data/processed/upload_ledger.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    city TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    bytes INTEGER,
+    outcome TEXT NOT NULL,
+    error TEXT,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS landed (
+    table_name TEXT NOT NULL,
+    city TEXT NOT NULL,
+    record_hash TEXT NOT NULL,
+    batch_id INTEGER NOT NULL REFERENCES batches(id),
+    PRIMARY KEY (table_name, city, record_hash)
+) WITHOUT ROWID;
+"""
+
+# ==================
+# Ledger
+# ==================
+
+class UploadLedger:
+    """
+    SQLite checkpoint ledger shared by the upload threads.
+
+    Args:
+        path: SQLite file (":memory:" for tests)
+    """
+
+    def __init__(self, path: Path = LEDGER_PATH):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def begin(self, table_name: str, city: str, resume: bool = False) -> Set[str]:
+        """
+        Start the upload of a table for a city.
+
+        Args:
+            table_name: Target table
+            city: City key
+            resume: Keep the checkpoints of the previous run instead of starting over
+
+        Returns:
+            Set[str]: Hashes of the records that already landed (empty unless resuming)
+        """
+        with self._lock, self.conn:
+            if not resume:
+                self.conn.execute("DELETE FROM landed WHERE table_name = ? AND city = ?", (table_name, city))
+                self.conn.execute("DELETE FROM batches WHERE table_name = ? AND city = ?", (table_name, city))
+                return set()
+            rows = self.conn.execute(
+                "SELECT record_hash FROM landed WHERE table_name = ? AND city = ?", (table_name, city)
+            ).fetchall()
+        landed = {row[0] for row in rows}
+        if landed:
+            info(f"[{table_name}/{city}] Resuming: {len(landed)} records already landed")
+        return landed
+
+    def record_batch(
+        self,
+        table_name: str,
+        city: str,
+        record_hashes: List[str],
+        ok: bool,
+        nbytes: Optional[int] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """
+        Checkpoint one batch in a single transaction.
+
+        Args:
+            table_name: Target table
+            city: City key
+            record_hashes: Content hashes of the batch's records
+            ok: Whether the batch was committed by the database
+            nbytes: Request size
+            error: Error message of a failed batch
+        """
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO batches (table_name, city, rows, bytes, outcome, error) VALUES (?, ?, ?, ?, ?, ?)",
+                (table_name, city, len(record_hashes), nbytes, "landed" if ok else "failed", error),
+            )
+            if ok:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO landed (table_name, city, record_hash, batch_id) VALUES (?, ?, ?, ?)",
+                    [(table_name, city, digest, cursor.lastrowid) for digest in record_hashes],
+                )
+
+    def summary(self, table_name: str, city: str) -> Dict[str, int]:
+        """Batch and row counts per outcome for a table/city."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT outcome, COUNT(*), COALESCE(SUM(rows), 0) FROM batches "
+                "WHERE table_name = ? AND city = ? GROUP BY outcome",
+                (table_name, city),
+            ).fetchall()
+        result = {"landed_batches": 0, "landed_rows": 0, "failed_batches": 0, "failed_rows": 0}
+        for outcome, batches, total in rows:
+            result[f"{outcome}_batches"] = batches
+            result[f"{outcome}_rows"] = total
+        return result
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def skip_landed(records: Iterable[Dict], landed: Set[str], hash_fn, label: str) -> Iterator[Dict]:
+    """
+    Yield only the records whose hash is not in `landed`.
+
+    Args:
+        records: Records to upload
+        landed: Hashes from `UploadLedger.begin`
+        hash_fn: Record hash function (changeset.record_hash)
+        label: Name used in the log line
+    """
+    skipped = 0
+    for record in records:
+        if hash_fn(record) in landed:
+            skipped += 1
+            continue
+        yield record
+    if skipped:
+        info(f"[{label}] Skipped {skipped} records committed by the interrupted run")
@@ -0,0 +1,284 @@
+# auq_data_engine/upload/pg_copy.py
+
+"""
+ETL Script: Bulk-Load Processed Data with PostgreSQL COPY
+
+- Connects straight to the Supabase Postgres database with psycopg2 (SUPABASE_DB_URL)
+- Streams records into a temporary staging table with COPY FROM STDIN
+- Merges the staging table into the target with one INSERT ... ON CONFLICT per table,
+  using the tables' natural unique keys
+- Runs each table load in a single transaction
+
+Used by upload_to_supabase when the "copy" backend is selected.
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-06-10
+Version: 1.0.0
+License: MIT License
+"""
+
+import io
+import os
+import json
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+from dotenv import load_dotenv
+
+from shared.common_lib.emoji_logger import info, success, warning, error
+
+# ==================
+# Configuration
+# ==================
+load_dotenv()
+
+SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL")
+
+COPY_BUFFER_SIZE = 256 * 1024
+DELETE_PAGE_SIZE = 1000  # keys per DELETE statement
+
+# Natural unique key per table (ON CONFLICT target) and the expressions used to
+# drop in-file duplicates before the merge (a row cannot be updated twice by one INSERT)
+TABLES = {
+    "districts": {
+        "key": ("city_id", "district_code"),
+    },
+    "neighbourhoods": {
+        "key": ("district_id", "neighbourhood_code"),
+    },
+    "indicators": {
+        "key": ("indicator_def_id", "geo_level_id", "geo_id", "city_id", "year"),
+    },
+    "point_features": {
+        "key": ("feature_definition_id", "latitude", "longitude", "city_id"),
+        # Migration 012 also enforces uniqueness on coordinates rounded to 6 decimals
+        "dedupe": ("feature_definition_id", "ROUND(latitude::numeric, 6)",
+                   "ROUND(longitude::numeric, 6)", "city_id"),
+    },
+}
+
+# ==================
+# COPY Stream
+# ==================
+
+def _csv_field(value: Any) -> str:
+    """Encode one value for COPY ... (FORMAT csv): NULL is an unquoted empty field."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def encode_rows(records: Iterable[Dict], columns: Sequence[str]) -> Iterator[str]:
+    """Yield one CSV line per record, with the values in `columns` order."""
+    for record in records:
+        yield ",".join(_csv_field(record.get(column)) for column in columns) + "\n"
+
+
+class RecordStream(io.RawIOBase):
+    """Read-only file object that encodes records lazily for `copy_expert`."""
+
+    def __init__(self, records: Iterable[Dict], columns: Sequence[str]):
+        self._lines = encode_rows(records, columns)
+        self._buffer = b""
+        self.rows = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line.encode("utf-8")
+            self.rows += 1
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+# ==================
+# Core Utilities
+# ==================
+
+def connect(dsn: Optional[str] = None):
+    """Open a psycopg2 connection to the Supabase database."""
+    dsn = dsn or SUPABASE_DB_URL
+    if not dsn:
+        raise RuntimeError("SUPABASE_DB_URL is not set; it is required by the COPY upload backend")
+    return psycopg2.connect(dsn)
+
+
+def build_merge_sql(table_name: str, columns: Sequence[str], staging: str) -> sql.Composed:
+    """
+    Build the INSERT ... SELECT ... ON CONFLICT statement merging a staging table.
+
+    Args:
+        table_name: Target table (one of TABLES)
+        columns: Columns loaded into the staging table
+        staging: Name of the staging table
+
+    Returns:
+        sql.Composed: The merge statement
+    """
+    config = TABLES[table_name]
+    key = config["key"]
+    dedupe = config.get("dedupe", key)
+    updates = [column for column in columns if column not in key]
+
+    column_list = sql.SQL(", ").join(map(sql.Identifier, columns))
+    dedupe_list = sql.SQL(", ").join(
+        sql.SQL(expr) if "(" in expr else sql.Identifier(expr) for expr in dedupe
+    )
+    set_list = sql.SQL(", ").join(
+        [sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(column)) for column in updates]
+        + [sql.SQL("updated_at = CURRENT_TIMESTAMP")]
+    )
+
+    return sql.SQL(
+        "INSERT INTO {table} ({columns}) "
+        "SELECT DISTINCT ON ({dedupe}) {columns} FROM {staging} ORDER BY {dedupe}, _row "
+        "ON CONFLICT ({key}) DO UPDATE SET {updates}"
+    ).format(
+        table=sql.Identifier(table_name),
+        columns=column_list,
+        dedupe=dedupe_list,
+        staging=sql.Identifier(staging),
+        key=sql.SQL(", ").join(map(sql.Identifier, key)),
+        updates=set_list,
+    )
+
+
+def copy_upsert(conn, table_name: str, records: Iterable[Dict], columns: Optional[Sequence[str]] = None) -> int:
+    """
+    Load records into a table through a COPY-filled staging table, in one transaction.
+
+    Args:
+        conn: psycopg2 connection
+        table_name: Target table (one of TABLES)
+        records: Insert-ready records (any iterable; streamed into COPY)
+        columns: Columns to load (default: keys of the first record)
+
+    Returns:
+        int: Number of rows inserted or updated
+    """
+    if table_name not in TABLES:
+        raise ValueError(f"No unique key configured for table '{table_name}'")
+    iterator = iter(records)
+    first = next(iterator, None)
+    if first is None:
+        return 0
+
+    columns = list(columns or first.keys())
+    records = chain([first], iterator)
+    staging = f"_stage_{table_name}"
+
+    with conn:
+        with conn.cursor() as cur:
+            # Same column types as the target, no constraints, dropped at commit
+            cur.execute(sql.SQL(
+                "CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA"
+            ).format(
+                staging=sql.Identifier(staging),
+                columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+                table=sql.Identifier(table_name),
+            ))
+            cur.execute(sql.SQL("ALTER TABLE {} ADD COLUMN _row BIGSERIAL").format(sql.Identifier(staging)))
+
+            stream = RecordStream(records, columns)
+            cur.copy_expert(
+                sql.SQL("COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)").format(
+                    staging=sql.Identifier(staging),
+                    columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+                ).as_string(conn),
+                stream,
+                size=COPY_BUFFER_SIZE,
+            )
+            info(f"[{table_name}] Copied {stream.rows} rows into staging table")
+
+            cur.execute(build_merge_sql(table_name, columns, staging))
+            return cur.rowcount
+
+def delete_rows(table_name: str, keys: Sequence[Dict[str, Any]], dsn: Optional[str] = None) -> int:
+    """
+    Delete the rows matching the given natural keys, in one transaction.
+
+    Args:
+        table_name: Target table (one of TABLES)
+        keys: Key column → value mappings (all with the same columns)
+        dsn: Database URL (default: SUPABASE_DB_URL)
+
+    Returns:
+        int: Number of rows deleted
+    """
+    if not keys:
+        return 0
+    columns = list(keys[0])
+    rows = [tuple(key[column] for column in columns) for key in keys]
+    conn = connect(dsn)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                statement = sql.SQL("DELETE FROM {table} WHERE ({columns}) IN (VALUES %s)").format(
+                    table=sql.Identifier(table_name),
+                    columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+                ).as_string(conn)
+                # One statement per page; cur.rowcount only covers the last one
+                deleted = 0
+                for start in range(0, len(rows), DELETE_PAGE_SIZE):
+                    page = rows[start:start + DELETE_PAGE_SIZE]
+                    execute_values(cur, statement, page, page_size=len(page))
+                    deleted += cur.rowcount
+                return deleted
+    finally:
+        conn.close()
+
+# ==================
+# Upload Entry Point
+# ==================
+
+def upload(table_name: str, records: Iterable[Dict], city: str, dsn: Optional[str] = None) -> bool:
+    """
+    Upload records to a table with COPY + merge.
+
+    Args:
+        table_name: Target table
+        records: Insert-ready records
+        city: City key (used in log messages)
+        dsn: Database URL (default: SUPABASE_DB_URL)
+
+    Returns:
+        bool: True if the load committed and affected at least one row
+    """
+    if isinstance(records, list) and not records:
+        warning(f"No records to upload to '{table_name}' for {city}")
+        return False
+
+    try:
+        conn = connect(dsn)
+    except Exception as e:
+        error(f"Failed to connect to the database: {e}")
+        return False
+
+    try:
+        affected = copy_upsert(conn, table_name, records)
+        if affected:
+            success(f"Upserted {affected} records into '{table_name}' for {city} (COPY)")
+            return True
+        warning(f"No rows changed in '{table_name}' for {city}")
+        return False
+    except Exception as e:
+        error(f"Error during COPY upload to '{table_name}' for {city}: {e}")
+        return False
+    finally:
+        conn.close()
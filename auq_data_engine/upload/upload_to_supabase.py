@@ -1,265 +1,488 @@
-# auq_data_engine/upload/upload_to_supabase.py
-
-"""
-ETL Script: Upload Processed Geo Data to Supabase
-
-- Loads processed district, neighbourhood, point feature, and indicator data from disk
-- Uploads records to corresponding Supabase tables
-- Provides CLI-based execution with logging and error handling
-- Includes validation to ensure data consistency
-
-Author: Nico D'Alessandro Calderon
-Email: nicodalessandro11@gmail.com
-Date: 2025-04-17
-Version: 1.0.0
-License: MIT License
-"""
-
-import json
-import os
-from pathlib import Path
-from dotenv import load_dotenv
-from supabase import create_client, Client
-from shared.common_lib.emoji_logger import info, success, warning, error
-
-# ==================
-# Configuration
-# ==================
-load_dotenv()
-
-BASE_DIR = Path(__file__).resolve().parents[1]
-PROCESSED_DIR = BASE_DIR / "data/processed"
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# Expected counts for validation
-EXPECTED_COUNTS = {
-    "bcn": {
-        "districts": 10,
-        "neighbourhoods": 73,
-        "point_features": 0,
-        "indicators": 0
-    },
-    "madrid": {
-        "districts": 21,
-        "neighbourhoods": 131,
-        "point_features": 0,
-        "indicators": 0
-    }
-}
-
-# ==================
-# Validation Utilities
-# ==================
-def validate_data(data: list, city: str, data_type: str) -> bool:
-    """Validate data before upload to ensure completeness."""
-    expected_count = EXPECTED_COUNTS[city][data_type]
-    if expected_count > 0 and len(data) < expected_count:
-        error(f"Expected {expected_count} {data_type} for {city} but found only {len(data)}. Aborting upload.")
-        return False
-    return True
-
-def get_city_from_filename(filename: str) -> str:
-    """Extract city name from filename."""
-    return "bcn" if "bcn" in filename else "madrid"
-
-# ==================
-# Core Utilities
-# ==================
-def load_json_data(file_path: Path):
-    try:
-        with file_path.open(encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        error(f"Failed to read file {file_path}: {e}")
-        return []
-
-def upload(table_name: str, records: list[dict], city: str):
-    if not records:
-        warning(f"No records to upload to '{table_name}' for {city}")
-        return False
-
-    if not validate_data(records, city, table_name):
-        return False
-
-    try:
-        # For point features, we need to handle duplicates based on coordinates
-        if table_name == 'point_features':
-            # Process records in batches to handle duplicates
-            BATCH_SIZE = 100
-            total_uploaded = 0
-            total_skipped = 0
-            
-            # Print total records before processing
-            info(f"Total records to process for {city}: {len(records)}")
-            
-            for i in range(0, len(records), BATCH_SIZE):
-                batch = records[i:i + BATCH_SIZE]
-                try:
-                    # Check for duplicates within the batch
-                    seen = set()
-                    duplicates = []
-                    unique_records = []
-                    
-                    for record in batch:
-                        key = (record['feature_definition_id'], 
-                              record['latitude'], 
-                              record['longitude'], 
-                              record['city_id'])
-                        if key in seen:
-                            duplicates.append(record)
-                        else:
-                            seen.add(key)
-                            unique_records.append(record)
-                    
-                    if duplicates:
-                        warning(f"Found {len(duplicates)} duplicates in batch {i//BATCH_SIZE + 1}")
-                        warning(f"Example duplicate: {duplicates[0]}")
-                        info(f"Unique records in this batch: {len(unique_records)}")
-                    
-                    # Use upsert with on_conflict to ignore duplicates
-                    if unique_records:  # Only try to upload if we have unique records
-                        response = supabase.table(table_name).upsert(
-                            unique_records,
-                            on_conflict='feature_definition_id,latitude,longitude,city_id'
-                        ).execute()
-                        if hasattr(response, "data") and response.data:
-                            total_uploaded += len(response.data)
-                            info(f"Successfully uploaded {len(response.data)} records in batch {i//BATCH_SIZE + 1}")
-                except Exception as e:
-                    error(f"Error uploading batch {i//BATCH_SIZE + 1}: {str(e)}")
-                    total_skipped += len(batch)
-                    continue
-            
-            if total_uploaded > 0:
-                success(f"Successfully uploaded {total_uploaded} point features for {city}")
-            if total_skipped > 0:
-                warning(f"Skipped {total_skipped} duplicate point features for {city}")
-            
-            return total_uploaded > 0
-        else:
-            # For other tables, use upsert with appropriate conflict handling
-            response = supabase.table(table_name).upsert(
-                records,
-                on_conflict='indicator_def_id,geo_level_id,geo_id,city_id,year' if table_name == 'indicators' else None
-            ).execute()
-
-            if hasattr(response, "status_code"):
-                info(f"[{table_name}] Status: {response.status_code}")
-            if hasattr(response, "data") and response.data:
-                success(f"Uploaded {len(response.data)} records to '{table_name}' for {city}")
-                return True
-            else:
-                warning(f"No data returned after uploading to '{table_name}' for {city}. Check Supabase logs.")
-                return False
-    except Exception as e:
-        error(f"Error during upload to '{table_name}' for {city}: {e}")
-        return False
-
-# ================== 
-# Execution Blocks
-# ==================
-def run_district_upload():
-    info("Uploading districts...")
-    files = [
-        ("districts", PROCESSED_DIR / "insert_ready_districts_bcn.json"),
-        ("districts", PROCESSED_DIR / "insert_ready_districts_madrid.json"),
-    ]
-    success = True
-    for table, path in files:
-        data = load_json_data(path)
-        city = get_city_from_filename(path.name)
-        if not upload(table, data, city):
-            success = False
-    return success
-
-def run_neighbourhood_upload():
-    info("Uploading neighbourhoods...")
-    files = [
-        ("neighbourhoods", PROCESSED_DIR / "insert_ready_neighbourhoods_bcn.json"),
-        ("neighbourhoods", PROCESSED_DIR / "insert_ready_neighbourhoods_madrid.json"),
-    ]
-    success = True
-    for table, path in files:
-        data = load_json_data(path)
-        city = get_city_from_filename(path.name)
-        if not upload(table, data, city):
-            success = False
-    return success
-
-def run_point_feature_upload():
-    info("Uploading point features...")
-    files = [
-        ("point_features", PROCESSED_DIR / "insert_ready_point_features_bcn.json"),
-        ("point_features", PROCESSED_DIR / "insert_ready_point_features_madrid.json"),
-    ]
-    success = True
-    for table, path in files:
-        data = load_json_data(path)
-        city = get_city_from_filename(path.name)
-        if not upload(table, data, city):
-            success = False
-    return success
-
-def run_indicator_upload():
-    info("Uploading indicators...")
-    files = [
-        ("indicators", PROCESSED_DIR / "insert_ready_indicators_bcn.json"),
-        ("indicators", PROCESSED_DIR / "insert_ready_indicators_madrid.json"),
-    ]
-    success = True
-    for table, path in files:
-        data = load_json_data(path)
-        city = get_city_from_filename(path.name)
-        if not upload(table, data, city):
-            success = False
-    return success
-
-def run_all_uploads():
-    info("Starting full Supabase upload flow...")
-    
-    # Execute in correct order with validation
-    if not run_district_upload():
-        error("District upload failed. Aborting remaining uploads.")
-        return False
-        
-    if not run_neighbourhood_upload():
-        error("Neighbourhood upload failed. Aborting remaining uploads.")
-        return False
-        
-    if not run_point_feature_upload():
-        error("Point feature upload failed. Aborting remaining uploads.")
-        return False
-        
-    if not run_indicator_upload():
-        error("Indicator upload failed.")
-        return False
-        
-    success("All uploads completed successfully.")
-    return True
-
-# ==================
-# CLI Support
-# ==================
-if __name__ == "__main__":
-    import argparse
-
-    parser = argparse.ArgumentParser(description="Upload processed files to Supabase.")
-    parser.add_argument("--only", type=str, choices=["districts", "neighbourhoods", "points", "indicators", "all"], default="all")
-
-    args = parser.parse_args()
-    task = args.only
-
-    if task == "districts":
-        run_district_upload()
-    elif task == "neighbourhoods":
-        run_neighbourhood_upload()
-    elif task == "points":
-        run_point_feature_upload()
-    elif task == "indicators":
-        run_indicator_upload()
-    else:
-        run_all_uploads()
-
+# auq_data_engine/upload/upload_to_supabase.py
+
+"""
+ETL Script: Upload Processed Geo Data to Supabase
+
+- Loads processed district, neighbourhood, point feature, and indicator data from disk
+- Uploads records to corresponding Supabase tables
+- Provides CLI-based execution with logging and error handling
+- Includes validation to ensure data consistency
+- Uploads through PostgREST upserts ("rest", default) or PostgreSQL COPY ("copy")
+- Sends every record and refreshes the upload manifest; with --incremental, sends
+  only records that changed since the last upload and deletes removed ones (see changeset)
+- Deletes only after the whole file was read, when its loader reported no failed inputs,
+  and (unless --allow-mass-delete) when few records disappeared
+- Checkpoints every committed batch in a local ledger; --resume continues an interrupted upload
+- Deduplicates point features across all cities before upload (see dedup)
+- Streams each file from disk and upserts it in byte-bounded, concurrent batches
+  with retries (REST backend)
+- Measures every (table, city) upload as a stage of the run metrics (see instrumentation)
+
+Author: Nico D'Alessandro Calderon
+Email: nicodalessandro11@gmail.com
+Date: 2025-04-17
+Version: 1.0.0
+License: MIT License
+"""
+
+import os
+from itertools import chain
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from dotenv import load_dotenv
+from supabase import create_client, Client
+from shared.common_lib.emoji_logger import info, success, warning, error
+from shared.common_lib import ndjson, instrumentation, profiling
+from auq_data_engine.upload import pg_copy, dedup, changeset
+from auq_data_engine.upload.batch_uploader import AdaptiveBatchUploader
+from auq_data_engine.upload import ledger as ledger_module
+from auq_data_engine.upload.ledger import UploadLedger, skip_landed
+
+# ==================
+# Configuration
+# ==================
+load_dotenv()
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+PROCESSED_DIR = BASE_DIR / "data/processed"
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+# Upload backend: "rest" (PostgREST upserts) or "copy" (psycopg2 COPY + merge)
+BACKENDS = ("rest", "copy")
+BACKEND = os.getenv("AUQ_UPLOAD_BACKEND", "rest")
+
+# Upper bound on the JSON body of one upsert request (keep below the gateway limit)
+MAX_REQUEST_BYTES = int(os.getenv("AUQ_UPLOAD_MAX_BYTES", 1024 * 1024))
+
+# PostgREST on_conflict target per table: its natural unique key, so changed
+# records update the existing row
+ON_CONFLICT = {table: ",".join(key) for table, key in changeset.KEYS.items()}
+
+# Incremental uploads send only new and changed records (see changeset). They trust the
+# local manifest to describe the database, so they are opt-in: AUQ_UPLOAD_INCREMENTAL=1
+INCREMENTAL = os.getenv("AUQ_UPLOAD_INCREMENTAL", "0") == "1"
+
+# Resume an interrupted upload from the checkpoint ledger (see ledger)
+RESUME = False
+LEDGER: Optional[UploadLedger] = None
+
+# Keys per DELETE request when removing records that disappeared upstream
+DELETE_CHUNK_SIZE = 50
+
+# Largest share of a table/city that one incremental upload may delete; more points to a
+# broken source rather than real removals and needs --allow-mass-delete
+MAX_DELETE_FRACTION = float(os.getenv("AUQ_UPLOAD_MAX_DELETE_FRACTION", 0.1))
+ALLOW_MASS_DELETE = False
+
+# Expected counts for validation
+EXPECTED_COUNTS = {
+    "bcn": {
+        "districts": 10,
+        "neighbourhoods": 73,
+        "point_features": 0,
+        "indicators": 0
+    },
+    "madrid": {
+        "districts": 21,
+        "neighbourhoods": 131,
+        "point_features": 0,
+        "indicators": 0
+    }
+}
+
+CITIES = tuple(EXPECTED_COUNTS)
+
+# ==================
+# Validation Utilities
+# ==================
+def validate_data(count: int, city: str, data_type: str) -> bool:
+    """Validate the record count before upload to ensure completeness."""
+    expected_count = EXPECTED_COUNTS[city][data_type]
+    if expected_count > 0 and count < expected_count:
+        error(f"Expected {expected_count} {data_type} for {city} but found only {count}. Aborting upload.")
+        return False
+    return True
+
+def get_city_from_filename(filename: str) -> str:
+    """Extract city name from filename."""
+    return "bcn" if "bcn" in filename else "madrid"
+
+# ==================
+# Core Utilities
+# ==================
+def iter_json_records(file_path: Path) -> Iterator[dict]:
+    """
+    Yield the records of an insert_ready_*.json file (NDJSON or a JSON array) one at a time.
+
+    Raises:
+        OSError, ValueError: If the file is missing or malformed; the upload fails
+        instead of treating the records read so far as the whole table
+    """
+    yield from ndjson.iter_records(file_path)
+
+def count_json_records(file_path: Path) -> int:
+    """Count the records of an insert_ready_*.json file without keeping them in memory."""
+    try:
+        return ndjson.count_records(file_path)
+    except Exception as e:
+        error(f"Failed to read file {file_path}: {e}")
+        return 0
+
+def set_backend(backend: str) -> None:
+    """Select the upload backend for this run ("rest" or "copy")."""
+    global BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown upload backend '{backend}'. Choose one of {BACKENDS}")
+    BACKEND = backend
+    info(f"Upload backend: {backend}")
+
+def set_resume(resume: bool) -> None:
+    """Skip records that an interrupted upload already committed (see ledger)."""
+    global RESUME
+    RESUME = resume
+    if resume:
+        info("Upload mode: resuming from the upload ledger")
+
+def get_ledger() -> UploadLedger:
+    """Open the upload ledger on first use."""
+    global LEDGER
+    if LEDGER is None:
+        LEDGER = UploadLedger(ledger_module.LEDGER_PATH)
+    return LEDGER
+
+def set_allow_mass_delete(allow: bool) -> None:
+    """Let incremental uploads delete more than MAX_DELETE_FRACTION of a table/city."""
+    global ALLOW_MASS_DELETE
+    ALLOW_MASS_DELETE = allow
+
+def set_incremental(incremental: bool) -> None:
+    """Send only the change set since the last upload (True) or every record (False)."""
+    global INCREMENTAL
+    INCREMENTAL = incremental
+    info("Upload mode: " + ("incremental" if incremental else "full"))
+
+def upload(table_name: str, records: Iterable[dict], city: str, total: Optional[int] = None,
+           source: Optional[Path] = None):
+    """
+    Upload records to a table.
+
+    Args:
+        table_name: Target table
+        records: Insert-ready records (a list, or any iterable consumed lazily)
+        city: City key
+        total: Number of records, for validation when `records` is not a list
+        source: insert_ready file written by the loader, whose .incomplete marker blocks
+                deletions (default: the standard file of the table and city)
+
+    Returns:
+        bool: True if at least one record was uploaded
+    """
+    if total is None and isinstance(records, list):
+        total = len(records)
+    if source is None:
+        source = PROCESSED_DIR / f"insert_ready_{table_name}_{city}.json"
+    with instrumentation.stage(f"{city}:{table_name}:upload") as metrics:
+        stream = RecordStream(records)
+        try:
+            metrics.ok = _upload(table_name, stream, city, total, source)
+        except Exception as e:
+            error(f"Error during upload to '{table_name}' for {city}: {e}")
+            metrics.ok = False
+        finally:
+            stream.close()
+            instrumentation.count("records_in", stream.read)
+        return metrics.ok
+
+class RecordStream:
+    """
+    Iterator over the records of one upload that counts them and notes whether
+    the source ended normally (an error while reading leaves `exhausted` False).
+    """
+
+    def __init__(self, records: Iterable[dict]):
+        self._records = iter(records)
+        self.read = 0
+        self.exhausted = False
+
+    def __iter__(self) -> "RecordStream":
+        return self
+
+    def __next__(self) -> dict:
+        try:
+            record = next(self._records)
+        except StopIteration:
+            self.exhausted = True
+            raise
+        self.read += 1
+        return record
+
+    def complete(self, total: Optional[int]) -> bool:
+        """True if every record was read (and there were `total` of them, when known)."""
+        return self.exhausted and (total is None or self.read == total)
+
+    def close(self) -> None:
+        close = getattr(self._records, "close", None)
+        if close is not None:
+            close()
+
+def read_in_full(stream: RecordStream, total: Optional[int], table_name: str, city: str) -> bool:
+    """Check that the whole table was read before the upload is reported or committed."""
+    if stream.complete(total):
+        return True
+    expected = f" of {total}" if total is not None else ""
+    error(f"Read only {stream.read}{expected} records for '{table_name}' ({city}); "
+          f"upload incomplete, change set not committed")
+    return False
+
+def _upload(table_name: str, stream: RecordStream, city: str, total: Optional[int], source: Path) -> bool:
+    iterator = iter(stream)
+    first = next(iterator, None)
+    if first is None:
+        warning(f"No records to upload to '{table_name}' for {city}")
+        return False
+    records = chain([first], iterator)
+
+    if total is not None and not validate_data(total, city, table_name):
+        return False
+
+    # Every record is hashed against the manifest; incremental uploads send only new and
+    # changed records, full uploads send everything and refresh the manifest
+    changes = changeset.ChangeSet(table_name, city)
+    records = changes.filter(records, send_unchanged=not INCREMENTAL)
+
+    # Skip what an interrupted run already committed (--resume), checkpoint the rest
+    ledger = get_ledger()
+    landed_before = ledger.begin(table_name, city, resume=RESUME)
+    if landed_before:
+        records = skip_landed(records, landed_before, changeset.record_hash, f"{table_name}/{city}")
+
+    if BACKEND == "copy":
+        sent = []
+        records = (sent.append(changeset.record_hash(r)) or r for r in records)
+        landed = pg_copy.upload(table_name, records, city)
+        if landed:
+            ledger.record_batch(table_name, city, sent, ok=True)
+            instrumentation.count("records_out", len(sent))
+        landed = (landed or not sent) and read_in_full(stream, total, table_name, city)
+        if landed:
+            changes.commit(deleted=delete_removed(table_name, city, changes, source) if INCREMENTAL else None)
+        changes.report()
+        return landed
+
+    try:
+        if total is not None:
+            info(f"Total records to process for {city}: {total}")
+
+        def send(batch):
+            response = supabase.table(table_name).upsert(
+                batch,
+                on_conflict=ON_CONFLICT[table_name]
+            ).execute()
+            return len(response.data or [])
+
+        def checkpoint(batch, metric):
+            ledger.record_batch(table_name, city, [changeset.record_hash(r) for r in batch],
+                                ok=metric["ok"], nbytes=metric["bytes"], error=metric.get("error"))
+
+        # Byte-bounded chunks, read lazily and upserted with several requests in flight
+        uploader = AdaptiveBatchUploader(send, label=f"{table_name}/{city}", max_payload_bytes=MAX_REQUEST_BYTES,
+                                         on_batch=checkpoint)
+        summary = uploader.run(records)
+        if summary["requests"]:
+            uploader.report()
+        instrumentation.count("records_out", summary["rows_uploaded"])
+        instrumentation.count("http_requests", sum(m["attempts"] for m in uploader.metrics))
+        instrumentation.count("http_bytes_out", sum(m["bytes"] * m["attempts"] for m in uploader.metrics))
+
+        if summary["rows_failed"] > 0:
+            warning(f"Skipped {summary['rows_failed']} records of '{table_name}' for {city} that failed on their own")
+
+        if not read_in_full(stream, total, table_name, city):
+            return False
+
+        deleted = None
+        if INCREMENTAL and summary["rows_failed"] == 0:
+            deleted = delete_removed(table_name, city, changes, source)
+        changes.commit(failed=uploader.failed_records, deleted=deleted)
+        changes.report()
+
+        if summary["requests"] == 0:
+            info(f"Nothing left to upload to '{table_name}' for {city}")
+            return True
+
+        if summary["rows_uploaded"] > 0:
+            success(f"Uploaded {summary['rows_uploaded']} records to '{table_name}' for {city}")
+            return True
+        warning(f"No data returned after uploading to '{table_name}' for {city}. Check Supabase logs.")
+        return False
+    except Exception as e:
+        error(f"Error during upload to '{table_name}' for {city}: {e}")
+        return False
+
+def delete_removed(table_name: str, city: str, changes: changeset.ChangeSet, source: Optional[Path] = None):
+    """
+    Delete the records that disappeared upstream since the last upload.
+
+    Call only after the whole table was read. Nothing is deleted when the loader
+    marked its output incomplete (failed inputs look like removed records) or when
+    more than MAX_DELETE_FRACTION of the table would go, unless ALLOW_MASS_DELETE.
+
+    Returns:
+        The deleted keys, or None if nothing was deleted (the keys stay in the
+        manifest and are considered again next run)
+    """
+    removed = changes.removed_keys()
+    if not removed:
+        return []
+
+    failed_inputs = ndjson.incomplete_reasons(source) if source is not None else []
+    if failed_inputs:
+        warning(f"Not deleting {len(removed)} records from '{table_name}' for {city}: "
+                f"{len(failed_inputs)} loader inputs failed ({failed_inputs[0]})")
+        return None
+    if not ALLOW_MASS_DELETE and len(removed) > MAX_DELETE_FRACTION * len(changes.previous):
+        warning(f"Not deleting {len(removed)} of {len(changes.previous)} records from '{table_name}' for {city}: "
+                f"more than {MAX_DELETE_FRACTION:.0%} disappeared; pass --allow-mass-delete if that is expected")
+        return None
+
+    try:
+        if BACKEND == "copy":
+            pg_copy.delete_rows(table_name, removed)
+        else:
+            for i in range(0, len(removed), DELETE_CHUNK_SIZE):
+                chunk = removed[i:i + DELETE_CHUNK_SIZE]
+                supabase.table(table_name).delete().or_(changeset.postgrest_key_filter(chunk)).execute()
+        warning(f"Deleted {len(removed)} records from '{table_name}' for {city} that are no longer in the source")
+        return removed
+    except Exception as e:
+        error(f"Failed to delete {len(removed)} removed records from '{table_name}' for {city}: {e}")
+        return None
+
+def upload_file(table_name: str, path: Path) -> bool:
+    """Stream an insert_ready_*.json file into a table."""
+    city = get_city_from_filename(path.name)
+    return upload(table_name, iter_json_records(path), city, count_json_records(path), source=path)
+
+# ================== 
+# Execution Blocks
+# ==================
+def run_district_upload(cities: Iterable[str] = CITIES):
+    info("Uploading districts...")
+    success = True
+    for city in cities:
+        if not upload_file("districts", PROCESSED_DIR / f"insert_ready_districts_{city}.json"):
+            success = False
+    return success
+
+def run_neighbourhood_upload(cities: Iterable[str] = CITIES):
+    info("Uploading neighbourhoods...")
+    success = True
+    for city in cities:
+        if not upload_file("neighbourhoods", PROCESSED_DIR / f"insert_ready_neighbourhoods_{city}.json"):
+            success = False
+    return success
+
+def run_point_feature_upload(cities: Iterable[str] = CITIES):
+    info("Uploading point features...")
+    files = {city: PROCESSED_DIR / f"insert_ready_point_features_{city}.json" for city in cities}
+    missing = [path for path in files.values() if not path.exists()]
+    for path in missing:
+        error(f"Failed to read file {path}: not found")
+    files = {city: path for city, path in files.items() if path.exists()}
+
+    # One deduplication pass over all cities, with the database's coordinate rounding.
+    # If a file cannot be read, find the unreadable ones and index the others
+    try:
+        index = dedup.DedupIndex(files)
+    except Exception:
+        unreadable = []
+        for city, path in files.items():
+            try:
+                dedup.build_keys(ndjson.iter_records(path))
+            except Exception as e:
+                error(f"Failed to read file {path}: {e}")
+                unreadable.append(city)
+        missing += [files.pop(city) for city in unreadable]
+        index = dedup.DedupIndex(files)
+    index.log_report(dedup.REPORT_PATH)
+
+    success = not missing
+    for city in files:
+        total = int(index.keep_mask(city).sum())
+        if not upload("point_features", index.unique_records(city), city, total, source=files[city]):
+            success = False
+    return success
+
+def run_indicator_upload(cities: Iterable[str] = CITIES):
+    info("Uploading indicators...")
+    success = True
+    for city in cities:
+        if not upload_file("indicators", PROCESSED_DIR / f"insert_ready_indicators_{city}.json"):
+            success = False
+    return success
+
+def run_all_uploads():
+    info("Starting full Supabase upload flow...")
+    
+    # Execute in correct order with validation
+    if not run_district_upload():
+        error("District upload failed. Aborting remaining uploads.")
+        return False
+        
+    if not run_neighbourhood_upload():
+        error("Neighbourhood upload failed. Aborting remaining uploads.")
+        return False
+        
+    if not run_point_feature_upload():
+        error("Point feature upload failed. Aborting remaining uploads.")
+        return False
+        
+    if not run_indicator_upload():
+        error("Indicator upload failed.")
+        return False
+        
+    success("All uploads completed successfully.")
+    return True
+
+# ==================
+# CLI Support
+# ==================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Upload processed files to Supabase.")
+    parser.add_argument("--only", type=str, choices=["districts", "neighbourhoods", "points", "indicators", "all"], default="all")
+    parser.add_argument("--backend", type=str, choices=BACKENDS, default=BACKEND,
+                        help="rest: PostgREST upserts; copy: PostgreSQL COPY into a staging table + merge (needs SUPABASE_DB_URL)")
+
+    parser.add_argument("--incremental", action="store_true",
+                        help="Upload only records changed since the last upload from this machine, and delete removed ones")
+    parser.add_argument("--allow-mass-delete", action="store_true",
+                        help=f"With --incremental, allow deleting more than {MAX_DELETE_FRACTION:.0%} of a table/city")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip records already committed by an interrupted upload (upload ledger)")
+
+    profiling.add_arguments(parser)
+
+    args = parser.parse_args()
+    profiling.configure_from_args(args)
+    set_backend(args.backend)
+    set_incremental(args.incremental)
+    set_allow_mass_delete(args.allow_mass_delete)
+    set_resume(args.resume)
+    task = args.only
+
+    if task == "districts":
+        run_district_upload()
+    elif task == "neighbourhoods":
+        run_neighbourhood_upload()
+    elif task == "points":
+        run_point_feature_upload()
+    elif task == "indicators":
+        run_indicator_upload()
+    else:
+        run_all_uploads()
+
@@ -0,0 +1,169 @@
+"""
+diagnostics.py
+
+Aggregated counters for per-record problems in ETL stages.
+
+Instead of logging one warning per skipped record, a stage counts each problem
+under a short reason and prints one compact table when it ends:
+
+- Counts per reason, plus the first few sample records of each reason
+- The first occurrence of each reason is logged at debug level; the rest are only counted
+- Thread-safe, so parallel workers can share one collector
+- Optionally writes the summary as a JSON report
+
+Settings can be changed with environment variables or `configure()`:
+- AUQ_DIAGNOSTICS_DIR      – write every report as <dir>/<stage>.diagnostics.json
+- AUQ_DIAGNOSTICS_SAMPLES  – samples kept per reason (default: 5)
+
+Example:
+    from shared.common_lib.diagnostics import Diagnostics
+
+    diag = Diagnostics("point_features/bcn")
+    for record in records:
+        if not record.get("name"):
+            diag.count("missing name", sample=record)
+            continue
+        ...
+    diag.report()
+
+Author: Nicolas D'Alessandro
+Email: Nicodalessandro11@gmail.com
+"""
+
+import os
+import re
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from shared.common_lib.emoji_logger import info, warning, success, debug
+
+# ============================
+# Configuration & Constants
+# ============================
+
+DEFAULT_MAX_SAMPLES = 5
+SAMPLE_WIDTH = 60  # characters of a sample shown in the table
+
+_settings = {
+    "report_dir": Path(os.environ["AUQ_DIAGNOSTICS_DIR"]) if os.getenv("AUQ_DIAGNOSTICS_DIR") else None,
+    "max_samples": int(os.getenv("AUQ_DIAGNOSTICS_SAMPLES", DEFAULT_MAX_SAMPLES)),
+}
+
+
+def configure(report_dir: Optional[Path] = None, max_samples: Optional[int] = None) -> None:
+    """
+    Change the process-wide settings.
+
+    Args:
+        report_dir: Directory for the JSON reports of every stage
+        max_samples: Samples kept per reason
+    """
+    if report_dir is not None:
+        _settings["report_dir"] = Path(report_dir)
+    if max_samples is not None:
+        _settings["max_samples"] = max_samples
+
+# ===================
+# Collector
+# ===================
+
+class Diagnostics:
+    """
+    Problem counters of one stage.
+
+    Args:
+        stage: Stage name used in the table and the report file name (e.g. "point_features/bcn")
+        max_samples: Samples kept per reason (default: configured value)
+    """
+
+    def __init__(self, stage: str, max_samples: Optional[int] = None):
+        self.stage = stage
+        self.max_samples = _settings["max_samples"] if max_samples is None else max_samples
+        self.counts: Dict[str, int] = {}
+        self.samples: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def count(self, reason: str, sample: Any = None, n: int = 1) -> None:
+        """
+        Count `n` occurrences of a problem.
+
+        Args:
+            reason: Short description, e.g. "missing coordinates"
+            sample: Offending record (or any JSON-serialisable value) kept as an example
+            n: Number of occurrences (for problems counted in bulk)
+        """
+        with self._lock:
+            first = reason not in self.counts
+            self.counts[reason] = self.counts.get(reason, 0) + n
+            samples = self.samples.setdefault(reason, [])
+            if sample is not None and len(samples) < self.max_samples:
+                samples.append(sample)
+        if first:
+            debug(f"[{self.stage}] {reason} (first occurrence; further ones are counted)")
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def summary(self) -> Dict[str, Any]:
+        """Counts and samples per reason, most frequent first."""
+        with self._lock:
+            reasons = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+            return {
+                "stage": self.stage,
+                "total": sum(self.counts.values()),
+                "reasons": {reason: {"count": n, "samples": list(self.samples.get(reason, []))}
+                            for reason, n in reasons},
+            }
+
+    def table(self) -> List[str]:
+        """The summary as aligned text lines (reason, count, first sample)."""
+        summary = self.summary()
+        if not summary["reasons"]:
+            return []
+        width = max(len("reason"), *(len(reason) for reason in summary["reasons"]))
+        lines = [f"  {'reason':<{width}}  {'count':>7}  example"]
+        for reason, entry in summary["reasons"].items():
+            example = _shorten(entry["samples"][0]) if entry["samples"] else ""
+            lines.append(f"  {reason:<{width}}  {entry['count']:>7}  {example}")
+        return lines
+
+    def report(self, path: Optional[Path] = None) -> Dict[str, Any]:
+        """
+        Log the table and write the JSON report.
+
+        Args:
+            path: Report file (default: <report_dir>/<stage>.diagnostics.json when a
+                  report directory is configured, otherwise no file)
+
+        Returns:
+            Dict[str, Any]: The summary
+        """
+        summary = self.summary()
+        if summary["total"]:
+            warning(f"[{self.stage}] {summary['total']} problems in {len(summary['reasons'])} categories:")
+            for line in self.table():
+                warning(line)
+        else:
+            success(f"[{self.stage}] No problems recorded")
+
+        if path is None and _settings["report_dir"] is not None:
+            path = _settings["report_dir"] / f"{_slug(self.stage)}.diagnostics.json"
+        if path is not None:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("w", encoding="utf-8") as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+            info(f"[{self.stage}] Diagnostics report saved to: {path}")
+        return summary
+
+
+def _shorten(sample: Any) -> str:
+    text = sample if isinstance(sample, str) else json.dumps(sample, ensure_ascii=False, default=str)
+    return text if len(text) <= SAMPLE_WIDTH else text[:SAMPLE_WIDTH - 1] + "…"
+
+
+def _slug(stage: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", stage).strip("_")
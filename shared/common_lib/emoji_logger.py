@@ -17,40 +17,175 @@ Log levels supported:
 Each log line includes the file name and level for easier debugging:
 📊 [main.py - info] Starting ETL process
 
+Logging is cheap enough to call per record:
+- The caller's file name is read from its frame (`sys._getframe`) and cached
+  per code object, instead of building the whole stack with `inspect.stack()`
+- Messages below the configured level return before any lookup or formatting;
+  `%`-style arguments (`debug("Row %s skipped", row_id)`) are only formatted
+  when the message is emitted
+- Lines can be collected in a buffer and written in one call per batch
+
+Settings can be changed with environment variables or `configure()`:
+- AUQ_LOG_LEVEL   – lowest level written: debug (default), info, success, warning, error
+- AUQ_LOG_FORMAT  – "text" (default) or "json" (one JSON object per line)
+- AUQ_LOG_BUFFER  – lines kept before writing (default: 1, write immediately);
+                    warnings and errors always flush, and the buffer is flushed at exit
+
 Author: Nicolas D'Alessandro
 Email: Nicodalessandro11@gmail.com
 """
 
-import inspect
+import os
+import sys
+import json
+import atexit
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Dict, List, Optional, TextIO
+
+# ============================
+# Configuration & Constants
+# ============================
+
+LEVELS = {"debug": 10, "info": 20, "success": 25, "warning": 30, "error": 40}
+EMOJIS = {"debug": "🐞", "info": "📊", "success": "✅", "warning": "⚠️", "error": "❗"}
+FORMATS = ("text", "json")
+
+_settings = {
+    "level": LEVELS.get(os.getenv("AUQ_LOG_LEVEL", "debug").lower(), LEVELS["debug"]),
+    "format": os.getenv("AUQ_LOG_FORMAT", "text").lower(),
+    "buffer_lines": max(1, int(os.getenv("AUQ_LOG_BUFFER", "1"))),
+    "stream": None,  # None: sys.stdout at write time
+}
+
+# File name per code object of a calling function
+_caller_names: Dict[object, str] = {}
+
+# ===================
+# Buffered Writer
+# ===================
+
+class _Writer:
+    """Collects formatted lines and writes them to the stream in batches."""
+
+    def __init__(self):
+        self._lines: List[str] = []
+        self._lock = threading.Lock()
+
+    def write(self, line: str, flush: bool) -> None:
+        with self._lock:
+            self._lines.append(line)
+            if flush or len(self._lines) >= _settings["buffer_lines"]:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._lines:
+            return
+        stream: TextIO = _settings["stream"] or sys.stdout
+        stream.write("\n".join(self._lines) + "\n")
+        self._lines = []
+        if _settings["buffer_lines"] > 1:
+            stream.flush()
+
+
+_writer = _Writer()
+atexit.register(_writer.flush)
+
+
+def configure(
+    level: Optional[str] = None,
+    fmt: Optional[str] = None,
+    buffer_lines: Optional[int] = None,
+    stream: Optional[TextIO] = None
+) -> None:
+    """
+    Change the process-wide logging settings.
+
+    Args:
+        level: Lowest level written ("debug", "info", "success", "warning", "error")
+        fmt: "text" or "json"
+        buffer_lines: Lines kept before writing (1 writes every line immediately)
+        stream: Output stream (default: sys.stdout)
+    """
+    _writer.flush()
+    if level is not None:
+        if level not in LEVELS:
+            raise ValueError(f"Unknown log level '{level}'. Choose one of {tuple(LEVELS)}")
+        _settings["level"] = LEVELS[level]
+    if fmt is not None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown log format '{fmt}'. Choose one of {FORMATS}")
+        _settings["format"] = fmt
+    if buffer_lines is not None:
+        _settings["buffer_lines"] = max(1, buffer_lines)
+    if stream is not None:
+        _settings["stream"] = stream
+
+
+def flush() -> None:
+    """Write any buffered lines."""
+    _writer.flush()
+
+
+def is_enabled(level: str) -> bool:
+    """Whether messages of `level` are written (to skip building expensive messages)."""
+    return LEVELS[level] >= _settings["level"]
+
+# ===================
+# Core
+# ===================
+
+def _caller_name(depth: int) -> str:
+    """File name of the function `depth` frames above the caller of this helper."""
+    code = sys._getframe(depth + 1).f_code
+    name = _caller_names.get(code)
+    if name is None:
+        name = _caller_names[code] = Path(code.co_filename).name
+    return name
+
+
+def _log(level: str, message: str, args: tuple) -> None:
+    if LEVELS[level] < _settings["level"]:
+        return
+    if args:
+        message = message % args
+    caller = _caller_name(2)  # _log <- info() <- caller
+    if _settings["format"] == "json":
+        line = json.dumps({
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "level": level,
+            "source": caller,
+            "message": str(message),
+        }, ensure_ascii=False)
+    else:
+        line = f"{EMOJIS[level]} [{caller} - {level}] {message}"
+    _writer.write(line, flush=LEVELS[level] >= LEVELS["warning"])
 
-def _get_caller():
-    """Helper to retrieve the filename of the caller."""
-    frame = inspect.stack()[2]
-    filepath = frame.filename
-    return Path(filepath).name
+# ===================
+# Public API
+# ===================
 
-def info(message: str):
+def info(message: str, *args):
     """Prints an informational message prefixed with 📊."""
-    caller = _get_caller()
-    print(f"📊 [{caller} - info] {message}")
+    _log("info", message, args)
 
-def success(message: str):
+def success(message: str, *args):
     """Prints a success message prefixed with ✅."""
-    caller = _get_caller()
-    print(f"✅ [{caller} - success] {message}")
+    _log("success", message, args)
 
-def warning(message: str):
+def warning(message: str, *args):
     """Prints a warning message prefixed with ⚠️."""
-    caller = _get_caller()
-    print(f"⚠️ [{caller} - warning] {message}")
+    _log("warning", message, args)
 
-def error(message: str):
+def error(message: str, *args):
     """Prints an error message prefixed with ❗."""
-    caller = _get_caller()
-    print(f"❗ [{caller} - error] {message}")
+    _log("error", message, args)
 
-def debug(message: str):
+def debug(message: str, *args):
     """Prints a debug message prefixed with 🐞."""
-    caller = _get_caller()
-    print(f"🐞 [{caller} - debug] {message}")
+    _log("debug", message, args)
@@ -0,0 +1,286 @@
+"""
+http_client.py
+
+A shared, pooled HTTP transport for ETL loaders and API clients.
+
+Every loader downloads from the same few hosts (the Supabase storage domain,
+the Barcelona CKAN API and the Madrid open data portal). Instead of opening a
+new TLS connection per `requests.get`, all requests go through one process-wide
+session that provides:
+
+- Keep-alive connection pooling per host
+- gzip/deflate negotiation, plus brotli when the `brotli` package is installed
+- Default (connect, read) timeouts
+- A single retry/backoff policy for connection errors and 429/5xx responses
+- Optional HTTP/2 through `httpx` (enable with AUQ_HTTP2=1 or `configure(http2=True)`)
+- Request and byte counts for the stage metrics (see instrumentation.py)
+
+Responses are always `requests.Response` objects, and errors are always
+`requests.exceptions.RequestException` subclasses, whichever transport is used.
+
+Example:
+    from shared.common_lib import http_client
+
+    response = http_client.get(url)
+    response.raise_for_status()
+
+Author: Nicolas D'Alessandro
+Email: Nicodalessandro11@gmail.com
+"""
+
+import os
+import time
+import threading
+import importlib.util
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+from shared.common_lib import instrumentation
+
+# ============================
+# Configuration & Constants
+# ============================
+
+DEFAULT_TIMEOUT = (10, 60)  # (connect, read) in seconds
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5  # 0.5s, 1s, 2s, ...
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+RETRY_METHODS = frozenset({"GET", "HEAD"})
+
+POOL_CONNECTIONS = 8   # Number of per-host pools kept alive
+POOL_MAXSIZE = 16      # Keep-alive connections per host
+
+BROTLI_AVAILABLE = any(
+    importlib.util.find_spec(module) is not None for module in ("brotli", "brotlicffi")
+)
+ACCEPT_ENCODING = "gzip, deflate, br" if BROTLI_AVAILABLE else "gzip, deflate"
+
+_settings = {
+    "http2": os.getenv("AUQ_HTTP2", "0") == "1",
+    "timeout": DEFAULT_TIMEOUT,
+    "retries": DEFAULT_RETRIES,
+    "backoff_factor": DEFAULT_BACKOFF_FACTOR,
+}
+_session = None
+_http2_client = None
+_lock = threading.Lock()
+
+# ===================
+# Session Factory
+# ===================
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout when the caller does not pass one."""
+
+    def __init__(self, *args, timeout=DEFAULT_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def build_retry(retries: int = DEFAULT_RETRIES, backoff_factor: float = DEFAULT_BACKOFF_FACTOR) -> Retry:
+    """Build the retry/backoff policy shared by every request."""
+    return Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=RETRY_METHODS,
+        raise_on_status=False,
+    )
+
+
+def build_session(
+    timeout=DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    backoff_factor: float = DEFAULT_BACKOFF_FACTOR
+) -> requests.Session:
+    """
+    Build a `requests.Session` with pooling, compression, timeouts and retries.
+
+    Args:
+        timeout: Default timeout, either seconds or a (connect, read) tuple
+        retries: Maximum number of retries per request
+        backoff_factor: Exponential backoff factor between retries
+
+    Returns:
+        requests.Session: A configured session
+    """
+    session = requests.Session()
+    adapter = TimeoutHTTPAdapter(
+        timeout=timeout,
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=build_retry(retries, backoff_factor),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = build_session(
+                    _settings["timeout"], _settings["retries"], _settings["backoff_factor"]
+                )
+    return _session
+
+
+def configure(http2: bool = None, timeout=None, retries: int = None, backoff_factor: float = None) -> None:
+    """
+    Change the transport settings. Open connections are closed and rebuilt lazily.
+
+    Args:
+        http2: Use HTTP/2 through httpx
+        timeout: Default timeout, either seconds or a (connect, read) tuple
+        retries: Maximum number of retries per request
+        backoff_factor: Exponential backoff factor between retries
+    """
+    global _session, _http2_client
+    with _lock:
+        for key, value in (("http2", http2), ("timeout", timeout),
+                           ("retries", retries), ("backoff_factor", backoff_factor)):
+            if value is not None:
+                _settings[key] = value
+        if _session is not None:
+            _session.close()
+        if _http2_client is not None:
+            _http2_client.close()
+        _session = None
+        _http2_client = None
+
+# ===================
+# HTTP/2 Transport
+# ===================
+
+def _get_http2_client():
+    """Return the shared httpx client, or None when HTTP/2 support is not installed."""
+    global _http2_client
+    if _http2_client is None:
+        with _lock:
+            if _http2_client is None:
+                try:
+                    import httpx
+                    import h2  # noqa: F401  (required by httpx for HTTP/2)
+                except ImportError:
+                    _settings["http2"] = False
+                    return None
+                connect, read = _split_timeout(_settings["timeout"])
+                _http2_client = httpx.Client(
+                    http2=True,
+                    timeout=httpx.Timeout(read, connect=connect),
+                    limits=httpx.Limits(
+                        max_connections=POOL_CONNECTIONS * POOL_MAXSIZE,
+                        max_keepalive_connections=POOL_MAXSIZE,
+                    ),
+                    headers={"Accept-Encoding": ACCEPT_ENCODING},
+                    follow_redirects=True,
+                )
+    return _http2_client
+
+
+def _split_timeout(timeout):
+    if isinstance(timeout, tuple):
+        return timeout
+    return timeout, timeout
+
+
+def _to_requests_response(response) -> requests.Response:
+    """Wrap a fully read httpx response in a `requests.Response`."""
+    wrapped = requests.Response()
+    wrapped.status_code = response.status_code
+    wrapped.headers = CaseInsensitiveDict(response.headers)
+    wrapped.url = str(response.url)
+    wrapped.reason = response.reason_phrase
+    wrapped.encoding = response.encoding
+    wrapped._content = response.content
+    wrapped._content_consumed = True
+    return wrapped
+
+
+def _http2_request(client, method: str, url: str, **kwargs) -> requests.Response:
+    """Send a request over HTTP/2 using the same retry policy as the HTTP/1.1 session."""
+    import httpx
+
+    kwargs.pop("stream", None)  # httpx responses are read fully before wrapping
+    timeout = kwargs.pop("timeout", None)
+    if timeout is not None:
+        connect, read = _split_timeout(timeout)
+        kwargs["timeout"] = httpx.Timeout(read, connect=connect)
+
+    retries = _settings["retries"]
+    for attempt in range(retries + 1):
+        try:
+            response = client.request(method, url, **kwargs)
+            if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                return _to_requests_response(response)
+        except httpx.TimeoutException as e:
+            if attempt == retries:
+                raise requests.exceptions.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            if attempt == retries:
+                raise requests.exceptions.ConnectionError(str(e)) from e
+        except httpx.HTTPError as e:
+            raise requests.exceptions.RequestException(str(e)) from e
+        time.sleep(_settings["backoff_factor"] * (2 ** attempt))
+
+# ===================
+# Public API
+# ===================
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Send a request through the shared transport.
+
+    Args:
+        method: HTTP method
+        url: Target URL
+        **kwargs: Any keyword accepted by `requests.Session.request`
+
+    Returns:
+        requests.Response: The response (status errors are not raised)
+    """
+    response = None
+    if _settings["http2"]:
+        client = _get_http2_client()
+        if client is not None:
+            response = _http2_request(client, method, url, **kwargs)
+    if response is None:
+        response = get_session().request(method, url, **kwargs)
+    _count(response)
+    return response
+
+
+def _count(response: requests.Response) -> None:
+    """Count the request, and its body bytes as they are read (streamed) or at once."""
+    instrumentation.count("http_requests")
+    if response._content_consumed:
+        instrumentation.count("http_bytes_in", len(response.content or b""))
+        return
+
+    read = response.raw.read
+
+    def counting_read(*args, **kwargs):
+        data = read(*args, **kwargs)
+        instrumentation.count("http_bytes_in", len(data))
+        return data
+    response.raw.read = counting_read
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """Send a GET request through the shared transport."""
+    return request("GET", url, **kwargs)
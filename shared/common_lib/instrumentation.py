@@ -0,0 +1,370 @@
+"""
+instrumentation.py
+
+Per-stage timing, throughput and memory metrics for ETL runs.
+
+Every loader `run()` and every upload is wrapped in a stage, which records:
+
+- Wall time and process CPU time
+- Counters: records in and out, HTTP requests, body bytes received (after
+  decompression) and request bytes sent by the uploader
+- Peak traced Python memory (`tracemalloc`, opt-in) and the process peak RSS
+- Whether the stage succeeded, and whether other stages ran at the same time
+
+Counters are added with `count()` from code running inside a stage; they go to
+every open stage of the current context (so nested stages include their children)
+and to the run totals. Worker threads started inside a stage only count towards
+it when their task is wrapped with `bind()`. CPU time and memory are process-wide:
+for stages that overlapped (`--parallel`, `--pipelined`) they include the other stages.
+
+With profiling on (see profiling.py), every stage is also profiled.
+
+At exit, the run report is written as JSON and/or as a Prometheus textfile
+(for the node_exporter textfile collector) when configured.
+
+Settings can be changed with environment variables or `configure()`:
+- AUQ_METRICS_REPORT   – JSON run report path
+- AUQ_METRICS_PROM     – Prometheus textfile path
+- AUQ_TRACE_MEMORY=1   – trace Python allocations to report peak memory per stage
+                         (slows allocation-heavy code down; off by default)
+
+Example:
+    from shared.common_lib import instrumentation
+
+    @instrumentation.instrument("bcn:districts:etl")
+    def run(...):
+        instrumentation.count("records_in", len(raw_data))
+        ...
+
+    with instrumentation.stage("bcn:districts:upload"):
+        ...
+
+Author: Nicolas D'Alessandro
+Email: Nicodalessandro11@gmail.com
+"""
+
+import os
+import json
+import time
+import atexit
+import functools
+import threading
+import contextvars
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from shared.common_lib.emoji_logger import info, success, warning
+from shared.common_lib import profiling
+
+# ============================
+# Configuration & Constants
+# ============================
+
+COUNTERS = ("records_in", "records_out", "http_requests", "http_bytes_in", "http_bytes_out")
+PROMETHEUS_PREFIX = "auq_etl"
+
+_settings = {
+    "report_path": Path(os.environ["AUQ_METRICS_REPORT"]) if os.getenv("AUQ_METRICS_REPORT") else None,
+    "prometheus_path": Path(os.environ["AUQ_METRICS_PROM"]) if os.getenv("AUQ_METRICS_PROM") else None,
+    "trace_memory": os.getenv("AUQ_TRACE_MEMORY", "0") == "1",
+}
+
+# Stages open in the current context, innermost last
+_open_stages: contextvars.ContextVar = contextvars.ContextVar("auq_open_stages", default=())
+
+_lock = threading.Lock()
+_stages: List["Stage"] = []
+_running: List["Stage"] = []  # stages currently running, in any thread
+_totals: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+_started = datetime.now(timezone.utc)
+
+
+def configure(
+    report_path: Optional[Path] = None,
+    prometheus_path: Optional[Path] = None,
+    trace_memory: Optional[bool] = None
+) -> None:
+    """
+    Change the process-wide settings.
+
+    Args:
+        report_path: JSON run report written at exit
+        prometheus_path: Prometheus textfile written at exit
+        trace_memory: Trace Python allocations to report the peak memory of each stage
+    """
+    if report_path is not None:
+        _settings["report_path"] = Path(report_path)
+    if prometheus_path is not None:
+        _settings["prometheus_path"] = Path(prometheus_path)
+    if trace_memory is not None:
+        _settings["trace_memory"] = trace_memory
+
+# ===================
+# Stage Metrics
+# ===================
+
+class Stage:
+    """
+    Metrics of one stage run.
+
+    Args:
+        name: Stage name, e.g. "bcn:districts:etl" or "bcn:districts:upload"
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = datetime.now(timezone.utc)
+        self.counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.memory_peak_bytes: Optional[int] = None
+        self.max_rss_bytes: Optional[int] = None
+        self.ok = True
+        self.overlapped = False
+        self._lock = threading.Lock()
+
+    def add(self, name: str, n: int) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def rate(self) -> Optional[float]:
+        """Records out per second of wall time."""
+        if not self.wall_seconds:
+            return None
+        return self.counters["records_out"] / self.wall_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "started": self.started.isoformat(timespec="seconds"),
+            "ok": self.ok,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "cpu_seconds": round(self.cpu_seconds, 4),
+            "records_per_second": None if self.rate() is None else round(self.rate(), 1),
+            "counters": dict(self.counters),
+            "memory_peak_bytes": self.memory_peak_bytes,
+            "max_rss_bytes": self.max_rss_bytes,
+            "overlapped": self.overlapped,
+        }
+
+
+def _max_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # kB on Linux
+
+
+def _enter(record: Stage) -> Optional[int]:
+    """Register a starting stage; returns the traced memory at its start."""
+    with _lock:
+        if _running:
+            record.overlapped = True
+            for other in _running:
+                other.overlapped = True
+        _running.append(record)
+        _stages.append(record)
+        if not _settings["trace_memory"]:
+            return None
+        profiling.acquire_tracemalloc()
+        if len(_running) == 1:
+            tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+
+def _exit(record: Stage, traced_at_start: Optional[int]) -> None:
+    with _lock:
+        _running.remove(record)
+        if traced_at_start is not None:
+            record.memory_peak_bytes = max(0, tracemalloc.get_traced_memory()[1] - traced_at_start)
+            profiling.release_tracemalloc()
+        record.max_rss_bytes = _max_rss_bytes()
+
+# ===================
+# Public API
+# ===================
+
+@contextmanager
+def stage(name: str) -> Iterator[Stage]:
+    """
+    Measure the enclosed block as one stage.
+
+    The stage is marked failed when the block raises, or when the caller sets `ok`
+    to False (e.g. for functions that report failure by returning False).
+
+    Args:
+        name: Stage name
+
+    Yields:
+        Stage: The stage's metrics
+    """
+    record = Stage(name)
+    traced_at_start = _enter(record)
+    token = _open_stages.set(_open_stages.get() + (record,))
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        with profiling.profile(name):
+            yield record
+    except BaseException:
+        record.ok = False
+        raise
+    finally:
+        record.wall_seconds = time.perf_counter() - wall
+        record.cpu_seconds = time.process_time() - cpu
+        _open_stages.reset(token)
+        _exit(record, traced_at_start)
+
+
+def instrument(name: str) -> Callable:
+    """
+    Decorator running a function as a stage. A False return marks the stage failed.
+
+    Args:
+        name: Stage name
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                result = func(*args, **kwargs)
+                if result is False:
+                    record.ok = False
+                return result
+        return wrapper
+    return decorator
+
+
+def count(name: str, n: int = 1) -> None:
+    """
+    Add `n` to a counter of the open stages and of the run totals.
+
+    Args:
+        name: Counter name (see COUNTERS; other names are kept as well)
+        n: Amount to add
+    """
+    for record in _open_stages.get():
+        record.add(name, n)
+    with _lock:
+        _totals[name] = _totals.get(name, 0) + n
+
+
+def bind(func: Callable) -> Callable:
+    """
+    Bind a worker thread's task to the stages open where `bind` is called,
+    so that what the task counts is attributed to them.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def bound(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return bound
+
+# ===================
+# Run Report
+# ===================
+
+def report() -> Dict[str, Any]:
+    """The run report: every stage so far, plus run totals."""
+    with _lock:
+        stages = [s.to_dict() for s in _stages]
+        totals = dict(_totals)
+    return {
+        "started": _started.isoformat(timespec="seconds"),
+        "wall_seconds": round((datetime.now(timezone.utc) - _started).total_seconds(), 4),
+        "max_rss_bytes": _max_rss_bytes(),
+        "totals": totals,
+        "stages": stages,
+    }
+
+
+def log_summary() -> None:
+    """Log one line per stage: wall and CPU time, records, throughput and download size."""
+    for s in report()["stages"]:
+        counters = s["counters"]
+        rate = f", {s['records_per_second']:.0f} records/s" if s["records_per_second"] else ""
+        memory = f", peak {s['memory_peak_bytes'] / 1e6:.1f} MB" if s["memory_peak_bytes"] is not None else ""
+        line = (f"{s['name']}: {s['wall_seconds']:.2f}s wall, {s['cpu_seconds']:.2f}s CPU, "
+                f"{counters['records_in']} in / {counters['records_out']} out{rate}, "
+                f"{counters['http_requests']} requests, {counters['http_bytes_in'] / 1e6:.1f} MB down{memory}")
+        (info if s["ok"] else warning)(line)
+
+
+def prometheus(run_report: Optional[Dict[str, Any]] = None) -> str:
+    """Render a run report in the Prometheus text exposition format."""
+    run_report = run_report or report()
+    metrics = {
+        "stage_wall_seconds": ("gauge", "Wall time of the stage", lambda s: s["wall_seconds"]),
+        "stage_cpu_seconds": ("gauge", "Process CPU time during the stage", lambda s: s["cpu_seconds"]),
+        "stage_success": ("gauge", "1 if the stage succeeded", lambda s: int(s["ok"])),
+        "stage_memory_peak_bytes": ("gauge", "Peak traced Python memory during the stage",
+                                    lambda s: s["memory_peak_bytes"]),
+    }
+    lines = []
+    for metric, (kind, description, value) in metrics.items():
+        lines += [f"# HELP {PROMETHEUS_PREFIX}_{metric} {description}", f"# TYPE {PROMETHEUS_PREFIX}_{metric} {kind}"]
+        for s in run_report["stages"]:
+            if value(s) is not None:
+                lines.append(f'{PROMETHEUS_PREFIX}_{metric}{{stage="{s["name"]}"}} {value(s)}')
+
+    names = sorted({name for s in run_report["stages"] for name in s["counters"]})
+    for name in names:
+        metric = f"{PROMETHEUS_PREFIX}_stage_{name}_total"
+        lines += [f"# HELP {metric} {name.replace('_', ' ').capitalize()} during the stage", f"# TYPE {metric} counter"]
+        for s in run_report["stages"]:
+            lines.append(f'{metric}{{stage="{s["name"]}"}} {s["counters"].get(name, 0)}')
+
+    lines += [f"# HELP {PROMETHEUS_PREFIX}_run_wall_seconds Wall time of the run",
+              f"# TYPE {PROMETHEUS_PREFIX}_run_wall_seconds gauge",
+              f"{PROMETHEUS_PREFIX}_run_wall_seconds {run_report['wall_seconds']}"]
+    if run_report["max_rss_bytes"] is not None:
+        lines += [f"# HELP {PROMETHEUS_PREFIX}_run_max_rss_bytes Peak resident set size of the run",
+                  f"# TYPE {PROMETHEUS_PREFIX}_run_max_rss_bytes gauge",
+                  f"{PROMETHEUS_PREFIX}_run_max_rss_bytes {run_report['max_rss_bytes']}"]
+    return "\n".join(lines) + "\n"
+
+
+def write_report(report_path: Optional[Path] = None, prometheus_path: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Write the run report as JSON and/or as a Prometheus textfile.
+
+    Args:
+        report_path: JSON file (default: configured path)
+        prometheus_path: Prometheus textfile (default: configured path)
+
+    Returns:
+        Dict[str, Any]: The run report
+    """
+    run_report = report()
+    report_path = report_path or _settings["report_path"]
+    prometheus_path = prometheus_path or _settings["prometheus_path"]
+    if report_path is not None:
+        _write_atomic(Path(report_path), json.dumps(run_report, indent=2))
+        success(f"Run metrics saved to: {report_path}")
+    if prometheus_path is not None:
+        # Written via rename so the textfile collector never reads a partial file
+        _write_atomic(Path(prometheus_path), prometheus(run_report))
+        info(f"Prometheus metrics saved to: {prometheus_path}")
+    return run_report
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _write_configured_report() -> None:
+    if _stages and (_settings["report_path"] or _settings["prometheus_path"]):
+        write_report()
+
+
+atexit.register(_write_configured_report)
@@ -0,0 +1,174 @@
+"""
+json_stream.py
+
+An incremental reader for large JSON documents built around one big array,
+such as the `@graph` list of a JSON-LD catalogue or a JSON array of records.
+
+Instead of loading the whole document with `json.load`, the array items are
+decoded one at a time from a binary stream (HTTP body, cached file, open file)
+with `json.JSONDecoder.raw_decode`, so memory use depends on the size of one
+item (or one batch) rather than on the size of the file.
+
+- UTF-8 is decoded incrementally, so multi-byte characters split across chunks are handled
+- Only the requested top-level key is streamed; other top-level values are skipped
+- No dependencies beyond the standard library
+
+Example:
+    from shared.common_lib import json_stream
+
+    with open("catalogue.json", "rb") as f:
+        for batch in json_stream.iter_batches(json_stream.iter_array_items(f, "@graph"), 500):
+            ...
+
+Author: Nicolas D'Alessandro
+Email: Nicodalessandro11@gmail.com
+"""
+
+import json
+import codecs
+from itertools import islice
+from typing import Any, BinaryIO, Iterable, Iterator, List, Optional
+
+# ============================
+# Configuration & Constants
+# ============================
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+
+_decoder = json.JSONDecoder()
+
+# ===================
+# Buffered Text Reader
+# ===================
+
+class _TextBuffer:
+    """Decoded text window over a binary stream, refilled on demand."""
+
+    def __init__(self, stream: BinaryIO, chunk_size: int = CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+        self._first = True
+
+    def fill(self, size: Optional[int] = None) -> bool:
+        """Read and decode more data. Returns False at end of stream."""
+        if self.eof:
+            return False
+        chunk = self.stream.read(size or self.chunk_size)
+        if self._first and chunk:
+            chunk = chunk[len(codecs.BOM_UTF8):] if chunk.startswith(codecs.BOM_UTF8) else chunk
+            self._first = False
+        if not chunk:
+            self.eof = True
+            self.text = self.text[self.pos:] + self.decoder.decode(b"", final=True)
+        else:
+            # Drop the consumed prefix so the window stays small
+            self.text = self.text[self.pos:] + self.decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it ('' at end)."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise json.JSONDecodeError(f"Expected {char!r}, found {found or 'end of input'!r}", self.text, self.pos)
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value, reading more data as needed."""
+        self.peek()
+        read_size = self.chunk_size
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+                # A number that ends exactly at the buffer edge may be truncated
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow the read size so very large values are not re-parsed once per chunk
+            self.fill(read_size)
+            read_size *= 2
+
+# ===================
+# Public API
+# ===================
+
+def iter_array_items(stream: BinaryIO, key: Optional[str] = "@graph", chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield the items of a JSON array one at a time.
+
+    Args:
+        stream: Binary stream over a UTF-8 JSON document
+        key: Top-level key holding the array (e.g. "@graph"); None when the
+             document itself is an array
+        chunk_size: Number of bytes read from the stream at a time
+
+    Yields:
+        Any: Decoded array items, in document order
+
+    Raises:
+        json.JSONDecodeError: If the document is malformed
+        KeyError: If `key` is not a top-level key of the document
+    """
+    buffer = _TextBuffer(stream, chunk_size)
+
+    if key is not None:
+        buffer.expect("{")
+        while True:
+            if buffer.peek() == "}":
+                raise KeyError(key)
+            name = buffer.value()
+            buffer.expect(":")
+            if name == key:
+                break
+            buffer.value()  # skip the value of another top-level key
+            if buffer.peek() == ",":
+                buffer.pos += 1
+
+    buffer.expect("[")
+    if buffer.peek() == "]":
+        return
+    while True:
+        yield buffer.value()
+        separator = buffer.peek()
+        buffer.pos += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise json.JSONDecodeError(f"Expected ',' or ']', found {separator or 'end of input'!r}",
+                                       buffer.text, buffer.pos - 1)
+
+
+def iter_batches(items: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    """
+    Group an iterable into lists of at most `batch_size` items.
+
+    Args:
+        items: Any iterable (e.g. `iter_array_items(...)`)
+        batch_size: Maximum number of items per batch
+
+    Yields:
+        List[Any]: Consecutive batches
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
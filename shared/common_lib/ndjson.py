@@ -0,0 +1,254 @@
+"""
+ndjson.py
+
+Streaming writer and reader for record files (insert_ready_*.json artefacts).
+
+Records are written as newline-delimited JSON (one compact JSON object per line)
+as soon as they are produced, and read back one at a time, so memory stays flat
+whatever the size of the dataset:
+
+- `Writer` appends records line by line and flushes after every batch; while it
+  is open a `<file>.writing` marker exists, so a reader can follow a file that is
+  still being written and know when it is complete
+- `iter_records` sniffs the format: NDJSON is read line by line, and files holding
+  one JSON array (the earlier artefact format) are streamed with json_stream
+- `count_records` counts NDJSON lines without decoding them
+- `Writer.mark_incomplete` records that some inputs failed; a `<file>.incomplete`
+  marker lists them, so consumers can tell a partial file from a complete one
+
+Example:
+    from shared.common_lib import ndjson
+
+    with ndjson.Writer(output_path) as writer:
+        for batch in batches:
+            writer.write_many(batch)
+
+    for record in ndjson.iter_records(output_path):
+        ...
+
+Author: Nicolas D'Alessandro
+Email: Nicodalessandro11@gmail.com
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Union
+
+from shared.common_lib import json_stream
+
+# ============================
+# Configuration & Constants
+# ============================
+
+CHUNK_SIZE = 64 * 1024
+FOLLOW_POLL_SECONDS = 0.05
+WRITING_SUFFIX = ".writing"
+INCOMPLETE_SUFFIX = ".incomplete"
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+# ===================
+# Writer
+# ===================
+
+class Writer:
+    """
+    Writes records to an NDJSON file as they are produced.
+
+    Usable as a context manager, and callable with a batch so it can be passed
+    as a loader's `sink`.
+
+    Args:
+        path: Output file (replaced)
+        lazy: Only create (and replace) the file when the first record is written,
+              so a run that produces nothing keeps the previous file
+    """
+
+    def __init__(self, path: Union[str, Path], lazy: bool = False):
+        self.path = Path(path)
+        self.count = 0
+        self.failures: List[str] = []
+        self._marker = writing_marker(self.path)
+        self._file = None
+        if not lazy:
+            self._open()
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._marker.touch()
+        incomplete_marker(self.path).unlink(missing_ok=True)
+        self._file = self.path.open("w", encoding="utf-8", newline="\n")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self._file is None:
+            self._open()
+        self._file.write(_encode(record) + "\n")
+        self.count += 1
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Write a batch of records and flush them, so readers see whole batches."""
+        lines = [_encode(record) for record in records]
+        if lines:
+            if self._file is None:
+                self._open()
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+            self.count += len(lines)
+
+    __call__ = write_many
+
+    def mark_incomplete(self, reason: str) -> None:
+        """Record an input that could not be processed (written to the .incomplete marker on close)."""
+        self.failures.append(reason)
+
+    def close(self) -> None:
+        if self._file is None or self._file.closed:
+            return
+        self._file.close()
+        if self.failures:
+            incomplete_marker(self.path).write_text("\n".join(self.failures) + "\n", encoding="utf-8")
+        self._marker.unlink(missing_ok=True)
+
+    def __enter__(self) -> "Writer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def writing_marker(path: Path) -> Path:
+    """Marker file that exists while `path` is being written."""
+    return path.with_name(path.name + WRITING_SUFFIX)
+
+
+def incomplete_marker(path: Path) -> Path:
+    """Marker file listing the inputs that failed while `path` was written."""
+    return path.with_name(path.name + INCOMPLETE_SUFFIX)
+
+
+def incomplete_reasons(path: Union[str, Path]) -> List[str]:
+    """Inputs that failed while the file was written (empty when it is complete)."""
+    marker = incomplete_marker(Path(path))
+    if not marker.exists():
+        return []
+    return [line for line in marker.read_text(encoding="utf-8").splitlines() if line]
+
+
+def write_records(path: Union[str, Path], records: Iterable[Dict[str, Any]], incomplete: Iterable[str] = ()) -> int:
+    """
+    Write all records to an NDJSON file.
+
+    Args:
+        path: Output file (replaced)
+        records: Any iterable of records, consumed lazily
+        incomplete: Inputs that failed (see Writer.mark_incomplete)
+
+    Returns:
+        int: Number of records written
+    """
+    with Writer(path) as writer:
+        for reason in incomplete:
+            writer.mark_incomplete(reason)
+        for batch in json_stream.iter_batches(records, 1000):
+            writer.write_many(batch)
+    return writer.count
+
+# ===================
+# Reader
+# ===================
+
+def _first_byte(f: BinaryIO) -> bytes:
+    """Peek the first non-whitespace byte of a seekable stream ('' if empty)."""
+    start = f.tell()
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            f.seek(start)
+            return b""
+        stripped = chunk.lstrip(b" \t\r\n\xef\xbb\xbf")
+        if stripped:
+            f.seek(start)
+            return stripped[:1]
+
+
+def _iter_lines(f: BinaryIO, follow_marker: Optional[Path]) -> Iterator[Dict[str, Any]]:
+    pending = b""
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            if follow_marker is not None:
+                if follow_marker.exists():
+                    time.sleep(FOLLOW_POLL_SECONDS)
+                else:
+                    follow_marker = None  # writer done: one more read picks up its last batch
+                continue
+            if pending.strip():
+                yield json.loads(pending)
+            return
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_records(path: Union[str, Path], follow: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the records of an NDJSON file, or of a file holding one JSON array.
+
+    Args:
+        path: Record file
+        follow: Keep reading while the file is still being written (see Writer)
+
+    Yields:
+        Dict[str, Any]: Records in file order
+
+    Raises:
+        json.JSONDecodeError: If a line (or the array) is malformed
+    """
+    path = Path(path)
+    marker = writing_marker(path) if follow else None
+    if marker is not None:
+        while marker.exists() and not path.exists():
+            time.sleep(FOLLOW_POLL_SECONDS)
+
+    with path.open("rb") as f:
+        first = _first_byte(f)
+        while not first and marker is not None and marker.exists():
+            time.sleep(FOLLOW_POLL_SECONDS)
+            first = _first_byte(f)
+        if not first and marker is not None:
+            first = _first_byte(f)  # written just before the marker was removed
+        if first == b"[":
+            yield from json_stream.iter_array_items(f, key=None)
+        elif first:
+            yield from _iter_lines(f, marker)
+
+
+def read_records(path: Union[str, Path]) -> List[Dict[str, Any]]:
+    """Return all records of a record file as a list (for small files and tests)."""
+    return list(iter_records(path))
+
+
+def count_records(path: Union[str, Path]) -> int:
+    """
+    Count the records of a record file without decoding NDJSON lines.
+
+    Args:
+        path: Record file
+
+    Returns:
+        int: Number of records
+    """
+    with Path(path).open("rb") as f:
+        first = _first_byte(f)
+        if first == b"[":
+            return sum(1 for _ in json_stream.iter_array_items(f, key=None))
+        if not first:
+            return 0
+        count, last = 0, b"\n"
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            count += chunk.count(b"\n")
+            last = chunk[-1:]
+        return count + (last != b"\n")
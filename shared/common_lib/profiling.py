@@ -0,0 +1,238 @@
+"""
+profiling.py
+
+Optional per-stage profiling for ETL runs.
+
+When a profile directory is set, every stage (see instrumentation.py) writes:
+
+- <stage>.pstats     – cProfile statistics (`python -m pstats`, snakeviz, ...)
+- <stage>.collapsed  – sampled call stacks of the stage's thread in the collapsed
+                       format read by flamegraph.pl, speedscope and inferno
+- <stage>.memory.txt – with memory profiling on, the lines whose allocations grew
+                       the most between the start and the end of the stage
+
+Profiling is off by default and costs one dictionary lookup per stage when off.
+Only the outermost stage of a thread is profiled; worker threads and processes
+started by a stage are not. Python 3.12+ allows one cProfile at a time, so when
+stages overlap (`--parallel`) only the first one gets a .pstats file.
+
+Settings can be changed with environment variables, `configure()` or the
+`--profile DIR` / `--profile-memory` options of the ETL scripts:
+- AUQ_PROFILE_DIR        – directory for the profile files (profiling is on when set)
+- AUQ_PROFILE_INTERVAL   – stack sampling interval in seconds (default: 0.005)
+- AUQ_PROFILE_MEMORY=1   – also write the tracemalloc snapshot diff
+
+Example:
+    from shared.common_lib import profiling
+
+    with profiling.profile("bcn:point_features:etl"):
+        ...
+
+Author: Nicolas D'Alessandro
+Email: Nicodalessandro11@gmail.com
+"""
+
+import os
+import re
+import sys
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import ContextManager, Optional
+
+from shared.common_lib.emoji_logger import info, warning
+
+# ============================
+# Configuration & Constants
+# ============================
+
+DEFAULT_INTERVAL = 0.005  # seconds between stack samples
+MEMORY_TOP_LINES = 30     # lines listed in the memory diff
+TRACEMALLOC_FRAMES = 10   # frames kept per traced allocation
+
+_settings = {
+    "profile_dir": Path(os.environ["AUQ_PROFILE_DIR"]) if os.getenv("AUQ_PROFILE_DIR") else None,
+    "interval": float(os.getenv("AUQ_PROFILE_INTERVAL", DEFAULT_INTERVAL)),
+    "memory": os.getenv("AUQ_PROFILE_MEMORY", "0") == "1",
+}
+
+_local = threading.local()    # .active: a stage of this thread is being profiled
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0        # holders of tracemalloc started through acquire_tracemalloc()
+
+
+def configure(profile_dir: Optional[Path] = None, interval: Optional[float] = None,
+              memory: Optional[bool] = None) -> None:
+    """
+    Change the process-wide settings.
+
+    Args:
+        profile_dir: Directory for the profile files; profiling is on when set
+        interval: Stack sampling interval in seconds
+        memory: Also write a tracemalloc snapshot diff per stage
+    """
+    if profile_dir is not None:
+        _settings["profile_dir"] = Path(profile_dir)
+    if interval is not None:
+        _settings["interval"] = interval
+    if memory is not None:
+        _settings["memory"] = memory
+
+
+def add_arguments(parser) -> None:
+    """Add --profile DIR and --profile-memory to an ETL script's argument parser."""
+    parser.add_argument("--profile", type=Path, default=None, metavar="DIR",
+                        help="Profile each stage: cProfile .pstats and collapsed stacks (flame graphs) in DIR")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="With --profile, also write each stage's tracemalloc snapshot diff")
+
+
+def configure_from_args(args) -> None:
+    """Apply the options added by `add_arguments`."""
+    configure(profile_dir=args.profile, memory=args.profile_memory or None)
+
+
+def enabled() -> bool:
+    return _settings["profile_dir"] is not None
+
+# ===================
+# tracemalloc Sharing
+# ===================
+
+def acquire_tracemalloc() -> None:
+    """Start tracemalloc unless it is running; every call needs a `release_tracemalloc()`."""
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            _tracemalloc_users = 1
+        elif _tracemalloc_users:
+            _tracemalloc_users += 1
+
+
+def release_tracemalloc() -> None:
+    """Stop tracemalloc when the last holder releases it (never if someone else started it)."""
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users:
+            _tracemalloc_users -= 1
+            if _tracemalloc_users == 0:
+                tracemalloc.stop()
+
+# ===================
+# Stack Sampler
+# ===================
+
+class StackSampler:
+    """
+    Samples the call stack of one thread at a fixed interval.
+
+    Args:
+        thread_id: Identifier of the sampled thread
+        interval: Seconds between samples
+    """
+
+    def __init__(self, thread_id: int, interval: float = DEFAULT_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="auq-stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path: Path) -> None:
+        """Write the samples as collapsed stacks ("outer;inner count" per line)."""
+        with path.open("w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+# ===================
+# Stage Profiling
+# ===================
+
+def profile(name: str) -> ContextManager:
+    """
+    Profile the enclosed block as stage `name` when profiling is on.
+
+    Args:
+        name: Stage name, used for the file names
+
+    Returns:
+        A context manager (a no-op one when profiling is off or the thread is already profiled)
+    """
+    if _settings["profile_dir"] is None or getattr(_local, "active", False):
+        return nullcontext()
+    return _profile(name, _settings["profile_dir"])
+
+
+@contextmanager
+def _profile(name: str, profile_dir: Path):
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    base = profile_dir / re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_")
+    _local.active = True
+
+    profiler: Optional[cProfile.Profile] = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # Python 3.12+: another profiler is active (overlapping stage)
+        warning(f"[{name}] Another stage is being profiled; writing collapsed stacks only")
+        profiler = None
+
+    sampler = StackSampler(threading.get_ident(), _settings["interval"])
+    sampler.start()
+
+    before = None
+    if _settings["memory"]:
+        acquire_tracemalloc()
+        before = tracemalloc.take_snapshot()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        sampler.stop()
+        _local.active = False
+
+        written = []
+        if profiler is not None:
+            profiler.dump_stats(f"{base}.pstats")
+            written.append(".pstats")
+        sampler.write(Path(f"{base}.collapsed"))
+        written.append(".collapsed")
+        if before is not None:
+            after = tracemalloc.take_snapshot()
+            release_tracemalloc()
+            _write_memory_diff(Path(f"{base}.memory.txt"), name, before, after)
+            written.append(".memory.txt")
+        info(f"[{name}] Profile saved to: {base}{{{','.join(written)}}}")
+
+
+def _write_memory_diff(path: Path, name: str, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> None:
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*")]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    growth = sum(stat.size_diff for stat in stats)
+    with path.open("w", encoding="utf-8") as f:
+        f.write(f"# {name}: {growth / 1e6:+.1f} MB allocated and still held at the end of the stage\n")
+        f.write(f"# top {MEMORY_TOP_LINES} lines by growth\n")
+        for stat in stats[:MEMORY_TOP_LINES]:
+            f.write(f"{stat}\n")
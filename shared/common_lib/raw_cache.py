@@ -0,0 +1,320 @@
+"""
+raw_cache.py
+
+A content-addressed, on-disk cache for raw source files (GeoJSON, CSV, JSON-LD).
+
+Raw inputs listed in the API manifest rarely change, so instead of downloading
+them in full on every ETL run each URL is cached locally:
+
+- Entries are keyed by URL and stored by the SHA-256 of their content
+  (`blobs/<sha256>.zst`, zstd-compressed), so identical files share one blob
+- Cached entries are revalidated with ETag / If-Modified-Since; an unchanged
+  source costs a single 304 round-trip
+- The cache is capped in size and evicts least-recently-used entries
+- Offline mode serves cached entries only and never touches the network
+
+Settings can be changed with environment variables or `configure()`:
+- AUQ_RAW_CACHE_DIR     – cache directory (default: ~/.cache/auq/raw)
+- AUQ_RAW_CACHE_MAX_MB  – size cap in MB (default: 512)
+- AUQ_OFFLINE=1         – offline mode
+- AUQ_RAW_CACHE=0       – disable the cache (always download)
+
+Example:
+    from shared.common_lib import raw_cache
+
+    content = raw_cache.fetch(url)      # bytes
+    with raw_cache.open(url) as f:      # binary stream
+        ...
+
+Author: Nicolas D'Alessandro
+Email: Nicodalessandro11@gmail.com
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+
+import zstandard
+
+from shared.common_lib import http_client
+
+# ============================
+# Configuration & Constants
+# ============================
+
+DEFAULT_CACHE_DIR = Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "auq" / "raw"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+ZSTD_LEVEL = 10
+INDEX_FILENAME = "index.json"
+
+
+class RawCacheMiss(Exception):
+    """Raised in offline mode when a URL is not in the cache."""
+
+# ===================
+# Cache Implementation
+# ===================
+
+class RawCache:
+    """
+    On-disk cache of raw files keyed by URL and content hash.
+
+    Args:
+        cache_dir: Directory holding the index and the compressed blobs
+        max_bytes: Size cap for the compressed blobs; LRU entries are evicted above it
+        offline: Serve cached entries only and never touch the network
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES, offline: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.blob_dir = self.cache_dir / "blobs"
+        self.index_path = self.cache_dir / INDEX_FILENAME
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, dict]] = None
+
+    # ---------- Index ----------
+
+    def _load_index(self) -> Dict[str, dict]:
+        if self._index is None:
+            try:
+                with self.index_path.open(encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _blob_path(self, sha256: str) -> Path:
+        return self.blob_dir / f"{sha256}.zst"
+
+    def _cached_entry(self, url: str) -> Optional[dict]:
+        entry = self._load_index().get(url)
+        if entry and self._blob_path(entry["sha256"]).exists():
+            return entry
+        return None
+
+    def _touch(self, url: str, entry: dict) -> Optional[dict]:
+        """
+        Mark a cached entry as used. `entry` was read before the lock was released, so another
+        thread may have evicted it since: it is re-inserted if its blob is still on disk.
+
+        Returns:
+            The current entry, or None if it was evicted along with its blob
+        """
+        with self._lock:
+            index = self._load_index()
+            current = index.get(url)
+            if current is None or not self._blob_path(current["sha256"]).exists():
+                if not self._blob_path(entry["sha256"]).exists():
+                    return None
+                current = index[url] = entry
+            current["last_access"] = time.time()
+            self._save_index()
+            return current
+
+    def _release_blob(self, sha256: str) -> bool:
+        """Delete a blob no index entry references any more; True if it was deleted."""
+        if any(e["sha256"] == sha256 for e in self._index.values()):
+            return False
+        self._blob_path(sha256).unlink(missing_ok=True)
+        return True
+
+    # ---------- Download ----------
+
+    def _download(self, url: str, response) -> dict:
+        """Stream a 200 response into a compressed blob while hashing its content."""
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        raw_size = 0
+        tmp_path = self.blob_dir / f".{threading.get_ident()}-{time.monotonic_ns()}.tmp"
+
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        with tmp_path.open("wb") as f, compressor.stream_writer(f, closefd=False) as writer:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                digest.update(chunk)
+                raw_size += len(chunk)
+                writer.write(chunk)
+
+        sha256 = digest.hexdigest()
+        blob_path = self._blob_path(sha256)
+        if blob_path.exists():
+            tmp_path.unlink()
+        else:
+            os.replace(tmp_path, blob_path)
+
+        return {
+            "sha256": sha256,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "raw_size": raw_size,
+            "size": blob_path.stat().st_size,
+            "last_access": time.time(),
+        }
+
+    def _evict(self, keep: str) -> None:
+        """Drop least-recently-used entries (except `keep`) until the blobs fit under `max_bytes`."""
+        blob_sizes = {e["sha256"]: e["size"] for e in self._index.values()}
+        total = sum(blob_sizes.values())
+        by_age = sorted(self._index.items(), key=lambda item: item[1]["last_access"])
+
+        for url, entry in by_age:
+            if total <= self.max_bytes:
+                break
+            if url == keep:
+                continue
+            del self._index[url]
+            if self._release_blob(entry["sha256"]):
+                total -= blob_sizes[entry["sha256"]]
+
+    def ensure(self, url: str) -> dict:
+        """
+        Make sure `url` is cached and fresh, revalidating it when possible.
+
+        Args:
+            url: URL of the raw file
+
+        Returns:
+            dict: The index entry (sha256, etag, last_modified, sizes, last_access)
+
+        Raises:
+            RawCacheMiss: In offline mode, if the URL is not cached
+            requests.exceptions.RequestException: If the download fails
+        """
+        with self._lock:
+            entry = self._cached_entry(url)
+
+        if self.offline:
+            touched = self._touch(url, entry) if entry is not None else None
+            if touched is None:
+                raise RawCacheMiss(f"Offline mode: {url} is not in the raw cache")
+            return touched
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = http_client.get(url, headers=headers, stream=True)
+        try:
+            if response.status_code == 304 and entry is not None:
+                touched = self._touch(url, entry)
+                if touched is not None:
+                    return touched
+                # Evicted by another thread since the request was sent: download it again
+                response.close()
+                response = http_client.get(url, stream=True)
+            response.raise_for_status()
+            new_entry = self._download(url, response)
+        finally:
+            response.close()
+
+        with self._lock:
+            previous = self._load_index().get(url)
+            self._index[url] = new_entry
+            # The URL's previous content is no longer reachable (unless another URL shares it)
+            if previous is not None and previous["sha256"] != new_entry["sha256"]:
+                self._release_blob(previous["sha256"])
+            self._evict(keep=url)
+            self._save_index()
+        return new_entry
+
+    # ---------- Readers ----------
+
+    def open(self, url: str) -> BinaryIO:
+        """Return a binary stream over the (decompressed) content of `url`."""
+        entry = self.ensure(url)
+        blob = self._blob_path(entry["sha256"]).open("rb")
+        return zstandard.ZstdDecompressor().stream_reader(blob, closefd=True)
+
+    def fetch(self, url: str) -> bytes:
+        """Return the content of `url` as bytes."""
+        with self.open(url) as f:
+            return f.read()
+
+    def content_hash(self, url: str) -> str:
+        """Return the SHA-256 of the current content of `url`."""
+        return self.ensure(url)["sha256"]
+
+# ===================
+# Module-Level API
+# ===================
+
+_settings = {
+    "enabled": os.getenv("AUQ_RAW_CACHE", "1") != "0",
+    "cache_dir": Path(os.getenv("AUQ_RAW_CACHE_DIR", DEFAULT_CACHE_DIR)),
+    "max_bytes": int(os.getenv("AUQ_RAW_CACHE_MAX_MB", DEFAULT_MAX_BYTES // (1024 * 1024))) * 1024 * 1024,
+    "offline": os.getenv("AUQ_OFFLINE", "0") == "1",
+}
+_default_cache: Optional[RawCache] = None
+
+
+def configure(enabled: bool = None, cache_dir: Path = None, max_bytes: int = None, offline: bool = None) -> None:
+    """
+    Change the process-wide cache settings.
+
+    Args:
+        enabled: Use the cache (False always downloads)
+        cache_dir: Cache directory
+        max_bytes: Size cap for the compressed blobs
+        offline: Serve cached entries only
+    """
+    global _default_cache
+    for key, value in (("enabled", enabled), ("cache_dir", cache_dir),
+                       ("max_bytes", max_bytes), ("offline", offline)):
+        if value is not None:
+            _settings[key] = value
+    _default_cache = None
+
+
+def get_cache() -> RawCache:
+    """Return the process-wide cache."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RawCache(_settings["cache_dir"], _settings["max_bytes"], _settings["offline"])
+    return _default_cache
+
+
+def enabled() -> bool:
+    """Whether reads go through the cache (it is bypassed only with AUQ_RAW_CACHE=0 and not offline)."""
+    return _settings["enabled"] or _settings["offline"]
+
+
+def content_hash(url: str) -> str:
+    """Return the SHA-256 of the current content of `url` (revalidating the cached entry)."""
+    return get_cache().content_hash(url)
+
+
+def open(url: str) -> BinaryIO:
+    """Return a binary stream over `url`, through the cache unless it is disabled."""
+    if _settings["enabled"] or _settings["offline"]:
+        return get_cache().open(url)
+
+    response = http_client.get(url, stream=True)
+    response.raise_for_status()
+    response.raw.decode_content = True
+    return response.raw
+
+
+def fetch(url: str) -> bytes:
+    """Return the content of `url`, through the cache unless it is disabled."""
+    if _settings["enabled"] or _settings["offline"]:
+        return get_cache().fetch(url)
+
+    response = http_client.get(url)
+    response.raise_for_status()
+    return response.content